@@ -1,47 +1,8 @@
 import socket
-import struct
 import sys
 
-
-class Protocol:
-    """Протокол"""
-    GET_INFO = 0x00
-    GET_CHUNK = 0x01
-    GET_LIST = 0x02
-    LOGIN = 0x03
-    REGISTER = 0x04
-    UPLOAD = 0x05
-    GET_USER_VIDEOS = 0x06 #сам добавил(нету в протоколе)
-    EDIT_VIDEO = 0x07 #сам добавил(нету в протоколе)
-
-    # Ответы авторизации(login)
-    LOGIN_SUCCESS = 0x00
-    LOGIN_NO_ACCOUNT = 0x01
-    LOGIN_WRONG_PASSWORD = 0x02
-
-    # Ответы регистрации(registr)/
-    REGISTER_SUCCESS = 0x00
-    REGISTER_USERNAME_TAKEN = 0x01
-    REGISTER_INVALID_CREDENTIALS = 0x02
-
-    # Ответы загрузки
-    UPLOAD_PROGRESS = 0x00
-    UPLOAD_FAILURE = 0x01
-    UPLOAD_SUCCESS = 0x02
-
-    @staticmethod
-    def command_to_str(cmd):
-        commands = {
-            GET_INFO: 'GET_INFO',
-            GET_CHUNK: 'GET_CHUNK',
-            GET_LIST: 'GET_LIST',
-            LOGIN: 'LOGIN',
-            REGISTER: 'REGISTER',
-            UPLOAD: 'UPLOAD',
-            GET_USER_VIDEOS: 'GET_USER_VIDEOS',
-            EDIT_VIDEO: 'EDIT_VIDEO'
-        }
-        return commands.get(cmd, 'UNKNOWN')
+from video_client.protocols import (Protocol, encode_request, VIDEO_LIST, VIDEO_INFO, VIDEO_IDS,
+                                    CHANNEL_LIST, SIZE, STRING)
 
 
 class NetworkTester:
@@ -94,36 +55,17 @@ class NetworkTester:
             print(f"Error receiving data: {str(e)}")
             raise
 
+    def _read(self, codec):
+        return codec.read(self._recv_all)
+
     def get_video_list(self):
         try:
-            self._send_all(bytes([Protocol.GET_LIST]))
-            count_data = self._recv_all(4)
-            count = struct.unpack('!I', count_data)[0]
-            print(f"Receiving {count} videos")
-
-            videos = []
-            for _ in range(count):
-                video_id = struct.unpack('!I', self._recv_all(4))[0]
-
-                # Read video info
-                segment_amount = struct.unpack('!I', self._recv_all(4))[0]
-                segment_length = struct.unpack('!B', self._recv_all(1))[0]
-                max_quality = struct.unpack('!B', self._recv_all(1))[0]
-
-                # Read author
-                author_len = struct.unpack('!I', self._recv_all(4))[0]
-                author = self._recv_all(author_len).decode('utf-8')
-
-                # Read title
-                title_len = struct.unpack('!I', self._recv_all(4))[0]
-                title = self._recv_all(title_len).decode('utf-8')
-
-                # Read description
-                desc_len = struct.unpack('!I', self._recv_all(4))[0]
-                description = self._recv_all(desc_len).decode('utf-8')
+            self._send_all(bytes([Protocol.GET_VIDEO_LIST]))
+            videos = self._read(VIDEO_LIST)
+            print(f"Received {len(videos)} videos")
 
-                print(f"Video ID: {video_id}, Title: {title}, Author: {author}")
-                videos.append((video_id, (segment_amount, segment_length, max_quality, author, title, description)))
+            for video_id, info in videos:
+                print(f"Video ID: {video_id}, Title: {info.title}, Author: {info.author}")
 
             return videos
         except Exception as e:
@@ -132,14 +74,9 @@ class NetworkTester:
 
     def get_video_segment(self, video_id, segment_id, quality=0):
         try:
-            self._send_all(bytes([Protocol.GET_CHUNK]))
-            self._send_all(struct.pack('!IIB', video_id, segment_id, quality))
+            self._send_all(encode_request(Protocol.GET_VIDEO_SEGMENT, video_id, segment_id, quality))
 
-            size_data = self._recv_all(4)
-            if not size_data:
-                return None
-
-            size = struct.unpack('!I', size_data)[0]
+            size = SIZE.struct.unpack(self._recv_all(SIZE.struct.size))[0]
             if size == 0:
                 return None
 
@@ -152,25 +89,17 @@ class NetworkTester:
 
     def login(self, username, password):
         try:
-            username_bytes = username.encode('utf-8')
-            password_bytes = password.encode('utf-8')
-
-            data = bytes([Protocol.LOGIN])
-            data += struct.pack('!I', len(username_bytes)) + username_bytes
-            data += struct.pack('!I', len(password_bytes)) + password_bytes
-
-            self._send_all(data)
+            self._send_all(encode_request(Protocol.LOGIN, username, password))
 
             response = self._recv_all(1)[0]
 
-            if response == Protocol.LOGIN_SUCCESS:
-                token_len = struct.unpack('!I', self._recv_all(4))[0]
-                self.token = self._recv_all(token_len).decode('utf-8')
+            if response == Protocol.SUCCESS:
+                self.token = self._read(STRING)
                 print("Login successful")
                 return True
-            elif response == Protocol.LOGIN_WRONG_PASSWORD:
+            elif response == Protocol.INVALID_CREDENTIALS:
                 print("Wrong password")
-            elif response == Protocol.LOGIN_NO_ACCOUNT:
+            elif response == Protocol.FAILURE:
                 print("Account not found")
 
             return False
@@ -180,25 +109,17 @@ class NetworkTester:
 
     def register(self, username, password):
         try:
-            username_bytes = username.encode('utf-8')
-            password_bytes = password.encode('utf-8')
-
-            data = bytes([Protocol.REGISTER])
-            data += struct.pack('!I', len(username_bytes)) + username_bytes
-            data += struct.pack('!I', len(password_bytes)) + password_bytes
-
-            self._send_all(data)
+            self._send_all(encode_request(Protocol.REGISTER, username, password))
 
             response = self._recv_all(1)[0]
 
-            if response == Protocol.REGISTER_SUCCESS:
-                token_len = struct.unpack('!I', self._recv_all(4))[0]
-                self.token = self._recv_all(token_len).decode('utf-8')
+            if response == Protocol.SUCCESS:
+                self.token = self._read(STRING)
                 print("Registration successful")
                 return True
-            elif response == Protocol.REGISTER_USERNAME_TAKEN:
+            elif response == Protocol.USERNAME_TAKEN:
                 print("Username already taken")
-            elif response == Protocol.REGISTER_INVALID_CREDENTIALS:
+            elif response == Protocol.INVALID_CREDENTIALS:
                 print("Invalid credentials")
 
             return False
@@ -206,48 +127,45 @@ class NetworkTester:
             print(f"Registration error: {str(e)}")
             return False
 
-    def get_user_videos(self):
+    def get_user_channels(self):
         if not self.token:
             print("Not authenticated")
             return []
 
         try:
-            token_bytes = self.token.encode('utf-8')
+            self._send_all(encode_request(Protocol.GET_USER_CHANNELS, self.token))
+            channels = self._read(CHANNEL_LIST)
+            print(f"Received {len(channels)} user channels")
 
-            self._send_all(bytes([Protocol.GET_USER_VIDEOS]))
-            self._send_all(struct.pack('!I', len(token_bytes)) + token_bytes)
+            for channel_id, info in channels:
+                print(f"Channel ID: {channel_id}, Name: {info.name}, Videos: {info.video_amount}")
 
-            count_data = self._recv_all(4)
-            count = struct.unpack('!I', count_data)[0]
-            print(f"Receiving {count} user videos")
-
-            videos = []
-            for _ in range(count):
-                video_id = struct.unpack('!I', self._recv_all(4))[0]
-
-                # Read video info
-                segment_amount = struct.unpack('!I', self._recv_all(4))[0]
-                segment_length = struct.unpack('!B', self._recv_all(1))[0]
-                max_quality = struct.unpack('!B', self._recv_all(1))[0]
-
-                # Read author
-                author_len = struct.unpack('!I', self._recv_all(4))[0]
-                author = self._recv_all(author_len).decode('utf-8')
-
-                # Read title
-                title_len = struct.unpack('!I', self._recv_all(4))[0]
-                title = self._recv_all(title_len).decode('utf-8')
+            return channels
+        except Exception as e:
+            print(f"Error getting user channels: {str(e)}")
+            return []
 
-                # Read description
-                desc_len = struct.unpack('!I', self._recv_all(4))[0]
-                description = self._recv_all(desc_len).decode('utf-8')
+    def get_user_videos(self):
+        if not self.token:
+            print("Not authenticated")
+            return []
 
-                print(f"User Video ID: {video_id}, Title: {title}")
-                videos.append((video_id, (segment_amount, segment_length, max_quality, author, title, description)))
+        try:
+            # Отдельной команды нет, собираем видео по каналам пользователя
+            videos = []
+            for channel_id, _ in self.get_user_channels():
+                self._send_all(encode_request(Protocol.GET_CHANNEL_VIDEOS, channel_id, 0, 100))
+                if self._recv_all(1)[0] != Protocol.SUCCESS:
+                    print(f"Failed to get videos of channel {channel_id}")
+                    continue
+
+                for video_id in self._read(VIDEO_IDS):
+                    self._send_all(encode_request(Protocol.GET_VIDEO_INFO, video_id))
+                    info = self._read(VIDEO_INFO)
+                    print(f"User Video ID: {video_id}, Title: {info.title}")
+                    videos.append((video_id, info))
 
             return videos
         except Exception as e:
             print(f"Error getting user videos: {str(e)}")
             return []
-
-
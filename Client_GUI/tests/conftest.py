@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The logger opens logs/video_client.log in the working directory on import;
+# keep test runs out of the client's own log
+_cwd = os.getcwd()
+_log_dir = tempfile.mkdtemp(prefix='video_client_tests_')
+atexit.register(shutil.rmtree, _log_dir, True)
+os.chdir(_log_dir)
+try:
+    import video_client.logger  # noqa: F401
+finally:
+    os.chdir(_cwd)
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from video_client.cache import SegmentCache
+
+
+@pytest.fixture
+def segment(tmp_path):
+    """Write a downloaded segment file of ``size`` bytes"""
+    def make(size, fill=b'x'):
+        path = tmp_path / f'download_{size}_{fill.hex()}.mp4'
+        path.write_bytes(fill * size)
+        return str(path)
+    return make
+
+
+def test_store_and_lookup(tmp_path, segment):
+    cache = SegmentCache(str(tmp_path / 'cache'), max_bytes=1000)
+    assert cache.lookup(1, 0, 0) is None
+
+    cache.store(1, 0, 0, segment(100))
+    path = cache.lookup(1, 0, 0)
+    assert path is not None and os.path.getsize(path) == 100
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_is_evicted(tmp_path, segment):
+    cache = SegmentCache(str(tmp_path / 'cache'), max_bytes=300)
+    for segment_id in range(3):
+        cache.store(1, segment_id, 0, segment(100, bytes([segment_id])))
+
+    # Segment 0 becomes the most recently used, so segment 1 goes first
+    assert cache.lookup(1, 0, 0)
+    cache.store(1, 3, 0, segment(100, b'\x03'))
+
+    assert cache.lookup(1, 1, 0) is None
+    assert all(cache.lookup(1, segment_id, 0) for segment_id in (0, 2, 3))
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 300
+
+
+def test_segment_larger_than_budget_is_not_stored(tmp_path, segment):
+    cache = SegmentCache(str(tmp_path / 'cache'), max_bytes=50)
+    cache.store(1, 0, 0, segment(100))
+    assert cache.lookup(1, 0, 0) is None
+    assert cache.stats()['segments'] == 0
+
+
+def test_corrupt_segment_is_dropped(tmp_path, segment):
+    directory = str(tmp_path / 'cache')
+    cache = SegmentCache(directory, max_bytes=1000)
+    cache.store(1, 0, 0, segment(100))
+    cache.flush()
+
+    reopened = SegmentCache(directory, max_bytes=1000)
+    with open(os.path.join(directory, '1_0_0.mp4'), 'r+b') as f:
+        f.write(b'y')
+    assert reopened.lookup(1, 0, 0) is None
+    assert reopened.stats()['corrupt'] == 1
+
+
+def test_checkout_is_a_private_copy(tmp_path, segment):
+    cache = SegmentCache(str(tmp_path / 'cache'), max_bytes=1000)
+    cache.store(1, 0, 0, segment(100))
+
+    copy = cache.checkout(1, 0, 0)
+    os.remove(copy)
+    assert cache.lookup(1, 0, 0) is not None
+
+
+def test_lru_order_survives_reload(tmp_path, segment):
+    directory = str(tmp_path / 'cache')
+    cache = SegmentCache(directory, max_bytes=300)
+    for segment_id in range(3):
+        cache.store(1, segment_id, 0, segment(100, bytes([segment_id])))
+    cache.lookup(1, 0, 0)
+    cache.flush()
+
+    reopened = SegmentCache(directory, max_bytes=300)
+    reopened.store(1, 3, 0, segment(100, b'\x03'))
+    assert reopened.lookup(1, 1, 0) is None
+    assert reopened.lookup(1, 0, 0) is not None
+
+
+def test_unindexed_segments_are_recovered(tmp_path, segment):
+    directory = str(tmp_path / 'cache')
+    cache = SegmentCache(directory, max_bytes=1000)
+    cache.store(1, 0, 0, segment(100))
+    cache.flush()
+    # Stored after the last index write
+    cache.store(1, 1, 0, segment(100, b'y'))
+    with open(os.path.join(directory, 'stray.mp4'), 'wb') as f:
+        f.write(b'z')
+
+    reopened = SegmentCache(directory, max_bytes=1000)
+    assert reopened.stats()['segments'] == 2
+    assert reopened.lookup(1, 1, 0) is not None
+    assert not os.path.exists(os.path.join(directory, 'stray.mp4'))
@@ -0,0 +1,140 @@
+import struct
+
+import pytest
+
+from video_client.protocols import (Protocol, Message, ListOf, Sized, STRING, BLOB, U8, U32, U64,
+                                    VideoInfo, ChannelInfo, encode_request, REQUESTS,
+                                    VIDEO_INFO, CHANNEL_INFO, VIDEO_LIST, VIDEO_PAGE, CHANNEL_LIST,
+                                    VIDEO_IDS, VIDEO_INFO_BATCH, STATUS_ID, FRAME_HEADER)
+
+
+def video_info(i):
+    return VideoInfo(i, 10 + i, 5, 2, f'author{i}', f'видео {i}', 'desc' * i)
+
+
+def read_in_pieces(codec, data):
+    """Decode through the incremental parser, checking it asks for exactly the bytes present"""
+    position = 0
+
+    def recv(n):
+        nonlocal position
+        chunk = data[position:position + n]
+        assert len(chunk) == n
+        position += n
+        return chunk
+
+    value = codec.read(recv)
+    assert position == len(data)
+    return value
+
+
+def test_video_info_round_trip():
+    info = video_info(3)
+    data = VIDEO_INFO.pack_object(info)
+
+    decoded, offset = VIDEO_INFO.unpack_from(data)
+    assert offset == len(data)
+    assert vars(decoded) == vars(info)
+    assert vars(read_in_pieces(VIDEO_INFO, data)) == vars(info)
+    assert vars(VideoInfo.from_bytes(info.to_bytes())) == vars(info)
+
+
+def test_video_info_wire_layout():
+    data = VIDEO_INFO.pack(7, 20, 4, 3, 'a', 'bc', '')
+    assert bytes(data) == (struct.pack('!IIBB', 7, 20, 4, 3) + struct.pack('!I', 1) + b'a' +
+                           struct.pack('!I', 2) + b'bc' + struct.pack('!I', 0))
+
+
+def test_channel_info_round_trip():
+    info = ChannelInfo('канал', 'd', 3, 1, 2)
+    decoded = ChannelInfo.from_bytes(info.to_bytes())
+    assert vars(decoded) == vars(info)
+    assert vars(read_in_pieces(CHANNEL_INFO, CHANNEL_INFO.pack_object(info))) == vars(info)
+
+
+@pytest.mark.parametrize('count', [0, 1, 5])
+def test_listings_round_trip(count):
+    videos = [(i, video_info(i)) for i in range(count)]
+    data = VIDEO_LIST.pack(videos)
+
+    for decoded in (VIDEO_LIST.unpack_from(data)[0], read_in_pieces(VIDEO_LIST, data)):
+        assert [(video_id, vars(info)) for video_id, info in decoded] == \
+            [(video_id, vars(info)) for video_id, info in videos]
+
+    channels = [(i, ChannelInfo(f'c{i}', '', i, 1, 0)) for i in range(count)]
+    decoded = read_in_pieces(CHANNEL_LIST, CHANNEL_LIST.pack(channels))
+    assert [(channel_id, vars(info)) for channel_id, info in decoded] == \
+        [(channel_id, vars(info)) for channel_id, info in channels]
+
+
+def test_video_page_round_trip():
+    videos = [(i, video_info(i)) for i in range(3)]
+    data = VIDEO_PAGE.pack(40, videos)
+
+    total, decoded = read_in_pieces(VIDEO_PAGE, data)
+    assert total == 40
+    assert [video_id for video_id, _ in decoded] == [0, 1, 2]
+    assert VIDEO_PAGE.unpack_from(data)[1] == len(data)
+
+
+def test_id_list_is_one_struct():
+    data = VIDEO_IDS.pack([3, 1, 4, 1, 5])
+    assert bytes(data) == struct.pack('!6I', 5, 3, 1, 4, 1, 5)
+    assert VIDEO_IDS.unpack_from(data) == ([3, 1, 4, 1, 5], len(data))
+    assert read_in_pieces(VIDEO_IDS, data) == [3, 1, 4, 1, 5]
+    assert read_in_pieces(VIDEO_IDS, VIDEO_IDS.pack([])) == []
+
+
+def test_info_batch_skips_bytes_after_sized_message():
+    info = VIDEO_INFO.pack_object(video_info(1))
+    # A newer server may append fields the client does not know yet
+    record = struct.pack('!II', 9, len(info) + 3) + info + b'new'
+    data = struct.pack('!I', 2) + record + record
+
+    decoded, offset = VIDEO_INFO_BATCH.unpack_from(data)
+    assert offset == len(data)
+    assert [(video_id, vars(info)) for video_id, info in decoded] == [(9, vars(video_info(1)))] * 2
+
+
+def test_nested_fixed_fields_and_data_between_them():
+    inner = Message('Inner', [('a', U8), ('b', U32)])
+    outer = Message('Outer', [('x', U32), ('inner', inner), ('name', STRING), ('y', U64),
+                              ('raw', BLOB), ('items', ListOf(U32)), ('sized', Sized(inner))])
+    value = (1, (2, 3), 'имя', 2 ** 40, b'\x00\xff', [7, 8], (9, 10))
+    data = outer.pack(*value)
+
+    assert outer.unpack_from(data) == (value, len(data))
+    assert read_in_pieces(outer, data) == value
+
+
+def test_empty_strings_and_blobs():
+    message = Message('Empty', [('text', STRING), ('raw', BLOB), ('n', U8)])
+    data = message.pack('', b'', 1)
+    assert read_in_pieces(message, data) == ('', b'', 1)
+
+
+def test_wrong_field_count_is_rejected():
+    with pytest.raises(ValueError):
+        STATUS_ID.pack(Protocol.SUCCESS)
+
+
+def test_pack_into_offset():
+    buffer = bytearray(3 + FRAME_HEADER.struct.size)
+    end = FRAME_HEADER.pack_into(buffer, 3, Protocol.SUCCESS, 1234)
+    assert end == len(buffer)
+    assert FRAME_HEADER.unpack_from(buffer, 3) == ((Protocol.SUCCESS, 1234), len(buffer))
+
+
+def test_requests_start_with_their_command():
+    data = encode_request(Protocol.GET_VIDEO_SEGMENT, 5, 6, 2)
+    assert bytes(data) == struct.pack('!BIIB', Protocol.GET_VIDEO_SEGMENT, 5, 6, 2)
+
+    data = encode_request(Protocol.LOGIN, 'user', 'пароль')
+    command, username, password = REQUESTS[Protocol.LOGIN].unpack_from(data)[0]
+    assert (command, username, password) == (Protocol.LOGIN, 'user', 'пароль')
+
+
+def test_request_body_has_no_command_byte():
+    request = REQUESTS[Protocol.GET_VIDEO_INFO_BATCH]
+    assert request.pack([1, 2])[1:] == request.body.pack([1, 2])
+    assert request.body.unpack_from(request.body.pack([1, 2])) == (([1, 2],), 12)
@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from video_client.scheduler import SegmentScheduler, PRIORITY_PLAYBACK, PRIORITY_PREFETCH
+
+
+class BlockingFetch:
+    """Fetch function that records calls and holds them until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, video_id, segment_id, quality):
+        with self.lock:
+            self.calls.append(segment_id)
+        self.started.set()
+        assert self.release.wait(5)
+        return f'segment-{segment_id}'
+
+
+@pytest.fixture
+def fetch():
+    return BlockingFetch()
+
+
+@pytest.fixture
+def scheduler(fetch):
+    scheduler = SegmentScheduler(fetch, max_workers=1)
+    yield scheduler
+    fetch.release.set()
+    scheduler.shutdown(wait=True)
+
+
+def occupy_worker(scheduler, fetch):
+    """Start one fetch so later submissions wait in the queue"""
+    future = scheduler.submit(1, 100, 0)
+    assert fetch.started.wait(5)
+    return future
+
+
+def test_playback_overtakes_queued_prefetches(scheduler, fetch):
+    occupy_worker(scheduler, fetch)
+    prefetches = [scheduler.submit(1, segment_id, 0, PRIORITY_PREFETCH) for segment_id in (1, 2)]
+    playback = scheduler.submit(1, 3, 0, PRIORITY_PLAYBACK)
+
+    fetch.release.set()
+    assert playback.result(5) == 'segment-3'
+    for future in prefetches:
+        future.result(5)
+    assert fetch.calls == [100, 3, 1, 2]
+
+
+def test_duplicate_request_shares_the_future_and_is_boosted(scheduler, fetch):
+    occupy_worker(scheduler, fetch)
+    first = scheduler.submit(1, 1, 0, PRIORITY_PREFETCH)
+    other = scheduler.submit(1, 2, 0, PRIORITY_PREFETCH)
+    again = scheduler.submit(1, 1, 0, PRIORITY_PLAYBACK)
+    assert again is first
+
+    fetch.release.set()
+    other.result(5)
+    assert first.result(5) == 'segment-1'
+    assert fetch.calls == [100, 1, 2]
+
+
+def test_cancelled_requests_are_not_fetched(scheduler, fetch):
+    occupy_worker(scheduler, fetch)
+    futures = {segment_id: scheduler.submit(1, segment_id, 0) for segment_id in (1, 2, 3)}
+
+    assert scheduler.cancel(lambda request: request.segment_id in (1, 3)) == 2
+    fetch.release.set()
+
+    assert futures[2].result(5) == 'segment-2'
+    assert futures[1].cancelled() and futures[3].cancelled()
+    assert fetch.calls == [100, 2]
+
+
+def test_result_of_cancelled_running_request_is_discarded(fetch):
+    discarded = []
+    scheduler = SegmentScheduler(fetch, max_workers=1, discard=discarded.append)
+    callbacks = []
+    try:
+        running = scheduler.submit(1, 5, 0, callback=callbacks.append)
+        assert fetch.started.wait(5)
+        assert scheduler.cancel_all() == 1
+
+        fetch.release.set()
+        with pytest.raises(CancelledError):
+            running.result(5)
+        assert discarded == ['segment-5']
+        assert callbacks == []
+    finally:
+        fetch.release.set()
+        scheduler.shutdown(wait=True)
+
+
+def test_callbacks_get_the_result(scheduler, fetch):
+    results = []
+    done = threading.Event()
+    fetch.release.set()
+    scheduler.submit(1, 7, 0, callback=lambda segment: (results.append(segment), done.set()))
+    assert done.wait(5)
+    assert results == ['segment-7']
+    assert scheduler.pending() == 0
+
+
+def test_submit_after_shutdown_fails(fetch):
+    scheduler = SegmentScheduler(fetch, max_workers=1)
+    scheduler.shutdown(wait=True)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(1, 0, 0)
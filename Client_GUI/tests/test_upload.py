@@ -0,0 +1,136 @@
+import os
+
+import pytest
+
+from video_client.network import NetworkClient
+from video_client.upload import AckWindow, UploadJournal
+
+
+def test_window_bounds_chunks_in_flight():
+    window = AckWindow(initial=2, maximum=4, unit=1)
+    window.sent()
+    window.sent()
+    assert window.in_flight == 2
+    assert not window.can_send()
+
+    window.ack()
+    assert window.acked == 1
+    assert window.can_send()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('video_client.upload.time.monotonic', lambda: now[0])
+    return now
+
+
+def test_window_grows_while_round_trips_stay_low(clock):
+    window = AckWindow(initial=2, maximum=5, unit=1)
+    for _ in range(10):
+        window.sent()
+        clock[0] += 0.01
+        window.ack()
+    assert window.size == 5
+    assert window.acked == 10
+
+
+def test_window_of_one_is_stop_and_wait():
+    window = AckWindow(initial=1, maximum=1, unit=1)
+    for _ in range(5):
+        assert window.can_send()
+        window.sent()
+        assert not window.can_send()
+        window.ack()
+    assert window.size == 1
+
+
+def test_window_shrinks_to_bandwidth_delay_product_when_acks_queue(clock):
+    window = AckWindow(initial=8, minimum=2, maximum=8, unit=1000)
+
+    # Uncongested: 10 ms round trip, one ack every 10 ms (100 KB/s)
+    for _ in range(3):
+        window.sent()
+        clock[0] += 0.01
+        window.ack()
+    # Queueing: the next ack takes 50 ms
+    window.sent()
+    clock[0] += 0.05
+    window.ack()
+
+    assert window.min_rtt == pytest.approx(0.01)
+    # ~85 KB/s * 10 ms is about one unit in flight, plus one
+    assert window.size == 2
+
+
+def test_ack_of_several_chunks():
+    window = AckWindow(initial=4, maximum=4, unit=1)
+    for _ in range(3):
+        window.sent()
+    window.ack(3)
+    assert window.acked == 3
+    assert window.in_flight == 0
+
+
+@pytest.fixture
+def upload_file(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(os.urandom(4096))
+    return str(path)
+
+
+def test_journal_keeps_pending_ranges_across_restarts(tmp_path, upload_file):
+    journal_path = str(tmp_path / 'uploads.json')
+    journal = UploadJournal(journal_path)
+    entry = journal.add('ab' * 16, upload_file, 1, 'title', 'description', 1024)
+    assert entry['pending'] == [[0, 4096]]
+
+    journal.update_offset(entry['session'], 1024, [(1024, 2048), (3072, 4096)])
+    journal.flush()
+
+    reopened = UploadJournal(journal_path)
+    found = reopened.find(upload_file, 1, 'title')
+    assert found['offset'] == 1024
+    assert found['pending'] == [[1024, 2048], [3072, 4096]]
+
+
+def test_journal_offset_without_ranges_means_rest_of_file(tmp_path, upload_file):
+    journal = UploadJournal(str(tmp_path / 'uploads.json'))
+    journal.add('cd' * 16, upload_file, 1, 'title', '', 1024)
+    journal.update_offset('cd' * 16, 2048)
+    assert journal.get('cd' * 16)['pending'] == [[2048, 4096]]
+
+
+def test_journal_drops_modified_files(tmp_path, upload_file):
+    journal_path = str(tmp_path / 'uploads.json')
+    UploadJournal(journal_path).add('ef' * 16, upload_file, 1, 'title', '', 1024)
+    with open(upload_file, 'ab') as f:
+        f.write(b'more')
+
+    reopened = UploadJournal(journal_path)
+    assert reopened.pending() == []
+    assert reopened.find(upload_file, 1, 'title') is None
+
+
+def test_journal_matches_metadata(tmp_path, upload_file):
+    journal = UploadJournal(str(tmp_path / 'uploads.json'))
+    journal.add('01' * 16, upload_file, 1, 'title', '', 1024)
+    assert journal.find(upload_file, 2, 'title') is None
+    assert journal.find(upload_file, 1, 'other') is None
+
+    journal.remove('01' * 16)
+    assert journal.find(upload_file, 1, 'title') is None
+
+
+def test_resume_ranges_resend_journalled_holes():
+    entry = {'offset': 1024, 'size': 4096, 'pending': [[1024, 2048], [3072, 4096]]}
+    # The server's offset is only trusted up to the acknowledged prefix
+    assert NetworkClient._resume_ranges(entry, 3072) == [(1024, 2048), (3072, 4096)]
+    # A server that lost data before the prefix gets it again
+    assert NetworkClient._resume_ranges(entry, 512) == [(512, 1024), (1024, 2048), (3072, 4096)]
+
+
+def test_resume_ranges_of_old_entries_without_pending():
+    entry = {'offset': 1024, 'size': 4096}
+    assert NetworkClient._resume_ranges(entry, 1024) == [(1024, 4096)]
+    assert NetworkClient._resume_ranges({'offset': 4096, 'size': 4096, 'pending': []}, 4096) == []
@@ -0,0 +1,186 @@
+import math
+import threading
+from typing import Optional, Dict, List
+
+from .logger import logger
+
+
+class ThroughputMeter:
+    """Download throughput and segment size statistics.
+
+    Keeps a fast and a slow exponentially weighted average of the measured
+    throughput and reports the lower one, so drops are picked up quickly
+    while short bursts do not push quality up. Average segment sizes are
+    tracked per quality to estimate the bitrate of each level.
+    """
+
+    def __init__(self, fast_half_life: float = 3.0, slow_half_life: float = 8.0,
+                 min_bytes: int = 16 * 1024):
+        self.fast_half_life = fast_half_life
+        self.slow_half_life = slow_half_life
+        # Tiny downloads are dominated by latency and say little about bandwidth
+        self.min_bytes = min_bytes
+
+        self._fast = None
+        self._slow = None
+        self._segment_bytes: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    @staticmethod
+    def _ewma(previous: Optional[float], sample: float, weight: float, half_life: float) -> float:
+        if previous is None:
+            return sample
+        alpha = 1 - 0.5 ** (weight / half_life)
+        return previous + alpha * (sample - previous)
+
+    def record(self, quality: int, size: int, seconds: float) -> None:
+        """Add a finished download of ``size`` bytes that took ``seconds``"""
+        with self._lock:
+            self._segment_bytes[quality] = self._ewma(self._segment_bytes.get(quality), size, 1, 2)
+            if size < self.min_bytes or seconds <= 0:
+                return
+            bps = size * 8 / seconds
+            self._fast = self._ewma(self._fast, bps, seconds, self.fast_half_life)
+            self._slow = self._ewma(self._slow, bps, seconds, self.slow_half_life)
+            self.samples += 1
+
+    def estimate(self) -> Optional[float]:
+        """Conservative throughput estimate in bits per second, None before the first sample"""
+        with self._lock:
+            if self._fast is None:
+                return None
+            return min(self._fast, self._slow)
+
+    def bitrates(self, max_quality: int, segment_length: int) -> Optional[List[float]]:
+        """Estimated bitrate of every quality level from 0 to ``max_quality``.
+
+        Levels that were never downloaded are extrapolated from the nearest
+        known one assuming the bitrate doubles per level.
+        """
+        with self._lock:
+            known = {q: size * 8 / max(segment_length, 1)
+                     for q, size in self._segment_bytes.items() if q <= max_quality}
+        if not known:
+            return None
+
+        bitrates = []
+        for quality in range(max_quality + 1):
+            nearest = min(known, key=lambda q: abs(q - quality))
+            bitrates.append(known[nearest] * 2.0 ** (quality - nearest))
+        return bitrates
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'samples': self.samples,
+                'fast_bps': self._fast,
+                'slow_bps': self._slow,
+                'segment_bytes': dict(self._segment_bytes),
+            }
+
+
+class AbrPolicy:
+    """Chooses a quality level for the next segment"""
+
+    def choose(self, bitrates: List[float], throughput: Optional[float],
+               buffer_level: float, current: int) -> int:
+        raise NotImplementedError
+
+
+class ThroughputPolicy(AbrPolicy):
+    """Highest quality whose bitrate fits into a share of the measured throughput"""
+
+    def __init__(self, safety: float = 0.8):
+        self.safety = safety
+
+    def choose(self, bitrates, throughput, buffer_level, current):
+        if throughput is None:
+            return current
+        budget = throughput * self.safety
+        quality = 0
+        for level, bitrate in enumerate(bitrates):
+            if bitrate <= budget:
+                quality = level
+        return quality
+
+
+class BufferPolicy(AbrPolicy):
+    """BOLA-style choice driven by the buffer level.
+
+    Each level gets a logarithmic utility; the level maximising
+    ``(V * (utility + gp) - buffer_level) / bitrate`` wins, so quality rises
+    as the buffer fills towards ``buffer_target`` and falls as it drains,
+    without relying on throughput estimates.
+    """
+
+    def __init__(self, buffer_target: float = 30.0, minimum_buffer: float = 10.0):
+        self.buffer_target = buffer_target
+        self.minimum_buffer = minimum_buffer
+
+    def choose(self, bitrates, throughput, buffer_level, current):
+        utilities = [math.log(bitrate / bitrates[0]) + 1 for bitrate in bitrates]
+        if len(utilities) == 1:
+            return 0
+        target = max(self.buffer_target, self.minimum_buffer * 2)
+        gp = (utilities[-1] - 1) / (target / self.minimum_buffer - 1)
+        v = self.minimum_buffer / gp
+
+        return max(range(len(bitrates)),
+                   key=lambda level: (v * (utilities[level] + gp) - buffer_level) / bitrates[level])
+
+
+class DynamicPolicy(AbrPolicy):
+    """Throughput-based while the buffer is low, buffer-based once it is healthy"""
+
+    def __init__(self, switch_level: float = 10.0, throughput: Optional[ThroughputPolicy] = None,
+                 buffer: Optional[BufferPolicy] = None):
+        self.switch_level = switch_level
+        self.throughput_policy = throughput or ThroughputPolicy()
+        self.buffer_policy = buffer or BufferPolicy()
+
+    def choose(self, bitrates, throughput, buffer_level, current):
+        if buffer_level < self.switch_level:
+            return self.throughput_policy.choose(bitrates, throughput, buffer_level, current)
+        return self.buffer_policy.choose(bitrates, throughput, buffer_level, current)
+
+
+class AbrController:
+    """Picks the quality of each segment request for the current video"""
+
+    def __init__(self, meter: ThroughputMeter, policy: Optional[AbrPolicy] = None,
+                 initial_quality: int = 1):
+        self.meter = meter
+        self.policy = policy or DynamicPolicy()
+        self.initial_quality = initial_quality
+        self.max_quality = 0
+        self.segment_length = 1
+        self.quality = 0
+
+    def configure(self, max_quality: int, segment_length: int) -> None:
+        """Reset for a new video"""
+        self.max_quality = max(max_quality, 0)
+        self.segment_length = max(segment_length, 1)
+        self.quality = min(self.initial_quality, self.max_quality)
+
+    def set_policy(self, policy: AbrPolicy) -> None:
+        self.policy = policy
+
+    def choose(self, buffer_level: float = 0.0) -> int:
+        """Quality for the next request given ``buffer_level`` seconds buffered ahead"""
+        bitrates = self.meter.bitrates(self.max_quality, self.segment_length)
+        if bitrates is None:
+            return self.quality
+
+        try:
+            quality = self.policy.choose(bitrates, self.meter.estimate(), buffer_level, self.quality)
+        except (ValueError, ZeroDivisionError) as e:
+            logger.error(f"ABR policy error: {str(e)}")
+            return self.quality
+
+        quality = min(max(quality, 0), self.max_quality)
+        if quality != self.quality:
+            logger.info(f"ABR switching quality {self.quality} -> {quality} "
+                        f"(buffer {buffer_level:.1f}s, throughput {self.meter.estimate()})")
+            self.quality = quality
+        return quality
@@ -0,0 +1,153 @@
+import os
+import threading
+from typing import Optional, Dict, List
+
+from .logger import logger
+
+
+class SegmentBuffer:
+    """Bounded set of downloaded segment files around the playhead.
+
+    Keeps at most ``look_ahead`` seconds of segments after the playhead and
+    ``look_behind`` seconds before it, within a total of ``max_bytes``.
+    Segments falling outside the window, or the ones farthest from the
+    playhead when over budget, are evicted and their files deleted. Safe to
+    use from network callback threads.
+    """
+
+    def __init__(self, look_ahead: float = 60.0, look_behind: float = 10.0,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.look_ahead = look_ahead
+        self.look_behind = look_behind
+        self.max_bytes = max_bytes
+        self.segment_length = 1
+        self.total_segments = 0
+        self.playhead = 0
+
+        self._segments: Dict[int, str] = {}
+        self._sizes: Dict[int, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    def configure(self, segment_length: int, total_segments: int) -> None:
+        """Reset for a new video"""
+        self.clear()
+        with self._lock:
+            self.segment_length = max(segment_length, 1)
+            self.total_segments = total_segments
+            self.playhead = 0
+
+    def _segments_for(self, seconds: float) -> int:
+        return max(int(seconds // self.segment_length), 1)
+
+    def window(self) -> range:
+        """Segment ids that may stay buffered for the current playhead"""
+        with self._lock:
+            first = max(self.playhead - self._segments_for(self.look_behind), 0)
+            last = self.playhead + self._segments_for(self.look_ahead)
+            if self.total_segments:
+                last = min(last, self.total_segments - 1)
+            return range(first, last + 1)
+
+    def wanted(self, segment_id: int) -> bool:
+        return segment_id in self.window()
+
+    def missing_ahead(self) -> List[int]:
+        """Segments from the playhead onwards inside the window that are not buffered yet"""
+        with self._lock:
+            return [segment_id for segment_id in self.window()
+                    if segment_id >= self.playhead and segment_id not in self._segments]
+
+    def level(self) -> float:
+        """Seconds of contiguous buffered video after the playhead segment"""
+        with self._lock:
+            segment_id = self.playhead + 1
+            while segment_id in self._segments:
+                segment_id += 1
+            return (segment_id - self.playhead - 1) * self.segment_length
+
+    def add(self, segment_id: int, path: str) -> bool:
+        """Take ownership of a segment file; returns False if it was rejected and deleted"""
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.error(f"Buffered segment {segment_id} is not readable: {str(e)}")
+            return False
+
+        with self._lock:
+            if not self.wanted(segment_id):
+                logger.debug(f"Segment {segment_id} is outside the buffer window, dropping")
+                self._delete(path)
+                return False
+
+            previous = self._segments.get(segment_id)
+            if previous == path:
+                return True
+            if previous is not None:
+                self._remove(segment_id)
+            self._segments[segment_id] = path
+            self._sizes[segment_id] = size
+            self._bytes += size
+            self._enforce_budget()
+            return segment_id in self._segments
+
+    def get(self, segment_id: int) -> Optional[str]:
+        with self._lock:
+            path = self._segments.get(segment_id)
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    def __contains__(self, segment_id: int) -> bool:
+        with self._lock:
+            return segment_id in self._segments
+
+    def set_playhead(self, segment_id: int) -> None:
+        """Move the playhead and evict segments that left the window"""
+        with self._lock:
+            self.playhead = segment_id
+            window = self.window()
+            for buffered_id in [s for s in self._segments if s not in window]:
+                self._remove(buffered_id)
+            self._enforce_budget()
+
+    def _enforce_budget(self) -> None:
+        """Drop segments farthest from the playhead until under budget. Caller holds the lock."""
+        while self._bytes > self.max_bytes and len(self._segments) > 1:
+            farthest = max(self._segments, key=lambda s: (abs(s - self.playhead), s < self.playhead))
+            if farthest == self.playhead:
+                break
+            self._remove(farthest)
+
+    def _remove(self, segment_id: int) -> None:
+        path = self._segments.pop(segment_id)
+        self._bytes -= self._sizes.pop(segment_id)
+        logger.debug(f"Evicting buffered segment {segment_id}")
+        self._delete(path)
+
+    def discard(self, path: str) -> None:
+        """Delete a segment file that never made it into the buffer"""
+        self._delete(path)
+
+    @staticmethod
+    def _delete(path: str) -> None:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.error(f"Error deleting temp file {path}: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for segment_id in list(self._segments):
+                self._remove(segment_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'playhead': self.playhead,
+                'level': self.level(),
+            }
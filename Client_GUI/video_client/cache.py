@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .logger import logger
+
+SegmentKey = Tuple[int, int, int]  # video_id, segment_id, quality
+
+
+def _crc32_file(path: str, chunk_size: int = 1024 * 1024) -> int:
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+class SegmentCache:
+    """Persistent on-disk cache of video segments.
+
+    Segments are keyed by ``(video_id, segment_id, quality)`` and stored as
+    one file each next to a JSON index holding size, CRC32 and last access
+    time. Files are written to a temporary name and renamed into place, so
+    a crash never leaves a truncated entry behind. When the total size
+    exceeds ``max_bytes`` the least recently used segments are evicted.
+
+    A segment's checksum is verified on its first hit after startup, outside
+    the lock. The index is written at most every ``FLUSH_INTERVAL`` seconds;
+    segment files stored after the last write are checksummed and indexed
+    again on load.
+    """
+
+    INDEX_FILE = 'index.json'
+    # Write the index at most this often while segments are stored
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self, directory: str = 'cache/segments', max_bytes: int = 1024 * 1024 * 1024,
+                 verify: bool = True):
+        self.directory = directory
+        self.temp_dir = os.path.join(directory, 'tmp')
+        self.max_bytes = max_bytes
+        self.verify = verify
+
+        self._entries: 'OrderedDict[SegmentKey, dict]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Entries whose file has been checksummed since startup
+        self._verified = set()
+        self._dirty = False
+        self._flushed_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.corrupt = 0
+
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self._load_index()
+        logger.info(f"Segment cache at {directory}: {len(self._entries)} segments, {self._size} bytes")
+
+    @staticmethod
+    def _name(key: SegmentKey) -> str:
+        return '{}_{}_{}.mp4'.format(*key)
+
+    def _path(self, key: SegmentKey) -> str:
+        return os.path.join(self.directory, self._name(key))
+
+    @staticmethod
+    def _key(name: str) -> Optional[SegmentKey]:
+        """Inverse of ``_name``; None for files the cache did not name"""
+        try:
+            video_id, segment_id, quality = (int(part) for part in name[:-len('.mp4')].split('_'))
+        except ValueError:
+            return None
+        return video_id, segment_id, quality
+
+    def _load_index(self) -> None:
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            records = []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Segment cache index unreadable, starting empty: {str(e)}")
+            records = []
+
+        entries = {}
+        for record in records:
+            key = (record['video_id'], record['segment_id'], record['quality'])
+            path = self._path(key)
+            if not os.path.exists(path) or os.path.getsize(path) != record['size']:
+                continue
+            entries[key] = record
+
+        # Segments stored after the last index write. Files are renamed into
+        # place only once complete, so they are indexed with a fresh checksum
+        for name in os.listdir(self.directory):
+            if not name.endswith('.mp4'):
+                continue
+            key = self._key(name)
+            if key in entries:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if key is None or name != self._name(key):
+                    raise OSError(f"unexpected file name {name}")
+                entries[key] = {
+                    'video_id': key[0],
+                    'segment_id': key[1],
+                    'quality': key[2],
+                    'size': os.path.getsize(path),
+                    'crc32': _crc32_file(path) if self.verify else 0,
+                    'atime': os.path.getmtime(path),
+                }
+                self._verified.add(key)
+                self._dirty = True
+            except OSError as e:
+                logger.warning(f"Removing unindexed cache file {name}: {str(e)}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        for key, record in sorted(entries.items(), key=lambda item: item[1]['atime']):
+            self._entries[key] = record
+            self._size += record['size']
+        with self._lock:
+            # Recovered files may exceed the budget
+            self._evict()
+
+        # Leftovers from interrupted writes
+        for name in os.listdir(self.temp_dir):
+            try:
+                os.remove(os.path.join(self.temp_dir, name))
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Write the index atomically"""
+        with self._lock:
+            records = [dict(record) for record in self._entries.values()]
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+        fd, tmp_path = tempfile.mkstemp(dir=self.temp_dir, suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            os.replace(tmp_path, os.path.join(self.directory, self.INDEX_FILE))
+        except OSError as e:
+            logger.error(f"Error writing segment cache index: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _flush_if_due(self) -> None:
+        with self._lock:
+            due = self._dirty and time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def _drop(self, key: SegmentKey) -> None:
+        """Remove an entry and its file. Caller holds the lock."""
+        record = self._entries.pop(key, None)
+        if record is None:
+            return
+        self._verified.discard(key)
+        self._dirty = True
+        self._size -= record['size']
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            logger.error(f"Error deleting cached segment {key}: {str(e)}")
+
+    def lookup(self, video_id: int, segment_id: int, quality: int) -> Optional[str]:
+        """Return the path of a valid cached segment, or None on a miss"""
+        key = (video_id, segment_id, quality)
+        with self._lock:
+            record = self._entries.get(key)
+            if record is None:
+                self.misses += 1
+                return None
+            check_crc = self.verify and key not in self._verified
+
+        # Disk reads run unlocked, so other lookups do not queue behind them
+        path = self._path(key)
+        try:
+            valid = os.path.getsize(path) == record['size'] and \
+                (not check_crc or _crc32_file(path) == record['crc32'])
+        except OSError:
+            valid = False
+
+        with self._lock:
+            if self._entries.get(key) is not record:
+                # Replaced or evicted meanwhile
+                self.misses += 1
+                return None
+            if not valid:
+                logger.warning(f"Cached segment {key} failed integrity check")
+                self._drop(key)
+                self.corrupt += 1
+                self.misses += 1
+                return None
+            if check_crc:
+                self._verified.add(key)
+
+            record['atime'] = time.time()
+            self._dirty = True
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def _temp_name(self) -> str:
+        return os.path.join(self.temp_dir, uuid.uuid4().hex + '.mp4')
+
+    @staticmethod
+    def _link_or_copy(source: str, destination: str) -> None:
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def checkout(self, video_id: int, segment_id: int, quality: int) -> Optional[str]:
+        """Hand out a private copy (a hard link where possible) of a cached segment.
+
+        The caller owns the returned file and may delete it; the cache entry
+        is unaffected.
+        """
+        path = self.lookup(video_id, segment_id, quality)
+        if path is None:
+            return None
+        copy_path = self._temp_name()
+        self._link_or_copy(path, copy_path)
+        return copy_path
+
+    def store(self, video_id: int, segment_id: int, quality: int, source_path: str) -> None:
+        """Add a downloaded segment file to the cache; ``source_path`` is left in place.
+
+        Files created in ``temp_dir`` are on the cache filesystem and get
+        hard-linked in instead of copied.
+        """
+        key = (video_id, segment_id, quality)
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            return
+
+        tmp_path = self._temp_name()
+        try:
+            self._link_or_copy(source_path, tmp_path)
+            crc = _crc32_file(tmp_path) if self.verify else 0
+
+            with self._lock:
+                self._drop(key)
+                os.replace(tmp_path, self._path(key))
+                self._entries[key] = {
+                    'video_id': video_id,
+                    'segment_id': segment_id,
+                    'quality': quality,
+                    'size': size,
+                    'crc32': crc,
+                    'atime': time.time(),
+                }
+                self._size += size
+                self._dirty = True
+                # Checksummed above
+                self._verified.add(key)
+                self._evict()
+        except OSError as e:
+            logger.error(f"Error caching segment {key}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._flush_if_due()
+
+    def _evict(self) -> None:
+        """Evict least recently used segments over the size budget. Caller holds the lock."""
+        while self._size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+            logger.debug(f"Evicted cached segment {key}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'segments': len(self._entries),
+                'size': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'corrupt': self.corrupt,
+            }
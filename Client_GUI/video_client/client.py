@@ -1,37 +1,62 @@
 import sys
 import os
-import tempfile
 from datetime import timedelta
-from PyQt5.QtCore import QTimer, QUrl, Qt
-from PyQt5.QtWidgets import (QApplication, QMessageBox, QDialog, QShortcut,
-                             QProgressDialog, QFileDialog)
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtWidgets import QMessageBox, QDialog, QShortcut, QProgressDialog
 from PyQt5.QtGui import QKeySequence
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtMultimediaWidgets import QVideoWidget
+from PyQt5.QtMultimedia import QMediaPlayer
 
-from player import VideoPlayer
+from .player import VideoPlayer
 from .network import NetworkClient
+from .cache import SegmentCache
+from .upload import UploadJournal
+from .metadata import MetadataCache
+from .tasks import TaskRunner
+from .models import VideoListModel, ChannelListModel
 from .ui import (VideoPlayerUI, LoginDialog, RegisterDialog,
-                 UserAccountDialog, UploadDialog, EditVideoDialog,
+                 UserAccountDialog,
                  ChannelDialog, CreateChannelDialog, ChannelInfoDialog)
 from .logger import logger
 
 
 class VideoClient:
+    # Quiet time on a dragged slider before seeking
+    SEEK_DEBOUNCE_MS = 150
+    # Videos requested at a time while the list is scrolled
+    VIDEO_PAGE_SIZE = 100
+    # Multiplex info requests over one connection; only for servers that
+    # implement HELLO, others would be probed once on the first connect
+    PIPELINING = False
+    # Journal uploads so they resume after a dropped connection or a restart;
+    # needs the UPLOAD_BEGIN/QUERY/CHUNK/FINISH commands on the server
+    RESUMABLE_UPLOADS = False
+
     def __init__(self):
-        self.network = NetworkClient()
+        self.metadata = MetadataCache()
+        journal = UploadJournal() if self.RESUMABLE_UPLOADS else None
+        self.network = NetworkClient(segment_cache=SegmentCache(), upload_journal=journal,
+                                     metadata=self.metadata, pipelining=self.PIPELINING)
+        self.tasks = TaskRunner()
         self.ui = VideoPlayerUI()
+        self.video_model = VideoListModel(self.tasks)
+        self.ui.video_list_widget.setModel(self.video_model)
         self.setup_player()
         self.current_video_id = None
-        self.video_list = []
-        self.user_videos = []
-        self.channels = []
+        # One model per list, kept between dialog openings
+        self.user_video_model = VideoListModel()
+        self.user_channel_model = ChannelListModel()
+        self.channel_model = ChannelListModel()
         self.position_timer = QTimer()
         self.position_timer.timeout.connect(self.update_position)
+        self.seek_timer = QTimer()
+        self.seek_timer.setSingleShot(True)
+        self.seek_timer.timeout.connect(self._seek_to_pending)
+        self._pending_seek = None
         self.is_authenticated = False
         self.current_segment = 0
         self.segment_length = 0
         self.total_segments = 0
+        self.max_quality = 0
         self.username = None
         self.current_channel_id = None
 
@@ -50,7 +75,9 @@ class VideoClient:
         # Connect signals
         self.media_player.media_player.stateChanged.connect(self.on_player_state_changed)
         self.media_player.media_player.positionChanged.connect(self.update_position)
-        self.media_player.media_player.mediaStatusChanged.connect(self.handle_media_status)
+        self.media_player.segmentStarted.connect(self.on_segment_started)
+        self.media_player.segmentFailed.connect(self.on_segment_failed)
+        self.media_player.playbackFinished.connect(self.stop_video)
 
     def _setup_ui(self):
         """Initialize UI state"""
@@ -71,8 +98,10 @@ class VideoClient:
         self.ui.play_btn.clicked.connect(self.play_video)
         self.ui.pause_btn.clicked.connect(self.pause_video)
         self.ui.stop_btn.clicked.connect(self.stop_video)
-        self.ui.video_list_widget.itemClicked.connect(self.select_video)
-        self.ui.progress_slider.sliderMoved.connect(self.seek_video)
+        self.ui.video_list_widget.clicked.connect(self.select_video)
+        self.video_model.loadFailed.connect(self._on_video_list_error)
+        self.ui.progress_slider.sliderMoved.connect(self.on_slider_moved)
+        self.ui.progress_slider.sliderReleased.connect(self.on_slider_released)
 
     def _setup_shortcuts(self):
         """Setup keyboard shortcuts"""
@@ -110,28 +139,45 @@ class VideoClient:
             host, port = server_address.split(':')
             self.network.host = host
             self.network.port = int(port)
-
-            if self.network.connect():
-                self.ui.connect_btn.setEnabled(False)
-                self.ui.disconnect_btn.setEnabled(True)
-                self.ui.login_btn.setEnabled(True)
-                self.ui.register_btn.setEnabled(True)
-                self.load_video_list()
-                self.ui.status_label.setText("Успешно подключено к серверу")
-        except Exception as e:
+        except ValueError as e:
             self.ui.status_label.setText(f"Ошибка подключения: {str(e)}")
             logger.error(f"Connection error: {str(e)}")
+            return
+
+        self.ui.connect_btn.setEnabled(False)
+        self.ui.status_label.setText("Подключение...")
+        self.tasks.run(self.network.connect, on_result=self._on_connected,
+                       on_error=self._on_connect_error)
+
+    def _on_connected(self, connected):
+        if connected:
+            self.ui.disconnect_btn.setEnabled(True)
+            self.ui.login_btn.setEnabled(True)
+            self.ui.register_btn.setEnabled(True)
+            self.load_video_list()
+            self.ui.status_label.setText("Успешно подключено к серверу")
+        else:
+            self.ui.connect_btn.setEnabled(True)
+            self.ui.status_label.setText("Не удалось подключиться к серверу")
+
+    def _on_connect_error(self, e):
+        self.ui.connect_btn.setEnabled(True)
+        self.ui.status_label.setText(f"Ошибка подключения: {str(e)}")
 
     def disconnect_from_server(self):
         """Disconnect from server"""
         try:
             self.network.disconnect()
+            self.metadata.clear()
             self.ui.connect_btn.setEnabled(True)
             self.ui.disconnect_btn.setEnabled(False)
             self.ui.login_btn.setEnabled(False)
             self.ui.register_btn.setEnabled(False)
             self.ui.set_auth_state(False)
-            self.ui.video_list_widget.clear()
+            self.video_model.clear()
+            self.user_video_model.clear()
+            self.user_channel_model.clear()
+            self.channel_model.clear()
             self.ui.video_info_label.setText("Выберите видео из списка")
             self.ui.status_label.setText("Отключено от сервера")
             self.stop_video()
@@ -143,8 +189,10 @@ class VideoClient:
 
     def _perform_login(self, username, password):
         """Internal method to perform login with credentials"""
-        try:
-            self.is_authenticated = self.network.login(username, password)
+        self.ui.status_label.setText("Выполняется вход...")
+
+        def on_result(success):
+            self.is_authenticated = bool(success)
             self.ui.set_auth_state(self.is_authenticated)
 
             if self.is_authenticated:
@@ -158,9 +206,10 @@ class VideoClient:
             else:
                 self.ui.status_label.setText("Неверные данные для входа")
 
-        except Exception as e:
+        def on_error(e):
             self.ui.status_label.setText(f"Ошибка авторизации: {str(e)}")
-            logger.error(f"Auth error: {str(e)}")
+
+        self.tasks.run(self.network.login, username, password, on_result=on_result, on_error=on_error)
 
     def handle_auth(self):
         """Handle user authentication"""
@@ -196,39 +245,54 @@ class VideoClient:
         register_dialog = RegisterDialog(self.ui.main_widget)
         if register_dialog.exec_() == QDialog.Accepted:
             username, password = register_dialog.get_credentials()
-            try:
-                success = self.network.register(username, password)
+
+            def on_result(success):
                 if success:
                     self.ui.status_label.setText("Регистрация успешна. Выполняется вход...")
                     self._perform_login(username, password)
                 else:
                     self.ui.status_label.setText("Ошибка регистрации (возможно, имя уже занято)")
-            except Exception as e:
+
+            def on_error(e):
                 self.ui.status_label.setText(f"Ошибка регистрации: {str(e)}")
-                logger.error(f"Registration error: {str(e)}")
+
+            self.tasks.run(self.network.register, username, password,
+                           on_result=on_result, on_error=on_error)
 
     def show_user_account(self):
         """Show user account dialog"""
         if not self.is_authenticated:
             return
 
-        dialog = UserAccountDialog(self.ui.main_widget)
+        dialog = UserAccountDialog(self.ui.main_widget, self.user_video_model, self.user_channel_model)
 
-        # Загружаем каналы пользователя
-        try:
-            user_channels = self.network.get_user_channels_by_user(self.username)
-            dialog.set_channels(user_channels)
-        except Exception as e:
+        # Сразу показываем каналы из кэша, даже устаревшие, и обновляем их в фоне
+        shown = self.metadata.get('user_channels_by', self.username, stale=True)
+        if shown is not None:
+            self.user_channel_model.update(shown)
+
+        def on_channels(user_channels):
+            if user_channels is None:
+                if shown is None:
+                    QMessageBox.warning(dialog, "Ошибка", "Не удалось загрузить каналы пользователя")
+                return
+            # Only rows that differ are touched, the selection is kept
+            self.user_channel_model.update(user_channels)
+
+        def on_error(e):
             logger.error(f"Error loading user channels: {str(e)}")
-            QMessageBox.warning(self.ui.main_widget, "Ошибка", "Не удалось загрузить каналы пользователя")
+            QMessageBox.warning(dialog, "Ошибка", "Не удалось загрузить каналы пользователя")
+
+        self.tasks.run(self.network.get_user_channels_by_user, self.username,
+                       on_result=on_channels, on_error=on_error)
 
-        dialog.set_videos(self.user_videos)
         if dialog.exec_() == QDialog.Accepted:
             selected_video = dialog.get_selected_video()
             if selected_video:
                 self.current_video_id, video_info = selected_video
                 self.segment_length = video_info.segment_length
                 self.total_segments = video_info.segment_amount
+                self.max_quality = video_info.max_quality
                 self.ui.play_btn.setEnabled(True)
                 self.update_video_info(video_info)
 
@@ -238,17 +302,33 @@ class VideoClient:
             QMessageBox.warning(self.ui.main_widget, "Ошибка", "Необходимо авторизоваться")
             return
 
-        dialog = ChannelDialog(self.ui.main_widget)
+        dialog = ChannelDialog(self.ui.main_widget, self.channel_model)
+
+        shown = self.metadata.get('user_channels', self.network.token, stale=True)
+        if shown is not None:
+            self.channel_model.update(shown)
+
+        def on_channels(channels):
+            if channels is not None:
+                self.channel_model.update(channels)
+
+        def on_error(e):
+            logger.error(f"Error loading channels: {str(e)}")
+
+        self.tasks.run(self.network.get_user_channels, on_result=on_channels, on_error=on_error)
         dialog.exec_()
 
-    def handle_channel_double_click(self, item):
+    def handle_channel_double_click(self, index):
         """Handle double click on channel item"""
-        channel_id = item.data(Qt.UserRole)
-        channel_info = self.network.get_channel_info(channel_id)
-        if channel_info:
-            info_dialog = ChannelInfoDialog(self.ui.main_widget)
-            info_dialog.set_channel_info(channel_info)
-            info_dialog.exec_()
+        channel_id, _ = index.data(ChannelListModel.EntryRole)
+
+        def on_channel_info(channel_info):
+            if channel_info:
+                info_dialog = ChannelInfoDialog(self.ui.main_widget)
+                info_dialog.set_channel_info(channel_info)
+                info_dialog.exec_()
+
+        self.tasks.run(self.network.get_channel_info, channel_id, on_result=on_channel_info)
 
     def create_channel(self):
         """Create new channel"""
@@ -259,8 +339,8 @@ class VideoClient:
         dialog = CreateChannelDialog(self.ui.main_widget)
         if dialog.exec_() == QDialog.Accepted:
             name, description = dialog.get_channel_info()
-            try:
-                channel_id = self.network.create_channel(name, description)
+
+            def on_result(channel_id):
                 if channel_id:
                     QMessageBox.information(self.ui.main_widget, "Успех",
                                           f"Канал '{name}' создан (ID: {channel_id})")
@@ -268,68 +348,82 @@ class VideoClient:
                 else:
                     QMessageBox.critical(self.ui.main_widget, "Ошибка",
                                        "Не удалось создать канал")
-            except Exception as e:
+
+            def on_error(e):
                 QMessageBox.critical(self.ui.main_widget, "Ошибка",
                                    f"Ошибка при создании канала: {str(e)}")
-                logger.error(f"Create channel error: {str(e)}")
+
+            self.tasks.run(self.network.create_channel, name, description,
+                           on_result=on_result, on_error=on_error)
 
     def load_video_list(self):
-        """Load list of available videos"""
-        try:
-            self.video_list = self.network.get_video_list()
-            if self.video_list:
-                self.ui.video_list_widget.clear()
-                for video_id, video_info in self.video_list:
-                    self.ui.video_list_widget.addItem(f"{video_id}: {video_info.title}")
-        except Exception as e:
-            logger.error(f"Ошибка загрузки списка видео: {str(e)}")
-            QMessageBox.critical(self.ui.main_widget, "Ошибка",
-                               f"Не удалось загрузить список видео: {str(e)}")
+        """Load list of available videos page by page as the list is scrolled"""
+        self.video_model.set_pages(self.network.iter_video_pages(self.VIDEO_PAGE_SIZE))
+
+    def _show_video_list(self, videos):
+        """Show a complete list of videos (e.g. of one channel)"""
+        # Rows already shown stay, an unchanged list emits nothing
+        if videos:
+            self.video_model.set_videos(videos)
+
+    def _on_video_list_error(self, e):
+        logger.error(f"Ошибка загрузки списка видео: {str(e)}")
+        QMessageBox.critical(self.ui.main_widget, "Ошибка",
+                           f"Не удалось загрузить список видео: {str(e)}")
 
     def load_user_videos(self):
         """Load user's videos"""
         if not self.is_authenticated:
             return
 
-        try:
-            self.user_videos = self.network.get_user_videos()
-        except Exception as e:
+        def on_result(videos):
+            self.user_video_model.set_videos(videos or [])
+
+        def on_error(e):
             logger.error(f"Ошибка загрузки пользовательских видео: {str(e)}")
-            self.user_videos = []
+            self.user_video_model.clear()
+
+        self.tasks.run(self.network.get_user_videos, on_result=on_result, on_error=on_error)
 
     def load_user_channels(self):
         """Load user's channels"""
         if not self.is_authenticated:
             return
 
-        try:
-            self.channels = self.network.get_user_channels()
-        except Exception as e:
+        def on_result(channels):
+            self.channel_model.update(channels or [])
+
+        def on_error(e):
             logger.error(f"Ошибка загрузки каналов пользователя: {str(e)}")
-            self.channels = []
+            self.channel_model.clear()
+
+        self.tasks.run(self.network.get_user_channels, on_result=on_result, on_error=on_error)
 
     def load_channel_videos(self, channel_id):
         """Load videos for specific channel"""
-        try:
-            video_ids = self.network.get_channel_videos(channel_id)
-            if video_ids:
-                self.ui.video_list_widget.clear()
-                for video_id in video_ids:
-                    video_info = self.network.get_video_info(video_id)
-                    if video_info:
-                        self.ui.video_list_widget.addItem(f"{video_id}: {video_info.title}")
-        except Exception as e:
+        def on_error(e):
             logger.error(f"Ошибка загрузки видео канала: {str(e)}")
             QMessageBox.critical(self.ui.main_widget, "Ошибка",
                                f"Не удалось загрузить видео канала: {str(e)}")
 
-    def select_video(self, item):
+        self.tasks.run(self._fetch_channel_videos, channel_id,
+                       on_result=self._show_video_list, on_error=on_error)
+
+    def _fetch_channel_videos(self, channel_id):
+        """Fetch channel video ids, then all their infos in one batch request"""
+        video_ids = self.network.get_channel_videos(channel_id)
+        if not video_ids:
+            return None
+        return self.network.get_video_infos(video_ids)
+
+    def select_video(self, index):
         """Handle video selection from list"""
-        index = self.ui.video_list_widget.row(item)
-        if index < len(self.video_list):
-            self.current_video_id, video_info = self.video_list[index]
+        entry = self.video_model.video_at(index.row())
+        if entry is not None:
+            self.current_video_id, video_info = entry
             self.segment_length = video_info.segment_length
             self.total_segments = video_info.segment_amount
+            self.max_quality = video_info.max_quality
             self.ui.play_btn.setEnabled(True)
             self.update_video_info(video_info)
 
@@ -353,64 +447,27 @@ class VideoClient:
         if not self.current_video_id:
             return
 
-        try:
-            self.current_segment = 0
-            segment_data = self.network.get_video_segment(
-                self.current_video_id,
-                self.current_segment,
-                1  # Quality level
-            )
-
-            if segment_data:
-                # Set total duration for the slider
-                total_duration = self.total_segments * self.segment_length * 1000
-                self.ui.progress_slider.setMaximum(total_duration)
-
-                self.media_player.play_segment(segment_data, self.current_segment)
-                self.ui.play_btn.setEnabled(False)
-                self.ui.pause_btn.setEnabled(True)
-                self.ui.stop_btn.setEnabled(True)
-                self.ui.status_label.setText(
-                    f"Воспроизведение: сегмент {self.current_segment + 1}/{self.total_segments}")
-
-                # Preload next segment
-                if self.total_segments > 1:
-                    self.media_player.buffer_next_segment(
-                        self.current_video_id,
-                        self.current_segment + 1,
-                        1,
-                        self.total_segments
-                    )
-        except Exception as e:
-            logger.error(f"Play video error: {str(e)}")
-
-    def handle_media_status(self, status):
-        """Handle media status changes"""
-        if status == QMediaPlayer.EndOfMedia:
-            self.current_segment += 1
-            if self.current_segment < self.total_segments:
-                # Play next segment
-                segment_data = self.network.get_video_segment(
-                    self.current_video_id,
-                    self.current_segment,
-                    1
-                )
-
-                if segment_data:
-                    self.media_player.play_segment(segment_data, self.current_segment)
-                    self.ui.status_label.setText(
-                        f"Воспроизведение: сегмент {self.current_segment + 1}/{self.total_segments}")
-
-                    # Preload next segment if available
-                    if self.current_segment + 1 < self.total_segments:
-                        self.media_player.buffer_next_segment(
-                            self.current_video_id,
-                            self.current_segment + 1,
-                            1,
-                            self.total_segments
-                        )
-            else:
-                self.stop_video()
+        self.current_segment = 0
+        self.media_player.configure_stream(self.segment_length, self.total_segments, self.max_quality)
+        # Set total duration for the slider
+        total_duration = self.total_segments * self.segment_length * 1000
+        self.ui.progress_slider.setMaximum(total_duration)
+
+        self.media_player.start_video(self.current_video_id, self.current_segment)
+        self.ui.play_btn.setEnabled(False)
+        self.ui.pause_btn.setEnabled(True)
+        self.ui.stop_btn.setEnabled(True)
+        self.ui.status_label.setText("Загрузка...")
+
+    def on_segment_started(self, segment_id):
+        """The player moved on to ``segment_id``"""
+        self.current_segment = segment_id
+        self.ui.status_label.setText(
+            f"Воспроизведение: сегмент {self.current_segment + 1}/{self.total_segments}")
+
+    def on_segment_failed(self, segment_id):
+        self.ui.status_label.setText(f"Не удалось загрузить сегмент {segment_id + 1}")
+        QMessageBox.warning(self.ui.main_widget, "Ошибка", "Не удалось загрузить сегмент видео")
 
     def update_position(self, position=None):
         """Update playback position display"""
@@ -421,9 +478,10 @@ class VideoClient:
         total_ms = (self.current_segment * self.segment_length * 1000) + position
         total_duration = self.total_segments * self.segment_length * 1000
 
-        # Update slider with total position
+        # Update slider with total position, unless the user is dragging it
         self.ui.progress_slider.setMaximum(total_duration)
-        self.ui.progress_slider.setValue(total_ms)
+        if not self.ui.progress_slider.isSliderDown():
+            self.ui.progress_slider.setValue(total_ms)
 
         # Update time labels
         total_seconds = total_ms // 1000
@@ -436,8 +494,25 @@ class VideoClient:
         dur_seconds = total_duration_seconds % 60
         self.ui.duration.setText(f"{dur_minutes:02d}:{dur_seconds:02d}")
 
+    def on_slider_moved(self, position):
+        """Seek once the slider has been still for a moment while dragging"""
+        self._pending_seek = position
+        self.seek_timer.start(self.SEEK_DEBOUNCE_MS)
+
+    def on_slider_released(self):
+        self.seek_timer.stop()
+        self.seek_video(self.ui.progress_slider.value())
+
+    def _seek_to_pending(self):
+        if self._pending_seek is not None:
+            self.seek_video(self._pending_seek)
+
     def seek_video(self, position):
         """Seek to specific position in video"""
+        self._pending_seek = None
+        if not self.current_video_id or not self.segment_length:
+            return
+
         segment_ms = self.segment_length * 1000
         new_segment = position // segment_ms
         segment_pos = position % segment_ms
@@ -445,30 +520,8 @@ class VideoClient:
         if new_segment >= self.total_segments:
             return  # Don't seek beyond the end
 
-        if new_segment != self.current_segment:
-            self.current_segment = new_segment
-            segment_data = self.network.get_video_segment(
-                self.current_video_id,
-                self.current_segment,
-                1
-            )
-
-            if segment_data:
-                self.media_player.play_segment(segment_data, self.current_segment)
-                self.media_player.media_player.setPosition(segment_pos)
-                self.ui.status_label.setText(
-                    f"Воспроизведение: сегмент {self.current_segment + 1}/{self.total_segments}")
-
-                # Preload next segment if available
-                if self.current_segment + 1 < self.total_segments:
-                    self.media_player.buffer_next_segment(
-                        self.current_video_id,
-                        self.current_segment + 1,
-                        1,
-                        self.total_segments
-                    )
-        else:
-            self.media_player.media_player.setPosition(segment_pos)
+        self.current_segment = new_segment
+        self.media_player.seek(new_segment, segment_pos)
 
     def pause_video(self):
         """Pause video playback"""
@@ -504,35 +557,24 @@ class VideoClient:
 
     def handle_video_upload(self, video_info):
         """Handle video upload"""
-        try:
-            if not hasattr(video_info, 'file_path') or not video_info.file_path:
-                QMessageBox.warning(self.ui.main_widget, "Ошибка", "Файл не выбран")
-                return
+        if not hasattr(video_info, 'file_path') or not video_info.file_path:
+            QMessageBox.warning(self.ui.main_widget, "Ошибка", "Файл не выбран")
+            return
 
-            if not os.path.exists(video_info.file_path):
-                QMessageBox.warning(self.ui.main_widget, "Ошибка", "Выбранный файл не существует")
-                return
+        if not os.path.exists(video_info.file_path):
+            QMessageBox.warning(self.ui.main_widget, "Ошибка", "Выбранный файл не существует")
+            return
 
-            progress_dialog = QProgressDialog(
-                "Загрузка видео...", "Отмена", 0, 100, self.ui.main_widget)
-            progress_dialog.setWindowTitle("Загрузка")
-            progress_dialog.setWindowModality(Qt.WindowModal)
-            progress_dialog.show()
-
-            def upload_callback(progress):
-                progress_dialog.setValue(progress)
-                QApplication.processEvents()
-                return not progress_dialog.wasCanceled()
-
-            video_id = self.network.upload_video(
-                self.current_channel_id,
-                video_info.title,
-                video_info.description,
-                video_info.file_path,
-                upload_callback
-            )
-            progress_dialog.close()
+        progress_dialog = QProgressDialog(
+            "Загрузка видео...", "Отмена", 0, 100, self.ui.main_widget)
+        progress_dialog.setWindowTitle("Загрузка")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.show()
 
+        def on_result(video_id):
+            progress_dialog.close()
             if video_id:
                 QMessageBox.information(
                     self.ui.main_widget, "Успех",
@@ -544,32 +586,32 @@ class VideoClient:
                     self.ui.main_widget, "Ошибка",
                     "Загрузка отменена или произошла ошибка")
 
-        except Exception as e:
+        def on_error(e):
+            progress_dialog.close()
             QMessageBox.critical(
                 self.ui.main_widget, "Ошибка",
                 f"Не удалось загрузить видео: {str(e)}")
-            logger.error(f"Upload error: {str(e)}", exc_info=True)
 
-    def edit_video_info(self, video_id, title, description):
-        """Edit video information"""
-        try:
-            if not title.strip():
-                QMessageBox.warning(self.ui.main_widget, "Ошибка", "Название не может быть пустым")
-                return False
-
-            success = self.network.edit_video(video_id, title, description)
-            if success:
-                QMessageBox.information(self.ui.main_widget, "Успех",
-                                      "Информация о видео обновлена")
-                self.load_user_videos()
-                self.load_video_list()
-                return True
-            else:
-                QMessageBox.critical(self.ui.main_widget, "Ошибка",
-                                   "Не удалось обновить информацию о видео")
-                return False
-        except Exception as e:
-            QMessageBox.critical(self.ui.main_widget, "Ошибка",
-                               f"Ошибка при обновлении видео: {str(e)}")
-            logger.error(f"Edit video error: {str(e)}")
-            return False
\ No newline at end of file
+        kwargs = {}
+        if getattr(video_info, 'transcode_locally', False):
+            # Segments are encoded here and become playable while the rest uploads
+            upload = self.network.upload_video_segmented
+            kwargs['segment_length'] = video_info.segment_length
+            progress_dialog.setLabelText("Обработка и загрузка видео...")
+        else:
+            upload = self.network.upload_video
+
+        # The upload runs on a worker thread; progress arrives through a queued signal
+        task = self.tasks.run(
+            upload,
+            self.current_channel_id,
+            video_info.title,
+            video_info.description,
+            video_info.file_path,
+            progress=True,
+            on_result=on_result,
+            on_error=on_error,
+            on_progress=progress_dialog.setValue,
+            **kwargs,
+        )
+        progress_dialog.canceled.connect(task.cancel)
\ No newline at end of file
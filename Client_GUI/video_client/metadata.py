@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Optional, Any, Dict, Tuple, Hashable
+
+from .protocols import VideoInfo, ChannelInfo
+from .logger import logger
+
+MetadataKey = Tuple[str, Hashable]  # kind, key
+
+
+def _fingerprint(value: Any) -> Any:
+    """Comparable form of a cached value, used to detect unchanged responses"""
+    if isinstance(value, (VideoInfo, ChannelInfo)):
+        return value.to_bytes()
+    if isinstance(value, (list, tuple)):
+        return tuple(_fingerprint(item) for item in value)
+    return value
+
+
+class MetadataCache:
+    """In-memory cache of video and channel metadata.
+
+    Used by ``NetworkClient``, entries are keyed by kind and id:
+
+    - ``video``: video id -> VideoInfo
+    - ``channel``: channel id -> ChannelInfo
+    - ``video_list``: token -> list of (video id, VideoInfo)
+    - ``channel_videos``: channel id -> list of video ids
+    - ``user_channels``: token -> list of (channel id, ChannelInfo)
+    - ``user_channels_by``: username -> list of (channel id, ChannelInfo)
+
+    Fresh entries (younger than their kind's TTL) are answered without
+    asking the server. Lists also fill the per-id entries, so opening a
+    channel only fetches infos of videos not seen yet. When a refetched
+    value equals the cached one, ``put`` returns the cached object itself;
+    callers can compare by identity and skip redrawing. Commands that
+    change metadata invalidate the affected entries through the
+    ``after_*`` hooks.
+    """
+
+    DEFAULT_TTLS = {
+        'video': 300.0,
+        'channel': 120.0,
+        'video_list': 30.0,
+        'channel_videos': 60.0,
+        'user_channels': 60.0,
+        'user_channels_by': 60.0,
+    }
+    # List kinds whose items are cached by id as well
+    ITEM_KINDS = {
+        'video_list': 'video',
+        'user_channels': 'channel',
+        'user_channels_by': 'channel',
+    }
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None):
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        # key -> (value, fingerprint, stored_at)
+        self._entries: Dict[MetadataKey, Tuple[Any, Any, float]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.unchanged = 0
+
+    def get(self, kind: str, key: Hashable = None, stale: bool = False) -> Optional[Any]:
+        """Cached value, None if missing or expired (unless ``stale`` is allowed)"""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None or (not stale and time.monotonic() - entry[2] > self.ttls[kind]):
+                if not stale:
+                    self.misses += 1
+                return None
+            if not stale:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, kind: str, key: Hashable, value: Any) -> Any:
+        """Store a fetched value; returns the cached object if nothing changed"""
+        fingerprint = _fingerprint(value)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[1] == fingerprint:
+                value = entry[0]
+                self.unchanged += 1
+            self._entries[(kind, key)] = (value, fingerprint, now)
+
+            item_kind = self.ITEM_KINDS.get(kind)
+            if item_kind:
+                for item_id, item in value:
+                    self._entries[(item_kind, item_id)] = (item, _fingerprint(item), now)
+        return value
+
+    def invalidate(self, kind: str, key: Hashable = None, all_keys: bool = False) -> None:
+        """Drop the ``key`` entry of ``kind``, or every entry of it with ``all_keys``"""
+        with self._lock:
+            if all_keys:
+                for entry_key in [k for k in self._entries if k[0] == kind]:
+                    del self._entries[entry_key]
+            else:
+                self._entries.pop((kind, key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def after_upload(self, channel_id: int) -> None:
+        """A video was added to ``channel_id``"""
+        self.invalidate('video_list', all_keys=True)
+        self.invalidate('channel_videos', channel_id)
+        self.invalidate('channel', channel_id)
+        self.invalidate('user_channels', all_keys=True)
+        self.invalidate('user_channels_by', all_keys=True)
+        logger.debug(f"Metadata of channel {channel_id} invalidated after upload")
+
+    def after_channel_created(self) -> None:
+        self.invalidate('user_channels', all_keys=True)
+        self.invalidate('user_channels_by', all_keys=True)
+
+    def after_subscription(self, channel_id: int) -> None:
+        """Subscribing changes subscriber counts and the personal video list"""
+        self.invalidate('channel', channel_id)
+        self.invalidate('video_list', all_keys=True)
+        self.invalidate('user_channels', all_keys=True)
+        self.invalidate('user_channels_by', all_keys=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'unchanged': self.unchanged,
+            }
@@ -0,0 +1,218 @@
+from typing import Optional, Iterator, List, Tuple, Any
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+
+from .protocols import VideoInfo, ChannelInfo
+from .tasks import TaskRunner
+from .logger import logger
+
+Entry = Tuple[int, Any]  # id, info
+VideoEntry = Tuple[int, VideoInfo]
+ChannelEntry = Tuple[int, ChannelInfo]
+
+
+class EntryListModel(QAbstractListModel):
+    """Rows of ``(id, info)`` pairs, as lists come from the server and the cache.
+
+    Views ask only for the rows on screen, so no per-row text or item is
+    kept. ``update`` brings the rows in line with a newly fetched list
+    using row signals instead of a reset: rows that are gone are removed,
+    new ones inserted with ``beginInsertRows`` and rows whose info object
+    was replaced are reported as changed. A refresh that returns the
+    cached list unchanged emits nothing, and selections survive it. The
+    model keeps its own copy of the list.
+    """
+
+    # (id, info) of a row
+    EntryRole = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries: List[Entry] = []
+
+    def display_text(self, entry_id: int, info) -> str:
+        raise NotImplementedError
+
+    def tooltip_text(self, entry_id: int, info) -> Optional[str]:
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        entry_id, info = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return self.display_text(entry_id, info)
+        if role == Qt.ToolTipRole:
+            return self.tooltip_text(entry_id, info)
+        if role == self.EntryRole:
+            return self.entries[index.row()]
+        return None
+
+    def entry_at(self, row: int) -> Optional[Entry]:
+        return self.entries[row] if 0 <= row < len(self.entries) else None
+
+    def _reset(self, entries: List[Entry]) -> None:
+        self.beginResetModel()
+        self.entries = entries
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self._reset([])
+
+    def update(self, entries: List[Entry]) -> None:
+        """Show ``entries``, changing only the rows that differ"""
+        new_ids = [entry_id for entry_id, _ in entries]
+        if not self.entries or len(set(new_ids)) != len(new_ids):
+            self._reset(list(entries))
+            return
+
+        # Rows that are gone, removed bottom up in contiguous runs
+        wanted = set(new_ids)
+        row = len(self.entries)
+        while row > 0:
+            row -= 1
+            if self.entries[row][0] in wanted:
+                continue
+            last = row
+            while row > 0 and self.entries[row - 1][0] not in wanted:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row, last)
+            del self.entries[row:last + 1]
+            self.endRemoveRows()
+
+        # The rows left must keep their order, otherwise it is cheaper to reset
+        kept = {entry_id for entry_id, _ in self.entries}
+        if [entry_id for entry_id in new_ids if entry_id in kept] != [entry_id for entry_id, _ in self.entries]:
+            self._reset(list(entries))
+            return
+
+        # Walk the new list: insert runs of new ids, replace changed infos
+        changed_first = changed_last = None
+        row = 0
+        while row < len(entries):
+            if row < len(self.entries) and self.entries[row][0] == new_ids[row]:
+                if self.entries[row][1] is not entries[row][1]:
+                    self.entries[row] = entries[row]
+                    if changed_first is None:
+                        changed_first = row
+                    changed_last = row
+                row += 1
+                continue
+            end = row
+            while end < len(entries) and new_ids[end] not in kept:
+                end += 1
+            self.beginInsertRows(QModelIndex(), row, end - 1)
+            self.entries[row:row] = entries[row:end]
+            self.endInsertRows()
+            row = end
+
+        if changed_first is not None:
+            self.dataChanged.emit(self.index(changed_first), self.index(changed_last))
+
+
+class ChannelListModel(EntryListModel):
+    """Channels of the channel and account dialogs"""
+
+    def display_text(self, channel_id: int, channel_info: ChannelInfo) -> str:
+        return f"{channel_id}: {channel_info.name}"
+
+    def tooltip_text(self, channel_id: int, channel_info: ChannelInfo) -> Optional[str]:
+        return f"{channel_info.description}\nПодписчиков: {channel_info.subscribers}"
+
+
+class VideoListModel(EntryListModel):
+    """Videos of a list view.
+
+    Holds either a complete list (``set_videos``) or an iterator of pages
+    (``set_pages``, e.g. ``NetworkClient.iter_video_pages``). Pages are
+    pulled through ``canFetchMore``/``fetchMore``: the view asks for the
+    next one only when it has been scrolled to the end of the rows loaded
+    so far. Each page is fetched on a worker thread and appended with
+    ``beginInsertRows``.
+    """
+
+    VideoRole = EntryListModel.EntryRole
+
+    loadFailed = pyqtSignal(object)
+
+    def __init__(self, tasks: Optional[TaskRunner] = None, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+        self._pages: Optional[Iterator[List[VideoEntry]]] = None
+        self._loading = False
+        # Pages requested before the last reset are dropped when they arrive
+        self._generation = 0
+
+    @property
+    def videos(self) -> List[VideoEntry]:
+        return self.entries
+
+    def display_text(self, video_id: int, video_info: VideoInfo) -> str:
+        return f"{video_id}: {video_info.title}"
+
+    def tooltip_text(self, video_id: int, video_info: VideoInfo) -> Optional[str]:
+        return f"{video_info.title}\n{video_info.author}"
+
+    def video_at(self, row: int) -> Optional[VideoEntry]:
+        return self.entry_at(row)
+
+    def _stop_loading(self) -> None:
+        self._generation += 1
+        self._pages = None
+        self._loading = False
+
+    def set_videos(self, videos: List[VideoEntry]) -> None:
+        """Show a complete list, updating the rows already shown"""
+        self._stop_loading()
+        self.update(videos)
+
+    def set_pages(self, pages: Iterator[List[VideoEntry]]) -> None:
+        """Show a list loaded page by page as the view scrolls; starts loading the first page"""
+        self._stop_loading()
+        self._reset([])
+        self._pages = pages
+        self.fetchMore()
+
+    def clear(self) -> None:
+        self._stop_loading()
+        super().clear()
+
+    def is_loading(self) -> bool:
+        return self._loading
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._pages is not None and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        generation = self._generation
+        self.tasks.run(next, self._pages, None,
+                       on_result=lambda page: self._on_page(generation, page),
+                       on_error=lambda e: self._on_error(generation, e))
+
+    def _on_page(self, generation: int, page: Optional[List[VideoEntry]]) -> None:
+        if generation != self._generation:
+            return
+        self._loading = False
+        if not page:
+            # Iterator exhausted, the list is complete
+            self._pages = None
+            return
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.entries.extend(page)
+        self.endInsertRows()
+        logger.debug(f"Video list model has {len(self.entries)} rows")
+
+    def _on_error(self, generation: int, error: Exception) -> None:
+        if generation != self._generation:
+            return
+        self._loading = False
+        # A generator that raised cannot be resumed; set_pages starts over
+        self._pages = None
+        self.loadFailed.emit(error)
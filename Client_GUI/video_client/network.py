@@ -1,220 +1,634 @@
 import socket
-import struct
+import select
 import os
+import mmap
 import time
-from typing import Optional, Tuple, List, Callable
+import tempfile
 import threading
-
-from .protocols import VideoInfo, ChannelInfo, Protocol
+import queue
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple, List, Dict, Callable, Union, BinaryIO, Iterator
+
+from .protocols import (VideoInfo, ChannelInfo, Protocol, REQUESTS, encode_request,
+                        VIDEO_INFO, CHANNEL_INFO, VIDEO_LIST, VIDEO_PAGE, CHANNEL_LIST, VIDEO_IDS,
+                        VIDEO_INFO_BATCH, STATUS_ID, SIZE, OFFSET, SESSION, FRAME_HEADER, STRING)
+from .pool import ConnectionPool, Connection, SocketProfile
+from .scheduler import SegmentScheduler, SegmentRequest, PRIORITY_PREFETCH
+from .pipeline import PipelinedConnection, negotiate
+from .cache import SegmentCache
+from .metadata import MetadataCache
+from .abr import ThroughputMeter
+from .upload import AckWindow, FileSender, UploadJournal, UPLOAD_ACK_UNIT
+from .transcode import SegmentEncoder, QualityLevel, TranscodeError, find_ffmpeg
 from .logger import logger
 
+# Receive buffer used when streaming segments to disk
+SEGMENT_CHUNK_SIZE = 256 * 1024
+
+
+class _CommandUnsupported(Exception):
+    """The server does not implement one of the newer commands"""
+
 
 class NetworkClient:
-    def __init__(self, host: str = 'localhost', port: int = 8080):
+    # HELLO answers by (host, port) and feature, shared by all clients: a server
+    # without HELLO costs one probe per process, not one per connect or upload
+    _server_features: Dict[Tuple[str, int], Dict[int, bool]] = {}
+
+    def __init__(self, host: str = 'localhost', port: int = 8080, pool_size: int = 4,
+                 pipelining: bool = False, pipeline_timeout: float = 30.0,
+                 segment_cache: Optional[SegmentCache] = None,
+                 upload_window: int = 64, upload_journal: Optional[UploadJournal] = None,
+                 upload_retries: int = 5, use_sendfile: bool = True,
+                 upload_streams: int = 1, upload_range_size: int = 16 * 1024 * 1024,
+                 metadata: Optional[MetadataCache] = None,
+                 socket_profile: Optional[SocketProfile] = None):
         self.host = host
         self.port = port
-        self.socket: Optional[socket.socket] = None
+        self.pool_size = pool_size
+        # TCP options of every connection (TCP_NODELAY, buffer sizes, keepalive)
+        self.socket_profile = socket_profile or SocketProfile()
+        self.segment_cache = segment_cache
+        # Video/channel info cache
+        self.metadata = metadata
+        # Most upload chunks that may wait for an ack; 1 is plain stop-and-wait.
+        # Plain uploads only use a window with servers granting FEATURE_UPLOAD_WINDOW
+        self.upload_window = upload_window
+        # With a journal, uploads use resumable sessions when the server supports them;
+        # a server that leaves the first session command unanswered is not asked again
+        self.upload_journal = upload_journal
+        self.upload_retries = upload_retries
+        # Resumable uploads larger than one range go over this many connections at once
+        self.upload_streams = upload_streams
+        self.upload_range_size = upload_range_size
+        self._resumable_uploads: Optional[bool] = None
+        self._segmented_uploads: Optional[bool] = None
+        self._paged_lists: Optional[bool] = None
+        self._batch_infos: Optional[bool] = None
+        # Zero-copy upload of file data where the platform has sendfile
+        self.use_sendfile = use_sendfile
+        self.last_upload: Optional[dict] = None
+        self._upload_method: Optional[str] = None
+        self.pool: Optional[ConnectionPool] = None
+        # Try to negotiate request pipelining on connect (needs server support)
+        self.pipelining = pipelining
+        # Longest wait for a pipelined response or a free request slot
+        self.pipeline_timeout = pipeline_timeout
+        self.pipeline: Optional[PipelinedConnection] = None
+        self._pipeline_lock = threading.Lock()
+        self.scheduler = SegmentScheduler(self.get_video_segment_file, max_workers=pool_size,
+                                          discard=self._discard_segment_file)
+        # Segment download throughput, used for quality selection
+        self.throughput = ThroughputMeter()
         self.token: Optional[str] = None
         logger.info(f"Initializing NetworkClient for {host}:{port}")
 
     def is_connected(self) -> bool:
-        return self.socket is not None
+        return self.pool is not None and not self.pool.closed
 
     def connect(self) -> bool:
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
-            self.socket.connect((self.host, self.port))
-            self.socket.setblocking(True)
+            self._close_pipeline()
+            if self.pool is not None:
+                self.pool.close()
+            self.pool = ConnectionPool(self.host, self.port, max_size=self.pool_size,
+                                       profile=self.socket_profile)
+            # Open the first connection eagerly so that an unreachable server
+            # is reported here rather than on the first request
+            self.pool.release(self.pool.acquire())
+            if self.pipelining:
+                self._open_pipeline()
             logger.info("Successfully connected to server")
             return True
         except socket.error as e:
             logger.error(f"Connection error: {str(e)}")
-            self.socket = None
+            if self.pool is not None:
+                self.pool.close()
+            self.pool = None
             return False
-        finally:
-            if self.socket:
-                self.socket.settimeout(None)
 
     def disconnect(self) -> None:
-        if self.socket:
+        self.scheduler.cancel_all()
+        self._close_pipeline()
+        if self.segment_cache:
+            # Index writes are batched; persist what is still pending
+            self.segment_cache.flush()
+        if self.pool:
             try:
-                self.socket.shutdown(socket.SHUT_RDWR)
-                self.socket.close()
+                self.pool.close()
                 logger.info("Disconnected from server")
             except socket.error as e:
                 logger.error(f"Disconnection error: {str(e)}")
             finally:
-                self.socket = None
+                self.pool = None
                 self.token = None
 
-    def _send_all(self, data: bytes) -> None:
-        if not self.socket:
+    def pool_stats(self) -> Optional[dict]:
+        """Connection pool size and checkout wait statistics"""
+        return self.pool.stats() if self.pool else None
+
+    def is_pipelined(self) -> bool:
+        pipeline = self.pipeline
+        return pipeline is not None and not pipeline.closed
+
+    def _on_pipeline_closed(self, pipeline: PipelinedConnection) -> None:
+        """Called from the pipeline reader when its connection breaks"""
+        with self._pipeline_lock:
+            if self.pipeline is not pipeline:
+                return
+            self.pipeline = None
+        logger.warning("Pipelined connection lost, reconnecting on the next request")
+        if self.pool:
+            self.pool.release(pipeline.conn, discard=True)
+
+    def _open_pipeline(self) -> Optional[PipelinedConnection]:
+        """Switch a pooled connection to pipelined framing if the server supports it"""
+        with self._pipeline_lock:
+            if self.pipeline is not None and not self.pipeline.closed:
+                return self.pipeline
+            if self._known_features().get(Protocol.FEATURE_PIPELINING) is False:
+                return None
+
+            conn = self.pool.acquire()
+            if not self._negotiate(conn, Protocol.FEATURE_PIPELINING):
+                self.pool.release(conn)
+                return None
+            # This connection stays checked out for the multiplexed pipeline
+            self.pipeline = PipelinedConnection(conn, timeout=self.pipeline_timeout,
+                                                on_close=self._on_pipeline_closed)
+            return self.pipeline
+
+    def _known_features(self) -> Dict[int, bool]:
+        return self._server_features.setdefault((self.host, self.port), {})
+
+    def _negotiate(self, conn: Connection, feature: int) -> bool:
+        """HELLO ``feature`` on ``conn`` and remember the server's answer"""
+        known = self._known_features()
+        granted = negotiate(conn, feature)
+        if granted is None:
+            # No HELLO at all, so none of the features either
+            known[Protocol.FEATURE_PIPELINING] = False
+            known[Protocol.FEATURE_UPLOAD_WINDOW] = False
+        else:
+            known[feature] = bool(granted & feature)
+        return known[feature]
+
+    def _server_supports(self, feature: int) -> bool:
+        """Whether the server offers a capability ``feature``; asked once per host"""
+        supported = self._known_features().get(feature)
+        if supported is None:
+            with self._connection() as conn:
+                supported = self._negotiate(conn, feature)
+        return supported
+
+    def _close_pipeline(self) -> None:
+        with self._pipeline_lock:
+            pipeline, self.pipeline = self.pipeline, None
+        if pipeline is not None:
+            pipeline.close()
+            if self.pool:
+                self.pool.release(pipeline.conn, discard=True)
+
+    def _submit_pipelined(self, command: int, *values) -> Optional[Future]:
+        """Send a request over the pipeline, or return None when not pipelined"""
+        if not self.pipelining or not self.is_connected():
+            return None
+        pipeline = self.pipeline
+        if pipeline is None or pipeline.closed:
+            # Replace a pipeline that broke; a server that declined HELLO is not asked again
+            pipeline = self._open_pipeline()
+            if pipeline is None:
+                return None
+        return pipeline.submit(command, REQUESTS[command].body.pack(*values))
+
+    def _cached(self, kind: str, key=None):
+        return self.metadata.get(kind, key) if self.metadata else None
+
+    def _store(self, kind: str, key, value):
+        """Cache a fetched value; returns the cached object when it did not change"""
+        if self.metadata is None or value is None:
+            return value
+        return self.metadata.put(kind, key, value)
+
+    def _connection(self):
+        if not self.pool:
             raise ConnectionError("Not connected to server")
+        return self.pool.connection()
 
+    def _send_all(self, conn: Connection, *parts: Union[bytes, bytearray, memoryview]) -> None:
+        """Send ``parts`` back to back as one write, e.g. a request header and its payload"""
         try:
-            total_sent = 0
-            while total_sent < len(data):
-                sent = self.socket.send(data[total_sent:])
+            # Slicing a memoryview does not copy the unsent remainder
+            views = [memoryview(part).cast('B') for part in parts]
+            if len(views) > 1 and not hasattr(conn.socket, 'sendmsg'):
+                # No scatter-gather (Windows): one copy still makes a single write
+                views = [memoryview(b''.join(views))]
+            total = sum(len(view) for view in views)
+            while views:
+                if len(views) == 1:
+                    sent = conn.socket.send(views[0])
+                else:
+                    sent = conn.socket.sendmsg(views)
                 if sent == 0:
                     raise ConnectionError("Socket connection broken")
-                total_sent += sent
-            logger.debug(f"Sent {len(data)} bytes")
+                while views and sent >= len(views[0]):
+                    sent -= len(views[0])
+                    views.pop(0)
+                if views:
+                    views[0] = views[0][sent:]
+            logger.debug(f"Sent {total} bytes")
         except socket.error as e:
             logger.error(f"Error sending data: {str(e)}")
-            self.disconnect()
             raise
 
-    def _recv_all(self, size):
-        if not self.socket:
-            raise ConnectionError("Not connected to server")
+    def _recv_all(self, conn: Connection, size) -> bytearray:
+        # Small reads are served from the connection's read-ahead buffer,
+        # large ones are received straight into a buffer of the final size
         try:
-            data = bytearray()
-            while len(data) < size:
-                remaining = size - len(data)
-                packet = self.socket.recv(remaining)
-                if not packet:
-                    raise ConnectionError("Server closed connection")
-                data.extend(packet)
-            logger.debug(f"Received {len(data)} bytes")
-            return bytes(data)
+            return conn.reader.readexactly(size)
         except socket.error as e:
             logger.error(f"Error receiving data: {str(e)}")
-            self.disconnect()
             raise
 
-    def get_video_segment(self, video_id: int, segment_id: int, quality: int) -> Optional[bytes]:
+    def _read(self, conn: Connection, codec):
+        """Decode one schema value (see protocols) straight off the connection"""
+        return codec.read(lambda size: self._recv_all(conn, size))
+
+    def get_video_segment(self, video_id: int, segment_id: int,
+                          quality: int) -> Optional[Union[bytearray, memoryview]]:
+        if self.segment_cache:
+            # Served from (and added to) the cache through a private file copy,
+            # mapped instead of read so a hit does not copy the segment
+            path = self.get_video_segment_file(video_id, segment_id, quality)
+            if path is None:
+                return None
+            try:
+                with open(path, 'rb') as f:
+                    return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still mapped on Windows; temp_dir is emptied on the next start
+                    pass
+
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            self._send_all(bytes([Protocol.GET_VIDEO_SEGMENT]))
-            self._send_all(struct.pack('!IIB', video_id, segment_id, quality))
-
-            size_bytes = self._recv_all(4)
-            size = struct.unpack('!I', size_bytes)[0]
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_VIDEO_SEGMENT, video_id, segment_id, quality))
 
-            if size == 0:
-                return None
-            return self._recv_all(size)
+                size = SIZE.struct.unpack(self._recv_all(conn, SIZE.struct.size))[0]
+                if size == 0:
+                    return None
+                return self._recv_all(conn, size)
         except Exception as e:
             logger.error(f"Error getting video segment {segment_id}: {str(e)}", exc_info=True)
             return None
 
-    def get_video_list(self):
+    def _stream_to_fd(self, conn: Connection, fd: int) -> int:
+        """Copy a length-prefixed payload from the socket to ``fd`` chunk by chunk"""
+        size = SIZE.struct.unpack(self._recv_all(conn, SIZE.struct.size))[0]
+        if size == 0:
+            return 0
+
+        view = memoryview(bytearray(min(size, SEGMENT_CHUNK_SIZE)))
+        remaining = size
+        while remaining:
+            n = conn.reader.recv_into(view[:min(remaining, len(view))])
+            written = 0
+            while written < n:
+                written += os.write(fd, view[written:n])
+            remaining -= n
+        logger.debug(f"Streamed {size} bytes to disk")
+        return size
+
+    def get_video_segment_to(self, video_id: int, segment_id: int, quality: int,
+                             destination: Union[str, int, BinaryIO]) -> Optional[int]:
+        """Stream a segment into a file path, file descriptor or binary file object.
+
+        Only one small chunk buffer is held in memory regardless of segment
+        size. Data goes to the underlying descriptor at its current position;
+        a file object is flushed first and left positioned after the data.
+        Returns the number of bytes written, or None if the segment is
+        missing or the transfer failed.
+        """
+        owned_fd = None
+        stream = None
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            # Всегда используем GET_VIDEO_LIST (0x02)
-            cmd = Protocol.GET_VIDEO_LIST
-            self._send_all(bytes([cmd]))
+            if isinstance(destination, str):
+                owned_fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                fd = owned_fd
+            elif isinstance(destination, int):
+                fd = destination
+            else:
+                destination.flush()
+                stream = destination
+                fd = stream.fileno()
+
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_VIDEO_SEGMENT, video_id, segment_id, quality))
+                size = self._stream_to_fd(conn, fd)
+            return size or None
+        except Exception as e:
+            logger.error(f"Error streaming video segment {segment_id}: {str(e)}", exc_info=True)
+            return None
+        finally:
+            if owned_fd is not None:
+                os.close(owned_fd)
+            if stream is not None and stream.seekable():
+                # The object's buffered position does not know about os.write on its descriptor
+                stream.seek(os.lseek(fd, 0, os.SEEK_CUR))
+
+    def get_video_segment_file(self, video_id: int, segment_id: int, quality: int) -> Optional[str]:
+        """Stream a segment into a new temporary .mp4 file and return its path.
+
+        With a segment cache the file comes from the cache when possible, and
+        freshly downloaded segments are added to it.
+        """
+        cache = self.segment_cache
+        if cache:
+            path = cache.checkout(video_id, segment_id, quality)
+            if path:
+                logger.debug(f"Segment {segment_id} of video {video_id} served from cache")
+                return path
+
+        fd, path = tempfile.mkstemp(suffix='.mp4', dir=cache.temp_dir if cache else None)
+        started = time.monotonic()
+        try:
+            size = self.get_video_segment_to(video_id, segment_id, quality, fd)
+        finally:
+            os.close(fd)
+        if size is None:
+            os.remove(path)
+            return None
+        self.throughput.record(quality, size, time.monotonic() - started)
 
-            # Если есть токен, отправляем его для получения персонального списка
-            if self.token:
-                self._send_all(struct.pack('!I', len(self.token)) + self.token.encode('utf-8'))
+        if cache:
+            cache.store(video_id, segment_id, quality, path)
+        return path
 
-            count_bytes = self._recv_all(4)
-            count = struct.unpack('!I', count_bytes)[0]
-            logger.info(f"Receiving {count} videos")
+    def get_cached_segment_file(self, video_id: int, segment_id: int,
+                                qualities: List[int]) -> Optional[str]:
+        """Check out a cached copy of a segment in the first available of ``qualities``"""
+        if not self.segment_cache:
+            return None
+        for quality in qualities:
+            path = self.segment_cache.checkout(video_id, segment_id, quality)
+            if path:
+                return path
+        return None
+
+    @staticmethod
+    def _discard_segment_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"Error deleting temp file {path}: {str(e)}")
 
-            videos = []
-            for _ in range(count):
-                video_id_bytes = self._recv_all(4)
-                video_id = struct.unpack('!I', video_id_bytes)[0]
+    def get_video_list(self):
+        cached = self._cached('video_list', self.token)
+        if cached is not None:
+            return cached
 
-                video_info_data = self._recv_video_info_data()
-                video_info = self._parse_video_info(video_info_data)
+        try:
+            if not self.is_connected():
+                if not self.connect():
+                    return None
 
-                videos.append((video_id, video_info))
+            with self._connection() as conn:
+                # Если есть токен, отправляем его для получения персонального списка
+                if self.token:
+                    self._send_all(conn, encode_request(Protocol.GET_VIDEO_LIST, self.token))
+                else:
+                    self._send_all(conn, bytes([Protocol.GET_VIDEO_LIST]))
 
-            return videos
+                videos = self._read(conn, VIDEO_LIST)
+                logger.info(f"Received {len(videos)} videos")
+                return self._store('video_list', self.token, videos)
         except Exception as e:
             logger.error(f"Error getting video list: {str(e)}", exc_info=True)
             return None
 
-    def _recv_video_info_data(self) -> bytes:
-        data = bytearray()
-        data.extend(self._recv_all(4))  # channel_id
-        data.extend(self._recv_all(4))  # segment_amount
-        data.extend(self._recv_all(1))  # segment_length
-        data.extend(self._recv_all(1))  # max_quality
+    def get_video_page(self, offset: int, limit: int) -> Optional[Tuple[int, List[Tuple[int, VideoInfo]]]]:
+        """Up to ``limit`` videos of the list from ``offset`` on, and the length of the whole list"""
+        if self._paged_lists is False:
+            videos = self.get_video_list()
+            return None if videos is None else (len(videos), videos[offset:offset + limit])
+
+        try:
+            if not self.is_connected():
+                if not self.connect():
+                    return None
+
+            try:
+                with self._connection() as conn:
+                    self._send_all(conn, encode_request(Protocol.GET_VIDEO_PAGE, self.token or '', offset, limit))
+                    if self._paged_lists is None:
+                        status = self._probe_status(conn)
+                    else:
+                        status = self._recv_all(conn, 1)[0]
+                    if status != Protocol.SUCCESS:
+                        conn.reusable = False
+                        if self._paged_lists is None:
+                            raise _CommandUnsupported(f"server answered {status}")
+                        logger.error(f"Failed to get videos from {offset}")
+                        return None
+                    self._paged_lists = True
+                    total, videos = self._read(conn, VIDEO_PAGE)
+            except _CommandUnsupported as e:
+                logger.info(f"Paged video list unavailable ({str(e)}), paging the whole list locally")
+                self._paged_lists = False
+                return self.get_video_page(offset, limit)
+
+            return total, [(video_id, self._store('video', video_id, video_info))
+                           for video_id, video_info in videos]
+        except Exception as e:
+            logger.error(f"Error getting video page at {offset}: {str(e)}", exc_info=True)
+            return None
 
-        for _ in range(3):  # author, title, description
-            length_bytes = self._recv_all(4)
-            length = struct.unpack('!I', length_bytes)[0]
-            data.extend(length_bytes)
-            data.extend(self._recv_all(length))
+    def iter_video_pages(self, page_size: int = 100) -> Iterator[List[Tuple[int, VideoInfo]]]:
+        """Pages of the video list; each is requested once the previous one has been consumed.
 
-        return bytes(data)
+        Raises ConnectionError when a page cannot be fetched.
+        """
+        offset = 0
+        while True:
+            if self._paged_lists is False:
+                # The server only sends whole lists: fetch it once and page it here
+                videos = self.get_video_list()
+                if videos is None:
+                    raise ConnectionError("Failed to get video list")
+                for start in range(offset, len(videos), page_size):
+                    yield videos[start:start + page_size]
+                return
+
+            page = self.get_video_page(offset, page_size)
+            if page is None:
+                raise ConnectionError(f"Failed to get videos from {offset}")
+            total, videos = page
+            if videos:
+                yield videos
+            offset += len(videos)
+            if not videos or offset >= total:
+                return
+
+    def iter_video_list(self, page_size: int = 100) -> Iterator[Tuple[int, VideoInfo]]:
+        """All videos one by one, fetched ``page_size`` at a time"""
+        for page in self.iter_video_pages(page_size):
+            yield from page
 
     def _parse_video_info(self, data: bytes) -> VideoInfo:
-        offset = 0
-        channel_id = struct.unpack_from('!I', data, offset)[0]
-        offset += 4
-        segment_amount = struct.unpack_from('!I', data, offset)[0]
-        offset += 4
-        segment_length = struct.unpack_from('!B', data, offset)[0]
-        offset += 1
-        max_quality = struct.unpack_from('!B', data, offset)[0]
-        offset += 1
-
-        def unpack_string():
-            nonlocal offset
-            length = struct.unpack_from('!I', data, offset)[0]
-            offset += 4
-            string = data[offset:offset + length].decode('utf-8')
-            offset += length
-            return string
-
-        author = unpack_string()
-        title = unpack_string()
-        description = unpack_string()
-
-        return VideoInfo(
-            channel_id=channel_id,
-            segment_amount=segment_amount,
-            segment_length=segment_length,
-            max_quality=max_quality,
-            author=author,
-            title=title,
-            description=description
-        )
+        return VIDEO_INFO.unpack_from(data)[0]
+
+    def _parse_channel_info(self, data: bytes) -> ChannelInfo:
+        return CHANNEL_INFO.unpack_from(data)[0]
+
+    def get_video_info(self, video_id: int) -> Optional[VideoInfo]:
+        cached = self._cached('video', video_id)
+        if cached is not None:
+            return cached
 
-    def login(self, username: str, password: str) -> bool:
         try:
             if not self.is_connected():
                 if not self.connect():
-                    return False
+                    return None
 
-            username_bytes = username.encode('utf-8')
-            password_bytes = password.encode('utf-8')
+            request = self._submit_pipelined(Protocol.GET_VIDEO_INFO, video_id)
+            if request is not None:
+                return self._store('video', video_id,
+                                   self._parse_video_info(request.result(self.pipeline_timeout)))
 
-            data = bytearray()
-            data.append(Protocol.LOGIN)
-            data.extend(struct.pack('!I', len(username_bytes)))
-            data.extend(username_bytes)
-            data.extend(struct.pack('!I', len(password_bytes)))
-            data.extend(password_bytes)
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_VIDEO_INFO, video_id))
+                return self._store('video', video_id, self._read(conn, VIDEO_INFO))
+        except Exception as e:
+            logger.error(f"Error getting video info {video_id}: {str(e)}", exc_info=True)
+            return None
+
+    def get_video_infos(self, video_ids: List[int],
+                        batch_size: int = 256) -> Optional[List[Tuple[int, VideoInfo]]]:
+        """Fetch VideoInfo for many videos with GET_VIDEO_INFO_BATCH.
+
+        Ids are sent in batches of ``batch_size``, one framed response per
+        batch; with pipelining all batches are in flight at once. Ids unknown
+        to the server are left out of the result. Only ids without a fresh
+        cached info are requested. Servers without the batch command get
+        concurrent GET_VIDEO_INFO requests instead.
+        """
+        known = {}
+        for video_id in video_ids:
+            cached = self._cached('video', video_id)
+            if cached is not None:
+                known[video_id] = cached
+        missing = [video_id for video_id in video_ids if video_id not in known]
+        if not missing:
+            return [(video_id, known[video_id]) for video_id in video_ids]
 
-            self._send_all(data)
+        try:
+            if not self.is_connected():
+                if not self.connect():
+                    return None
 
-            response = self._recv_all(1)[0]
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            if self._batch_infos is None:
+                # Try the command on its own before pipelining batches that might never be answered
+                try:
+                    if not self._fetch_info_batch(batches.pop(0), known):
+                        return None
+                except _CommandUnsupported as e:
+                    logger.info(f"Video info batches unavailable ({str(e)}), requesting infos one by one")
+                    self._batch_infos = False
+            if self._batch_infos is False:
+                return self._get_video_infos_each(video_ids, known)
+
+            requests = [self._submit_pipelined(Protocol.GET_VIDEO_INFO_BATCH, batch) for batch in batches]
+            for batch, request in zip(batches, requests):
+                if request is None:
+                    if not self._fetch_info_batch(batch, known):
+                        return None
+                    continue
+                body = request.result(self.pipeline_timeout)
+                if body[0] != Protocol.SUCCESS:
+                    logger.error("Failed to get video info batch")
+                    return None
+                self._store_info_batch(body, FRAME_HEADER.struct.size, known)
 
-            if response == Protocol.SUCCESS:
-                token_len_bytes = self._recv_all(4)
-                token_len = struct.unpack('!I', token_len_bytes)[0]
-                self.token = self._recv_all(token_len).decode('utf-8')
-                logger.info("Login successful")
-                return True
-            elif response == Protocol.INVALID_CREDENTIALS:
-                logger.warning("Wrong password")
-            elif response == Protocol.FAILURE:
-                logger.warning("Account not found")
+            logger.info(f"Received info for {len(known)} of {len(video_ids)} videos "
+                        f"({len(video_ids) - len(missing)} cached)")
+            return [(video_id, known[video_id]) for video_id in video_ids if video_id in known]
+        except Exception as e:
+            logger.error(f"Error getting video infos: {str(e)}", exc_info=True)
+            return None
 
+    def _fetch_info_batch(self, batch: List[int], known: dict) -> bool:
+        """One GET_VIDEO_INFO_BATCH over a pooled connection; probes the command the first time"""
+        with self._connection() as conn:
+            self._send_all(conn, encode_request(Protocol.GET_VIDEO_INFO_BATCH, batch))
+            if self._batch_infos is None:
+                status = self._probe_status(conn)
+                if status != Protocol.SUCCESS:
+                    conn.reusable = False
+                    raise _CommandUnsupported(f"server answered {status}")
+                self._batch_infos = True
+            else:
+                status = self._recv_all(conn, 1)[0]
+            length = SIZE.struct.unpack(self._recv_all(conn, SIZE.struct.size))[0]
+            body = self._recv_all(conn, length)
+
+        if status != Protocol.SUCCESS:
+            logger.error("Failed to get video info batch")
             return False
+        self._store_info_batch(body, 0, known)
+        return True
+
+    def _store_info_batch(self, body: bytes, offset: int, known: dict) -> None:
+        for video_id, video_info in VIDEO_INFO_BATCH.unpack_from(body, offset)[0]:
+            known[video_id] = self._store('video', video_id, video_info)
+
+    def _get_video_infos_each(self, video_ids: List[int],
+                              known: dict) -> Optional[List[Tuple[int, VideoInfo]]]:
+        """GET_VIDEO_INFO for every id not in ``known``, one pooled connection per request"""
+        missing = list(dict.fromkeys(video_id for video_id in video_ids if video_id not in known))
+        answered = 0
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='video-info') as executor:
+            for video_id, video_info in zip(missing, executor.map(self.get_video_info, missing)):
+                if video_info is not None:
+                    known[video_id] = video_info
+                    answered += 1
+        if missing and not answered:
+            # Not a single answer: the connection is gone rather than the ids unknown
+            return None
+        return [(video_id, known[video_id]) for video_id in video_ids if video_id in known]
+
+    def login(self, username: str, password: str) -> bool:
+        try:
+            if not self.is_connected():
+                if not self.connect():
+                    return False
+
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.LOGIN, username, password))
+
+                response = self._recv_all(conn, 1)[0]
+
+                if response == Protocol.SUCCESS:
+                    self.token = self._read(conn, STRING)
+                    logger.info("Login successful")
+                    return True
+                elif response == Protocol.INVALID_CREDENTIALS:
+                    logger.warning("Wrong password")
+                elif response == Protocol.FAILURE:
+                    logger.warning("Account not found")
+
+                return False
         except Exception as e:
             logger.error(f"Login error: {str(e)}", exc_info=True)
             return False
@@ -225,38 +639,51 @@ class NetworkClient:
                 if not self.connect():
                     return False
 
-            username_bytes = username.encode('utf-8')
-            password_bytes = password.encode('utf-8')
-
-            data = bytearray()
-            data.append(Protocol.REGISTER)
-            data.extend(struct.pack('!I', len(username_bytes)))
-            data.extend(username_bytes)
-            data.extend(struct.pack('!I', len(password_bytes)))
-            data.extend(password_bytes)
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.REGISTER, username, password))
 
-            self._send_all(data)
+                response = self._recv_all(conn, 1)[0]
 
-            response = self._recv_all(1)[0]
+                if response == Protocol.SUCCESS:
+                    self.token = self._read(conn, STRING)
+                    logger.info("Registration successful")
+                    return True
+                elif response == Protocol.USERNAME_TAKEN:
+                    logger.warning("Username already taken")
+                elif response == Protocol.INVALID_CREDENTIALS:
+                    logger.warning("Invalid credentials")
 
-            if response == Protocol.SUCCESS:
-                token_len_bytes = self._recv_all(4)
-                token_len = struct.unpack('!I', token_len_bytes)[0]
-                self.token = self._recv_all(token_len).decode('utf-8')
-                logger.info("Registration successful")
-                return True
-            elif response == Protocol.USERNAME_TAKEN:
-                logger.warning("Username already taken")
-            elif response == Protocol.INVALID_CREDENTIALS:
-                logger.warning("Invalid credentials")
-
-            return False
+                return False
         except Exception as e:
             logger.error(f"Registration error: {str(e)}", exc_info=True)
             return False
 
     def upload_video(self, channel_id: int, title: str, description: str,
                     file_path: str, progress_callback: Callable[[int], bool]) -> Optional[int]:
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        self._upload_method = None
+        video_id = self._upload_video(channel_id, title, description, file_path, progress_callback)
+
+        seconds = time.monotonic() - started
+        cpu_seconds = time.thread_time() - cpu_started
+        size = os.path.getsize(file_path) if video_id is not None else 0
+        self.last_upload = {
+            'bytes': size,
+            'seconds': seconds,
+            'cpu_seconds': cpu_seconds,
+            'method': self._upload_method,
+        }
+        if video_id is not None:
+            if self.metadata:
+                self.metadata.after_upload(channel_id)
+            mib = size / (1024 * 1024)
+            logger.info(f"Uploaded {mib:.1f} MiB via {self._upload_method} in {seconds:.2f}s, {cpu_seconds:.3f}s CPU "
+                        f"({cpu_seconds * 1000 / max(mib, 1e-9):.2f} ms/MiB)")
+        return video_id
+
+    def _upload_video(self, channel_id: int, title: str, description: str,
+                      file_path: str, progress_callback: Callable[[int], bool]) -> Optional[int]:
         if not self.token:
             logger.warning("No token available for upload")
             return None
@@ -271,73 +698,523 @@ class NetworkClient:
                 logger.warning("Empty file provided for upload")
                 return None
 
-            token_bytes = self.token.encode('utf-8')
-            title_bytes = title.encode('utf-8')
-            desc_bytes = description.encode('utf-8')
-
-            self._send_all(bytes([Protocol.UPLOAD_VIDEO]))
-            self._send_all(struct.pack('!I', len(token_bytes)) + token_bytes)
-            self._send_all(struct.pack('!I', channel_id))
-            self._send_all(struct.pack('!I', len(title_bytes)) + title_bytes)
-            self._send_all(struct.pack('!I', len(desc_bytes)) + desc_bytes)
-            self._send_all(struct.pack('!Q', file_size))
-
-            chunk_size = 1024 * 1024
-            sent_bytes = 0
+            if self.upload_journal is not None and self._resumable_uploads is not False:
+                try:
+                    return self._upload_resumable(channel_id, title, description, file_path,
+                                                  file_size, progress_callback)
+                except _CommandUnsupported as e:
+                    logger.info(f"Resumable upload unavailable ({str(e)}), using plain upload")
+
+            # Without the server's word that it acks every MiB as it arrives,
+            # only the baseline contract holds: one chunk, then its ack
+            window_size = self.upload_window
+            if window_size > 1 and not self._server_supports(Protocol.FEATURE_UPLOAD_WINDOW):
+                window_size = 1
+
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.UPLOAD_VIDEO, self.token, channel_id,
+                                                    title, description, file_size))
+
+                window = AckWindow(initial=min(4, window_size), maximum=window_size)
+                total_chunks = (file_size + UPLOAD_ACK_UNIT - 1) // UPLOAD_ACK_UNIT
+                sent_chunks = 0
+
+                with open(file_path, 'rb') as f:
+                    sender = FileSender(f, UPLOAD_ACK_UNIT, self.use_sendfile)
+                    self._upload_method = 'sendfile' if sender.use_sendfile else 'memoryview'
+                    while window.acked < total_chunks:
+                        # Keep the window full, and only wait for acks when it is
+                        if sent_chunks < total_chunks and window.can_send():
+                            offset = sent_chunks * UPLOAD_ACK_UNIT
+                            self._send_file_range(conn, sender, offset,
+                                                  min(UPLOAD_ACK_UNIT, file_size - offset))
+                            window.sent()
+                            sent_chunks += 1
+                            acks = self._recv_acks(conn, window.in_flight, block=False)
+                        else:
+                            acks = self._recv_acks(conn, window.in_flight, block=True)
+
+                        if acks is None:
+                            logger.error("Invalid progress response from server")
+                            conn.reusable = False
+                            return None
+                        if not acks:
+                            continue
+                        window.ack(acks)
+
+                        progress = int(min(window.acked * UPLOAD_ACK_UNIT, file_size) / file_size * 100)
+                        if not progress_callback(progress):
+                            logger.info("Upload canceled by user")
+                            conn.reusable = False
+                            return None
+
+                logger.debug(f"Upload window: {window.stats()}")
+                status, video_id = STATUS_ID.struct.unpack(self._recv_all(conn, STATUS_ID.struct.size))
+                if status != Protocol.SUCCESS:
+                    logger.error("Upload failed")
+                    return None
 
-            with open(file_path, 'rb') as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
+                logger.info(f"Successfully uploaded video with ID {video_id}")
+                return video_id
 
-                    self._send_all(chunk)
-                    sent_bytes += len(chunk)
+        except Exception as e:
+            logger.error(f"Error uploading video: {str(e)}", exc_info=True)
+            return None
 
-                    progress = int((sent_bytes / file_size) * 100)
-                    if not progress_callback(progress):
-                        logger.info("Upload canceled by user")
+    def _send_file_range(self, conn: Connection, sender: FileSender, offset: int, count: int) -> None:
+        if sender.use_sendfile:
+            sender.sendfile(conn.socket, offset, count)
+        else:
+            self._send_all(conn, sender.read(offset, count))
+
+    def _upload_resumable(self, channel_id: int, title: str, description: str, file_path: str,
+                          file_size: int, progress_callback: Callable[[int], bool]) -> Optional[int]:
+        """Upload through a server-side session, resuming after dropped connections.
+
+        Unfinished sessions are kept in the upload journal, so the same file
+        also resumes after a client restart.
+        """
+        journal = self.upload_journal
+        entry = journal.find(file_path, channel_id, title)
+        attempts = 0
+
+        with open(file_path, 'rb') as f:
+            while True:
+                try:
+                    with self._connection() as conn:
+                        if entry is not None:
+                            # The journal is current after an interruption within this call
+                            entry = journal.get(entry['session']) or entry
+                            offset = self._query_upload(conn, entry['session'])
+                            if offset is None:
+                                logger.info(f"Upload session {entry['session']} expired on the server")
+                                journal.remove(entry['session'])
+                                entry = None
+                            else:
+                                pending = self._resume_ranges(entry, offset)
+                                logger.info(f"Resuming upload {entry['session']} with "
+                                            f"{sum(end - start for start, end in pending)} bytes left")
+                        if entry is None:
+                            session = self._begin_upload(conn, channel_id, title, description,
+                                                         file_size, UPLOAD_ACK_UNIT)
+                            entry = journal.add(session, file_path, channel_id, title,
+                                                description, UPLOAD_ACK_UNIT)
+                            pending = [(0, file_size)]
+
+                        parallel = self.upload_streams > 1 and \
+                            sum(end - start for start, end in pending) > self.upload_range_size
+                        if not parallel:
+                            if not self._send_upload_chunks(conn, entry['session'], f, pending, file_size,
+                                                            entry['chunk_size'], progress_callback):
+                                # The journal entry stays, uploading the file again resumes it
+                                logger.info("Upload canceled by user")
+                                conn.reusable = False
+                                return None
+                            video_id = self._finish_upload(conn, entry['session'])
+
+                    if parallel:
+                        if not self._send_upload_ranges(entry['session'], file_path, pending, file_size,
+                                                        entry['chunk_size'], progress_callback):
+                            logger.info("Upload canceled by user")
+                            return None
+                        with self._connection() as conn:
+                            video_id = self._finish_upload(conn, entry['session'])
+
+                    journal.remove(entry['session'])
+                    if video_id is None:
+                        logger.error("Upload failed")
                         return None
+                    logger.info(f"Successfully uploaded video with ID {video_id}")
+                    return video_id
 
-                    response = self._recv_all(1)
-                    if not response or response[0] != Protocol.SUCCESS:
-                        logger.error("Invalid progress response from server")
+                except (socket.error, ConnectionError) as e:
+                    attempts += 1
+                    if attempts > self.upload_retries:
+                        logger.error(f"Upload failed after {attempts} attempts: {str(e)}")
                         return None
+                    delay = min(2 ** attempts, 30)
+                    logger.warning(f"Upload interrupted ({str(e)}), retrying in {delay}s")
+                    time.sleep(delay)
+
+    def _begin_upload(self, conn: Connection, channel_id: int, title: str, description: str,
+                      file_size: int, chunk_size: int) -> str:
+        """Open an upload session and return its id as hex"""
+        self._send_all(conn, encode_request(Protocol.UPLOAD_BEGIN, self.token, channel_id, title,
+                                            description, file_size, chunk_size))
+
+        try:
+            status = self._probe_status(conn)
+        except _CommandUnsupported:
+            self._resumable_uploads = False
+            raise
+
+        if status != Protocol.SUCCESS:
+            conn.reusable = False
+            raise _CommandUnsupported(f"server answered {status}")
+        self._resumable_uploads = True
+        return self._recv_all(conn, SESSION.struct.size).hex()
+
+    def _probe_status(self, conn: Connection, timeout: float = 2.0) -> int:
+        """Status byte answering a command older servers may not know"""
+        # Such servers do not answer or drop the connection
+        previous = conn.socket.gettimeout()
+        conn.socket.settimeout(timeout)
+        try:
+            return self._recv_all(conn, 1)[0]
+        except (socket.timeout, ConnectionError) as e:
+            conn.reusable = False
+            raise _CommandUnsupported(str(e))
+        finally:
+            conn.socket.settimeout(previous)
+
+    @staticmethod
+    def _resume_ranges(entry: dict, server_offset: int) -> List[Tuple[int, int]]:
+        """Ranges of a journalled upload the server may still be missing.
+
+        Parallel ranges finish out of order, so a single offset cannot
+        describe what was stored: the journal's pending ranges are resent,
+        and the server's offset is only trusted up to the journal's
+        acknowledged prefix.
+        """
+        offset = entry['offset']
+        pending = [tuple(r) for r in entry.get('pending') or [(offset, entry['size'])]]
+        if server_offset < offset:
+            pending.insert(0, (server_offset, offset))
+        return [(start, end) for start, end in pending if start < end]
+
+    def _record_upload_progress(self, session: str, pending: List[Tuple[int, int]], file_size: int,
+                                progress_callback: Callable[[int], bool]) -> bool:
+        """Journal the ranges not acknowledged yet and report progress; False to cancel"""
+        left = sorted((start, end) for start, end in pending if start < end)
+        self.upload_journal.update_offset(session, left[0][0] if left else file_size, left)
+        acked = file_size - sum(end - start for start, end in left)
+        return progress_callback(int(acked / file_size * 100))
+
+    def _query_upload(self, conn: Connection, session: str) -> Optional[int]:
+        """Bytes of ``session`` the server has stored, or None if it no longer knows it"""
+        self._send_all(conn, encode_request(Protocol.UPLOAD_QUERY, bytes.fromhex(session)))
+        if self._resumable_uploads is None:
+            # A journal entry may be from another server that never had sessions
+            try:
+                status = self._probe_status(conn)
+            except _CommandUnsupported:
+                self._resumable_uploads = False
+                raise
+        else:
+            status = self._recv_all(conn, 1)[0]
+        if status != Protocol.SUCCESS:
+            return None
+        return OFFSET.struct.unpack(self._recv_all(conn, OFFSET.struct.size))[0]
+
+    def _send_upload_chunks(self, conn: Connection, session: str, f: BinaryIO,
+                            pending: List[Tuple[int, int]], file_size: int, chunk_size: int,
+                            progress_callback: Callable[[int], bool]) -> bool:
+        """Send the ``pending`` ranges of the file as checksummed chunks; False if cancelled"""
+        # The checksum needs the data in memory anyway, so chunks go out from the read buffer
+        sender = FileSender(f, chunk_size, use_sendfile=False)
+        self._upload_method = 'memoryview'
+        pending = list(pending)
+
+        def on_ack(acked: int) -> bool:
+            pending[0] = (acked, pending[0][1])
+            return self._record_upload_progress(session, pending, file_size, progress_callback)
+
+        while pending:
+            start, end = pending[0]
+            if not self._send_upload_range(conn, session, sender, start, end, chunk_size, on_ack):
+                return False
+            pending.pop(0)
+        return True
+
+    def _send_upload_range(self, conn: Connection, session: str, sender: FileSender, start: int,
+                           end: int, chunk_size: int, on_ack: Callable[[int], bool]) -> bool:
+        """Send bytes ``start`` to ``end`` of the file as checksummed chunks.
+
+        ``on_ack`` gets the offset up to which the server has acknowledged
+        the range and returns False to cancel. Returns False if cancelled.
+        """
+        session_bytes = bytes.fromhex(session)
+        window = AckWindow(initial=min(4, self.upload_window), maximum=self.upload_window,
+                           unit=chunk_size)
+        next_offset = start
+        acked = start
+
+        while acked < end:
+            if next_offset < end and window.can_send():
+                chunk = sender.read(next_offset, min(chunk_size, end - next_offset))
+                self._send_all(conn, encode_request(Protocol.UPLOAD_CHUNK, session_bytes, next_offset,
+                                                    len(chunk), zlib.crc32(chunk)), chunk)
+                window.sent()
+                next_offset += len(chunk)
+                acks = self._recv_acks(conn, window.in_flight, block=False)
+            else:
+                acks = self._recv_acks(conn, window.in_flight, block=True)
+
+            if acks is None:
+                # Checksum mismatch or write error; resume from the server's offset
+                raise ConnectionError("Server rejected an upload chunk")
+            if not acks:
+                continue
+            window.ack(acks)
+
+            acked = min(start + window.acked * chunk_size, end)
+            if not on_ack(acked):
+                return False
+        return True
+
+    def _send_upload_ranges(self, session: str, file_path: str, pending: List[Tuple[int, int]],
+                            file_size: int, chunk_size: int,
+                            progress_callback: Callable[[int], bool]) -> bool:
+        """Send the ``pending`` parts of the file as ranges over several pooled connections at once.
+
+        The server places chunks by offset, so ranges may complete in any
+        order; the journal keeps every unfinished one. A range interrupted
+        by a connection error is put back from its last acknowledged chunk,
+        after a backoff that grows with its own consecutive failures, and
+        picked up by any stream. Returns False if cancelled; raises once a
+        range fails ``upload_retries`` times in a row without progress.
+        """
+        range_size = max(self.upload_range_size // chunk_size, 1) * chunk_size
+        # Range number -> (first unacknowledged byte, end)
+        positions = {}
+        for first, last in pending:
+            for start in range(first, last, range_size):
+                positions[len(positions)] = (start, min(start + range_size, last))
+        ranges: 'queue.Queue[int]' = queue.Queue()
+        for key in positions:
+            ranges.put(key)
+        # Range number -> failures since its last acknowledged chunk
+        attempts = dict.fromkeys(positions, 0)
+
+        lock = threading.Lock()
+        stop = threading.Event()
+        state = {'cancelled': False, 'error': None}
+        self._upload_method = 'memoryview'
+
+        def stream():
+            with open(file_path, 'rb') as f:
+                sender = FileSender(f, chunk_size, use_sendfile=False)
+                while not stop.is_set():
+                    try:
+                        key = ranges.get_nowait()
+                    except queue.Empty:
+                        return
+                    with lock:
+                        start, end = positions[key]
+
+                    def on_ack(acked: int) -> bool:
+                        with lock:
+                            positions[key] = (acked, end)
+                            attempts[key] = 0
+                            if stop.is_set():
+                                return False
+                            if not self._record_upload_progress(session, list(positions.values()),
+                                                                file_size, progress_callback):
+                                state['cancelled'] = True
+                                stop.set()
+                                return False
+                        return True
+
+                    try:
+                        with self._connection() as conn:
+                            if not self._send_upload_range(conn, session, sender, start, end,
+                                                           chunk_size, on_ack):
+                                conn.reusable = False
+                                return
+                    except (socket.error, ConnectionError) as e:
+                        with lock:
+                            attempts[key] += 1
+                            failures = attempts[key]
+                            position = positions[key][0]
+                        if failures > self.upload_retries:
+                            state['error'] = e
+                            stop.set()
+                            return
+                        delay = min(2 ** failures, 30)
+                        logger.warning(f"Upload range at {position} interrupted ({str(e)}), "
+                                       f"retrying in {delay}s")
+                        # Other ranges keep going while this one backs off
+                        stop.wait(delay)
+                        ranges.put(key)
+                    except Exception as e:
+                        state['error'] = e
+                        stop.set()
+                        return
+
+        # Ranges put back by a failing stream after the others finished need another round
+        while not ranges.empty() and not stop.is_set():
+            streams = [threading.Thread(target=stream, name=f'upload-stream-{i}', daemon=True)
+                       for i in range(self.upload_streams)]
+            for thread in streams:
+                thread.start()
+            for thread in streams:
+                thread.join()
+
+        if state['cancelled']:
+            return False
+        if state['error'] is not None:
+            raise state['error']
+        return True
+
+    def _finish_upload(self, conn: Connection, session: str) -> Optional[int]:
+        self._send_all(conn, encode_request(Protocol.UPLOAD_FINISH, bytes.fromhex(session)))
+        status, video_id = STATUS_ID.struct.unpack(self._recv_all(conn, STATUS_ID.struct.size))
+        if status != Protocol.SUCCESS:
+            return None
+        return video_id
+
+    def can_upload_segmented(self) -> bool:
+        """Whether uploads may be segmented and transcoded locally"""
+        return self._segmented_uploads is not False and find_ffmpeg() is not None
+
+    def upload_video_segmented(self, channel_id: int, title: str, description: str,
+                               file_path: str, progress_callback: Callable[[int], bool],
+                               segment_length: int = 10,
+                               ladder: Optional[List[QualityLevel]] = None) -> Optional[int]:
+        """Transcode ``file_path`` into segments locally and upload them as they are ready.
+
+        The server registers the video up front and can serve every segment
+        as soon as it arrives, instead of transcoding the whole file after
+        the upload. Falls back to ``upload_video`` when ffmpeg is missing or
+        the server does not accept segmented uploads.
+        """
+        if not self.token:
+            logger.warning("No token available for upload")
+            return None
+        if not self.can_upload_segmented():
+            return self.upload_video(channel_id, title, description, file_path, progress_callback)
 
-            response = self._recv_all(5)
-            if not response or response[0] != Protocol.SUCCESS:
-                logger.error("Upload failed")
+        try:
+            encoder = SegmentEncoder(file_path, segment_length, ladder)
+        except (TranscodeError, OSError) as e:
+            logger.warning(f"Cannot transcode {file_path} ({str(e)}), using plain upload")
+            return self.upload_video(channel_id, title, description, file_path, progress_callback)
+
+        started = time.monotonic()
+        try:
+            if not self.is_connected():
+                if not self.connect():
+                    return None
+
+            try:
+                with self._connection() as conn:
+                    video_id = self._begin_segmented(conn, channel_id, title, description,
+                                                     segment_length, encoder)
+            except _CommandUnsupported as e:
+                logger.info(f"Segmented upload unavailable ({str(e)}), using plain upload")
+                encoder.cleanup()
+                return self.upload_video(channel_id, title, description, file_path, progress_callback)
+            if video_id is None:
+                logger.error("Server refused segmented upload")
                 return None
 
-            video_id = struct.unpack('!I', response[1:5])[0]
-            logger.info(f"Successfully uploaded video with ID {video_id}")
+            # Segments are addressed by video id, any connection will do
+            with self._connection() as conn:
+                total = encoder.segment_count * len(encoder.ladder)
+                sent = acked = uploaded_bytes = 0
+                segments = encoder.run()
+                try:
+                    # Encoding runs ahead while finished segments are sent; acks are
+                    # collected as they come and only waited for at the end
+                    for segment_id, quality, path in segments:
+                        uploaded_bytes += self._send_segment(conn, video_id, segment_id, quality, path)
+                        os.remove(path)
+                        sent += 1
+                        while True:
+                            acks = self._recv_acks(conn, sent - acked, block=sent == total)
+                            if acks is None:
+                                logger.error("Server rejected a segment")
+                                conn.reusable = False
+                                return None
+                            acked += acks
+                            if not progress_callback(int(acked / total * 100)):
+                                logger.info("Upload canceled by user")
+                                conn.reusable = False
+                                return None
+                            if acked == sent or sent < total:
+                                break
+                finally:
+                    segments.close()
+
+                self._send_all(conn, encode_request(Protocol.SEGMENTED_FINISH, self.token, video_id))
+                if self._recv_all(conn, 1)[0] != Protocol.SUCCESS:
+                    logger.error("Server did not finalize segmented upload")
+                    return None
+
+            if self.metadata:
+                self.metadata.after_upload(channel_id)
+            logger.info(f"Uploaded video {video_id} as {total} segments "
+                        f"({uploaded_bytes / (1024 * 1024):.1f} MiB) in {time.monotonic() - started:.2f}s")
             return video_id
 
+        except TranscodeError as e:
+            logger.error(f"Transcoding failed: {str(e)}")
+            return None
         except Exception as e:
-            logger.error(f"Error uploading video: {str(e)}", exc_info=True)
+            logger.error(f"Error uploading segmented video: {str(e)}", exc_info=True)
             return None
+        finally:
+            encoder.cleanup()
+
+    def _begin_segmented(self, conn: Connection, channel_id: int, title: str, description: str,
+                         segment_length: int, encoder: SegmentEncoder) -> Optional[int]:
+        """Register a video whose segments follow; returns its id"""
+        self._send_all(conn, encode_request(Protocol.SEGMENTED_BEGIN, self.token, channel_id, title,
+                                            description, encoder.segment_count, segment_length,
+                                            encoder.max_quality))
+        try:
+            status = self._probe_status(conn)
+        except _CommandUnsupported:
+            self._segmented_uploads = False
+            raise
+        if status != Protocol.SUCCESS:
+            conn.reusable = False
+            return None
+        self._segmented_uploads = True
+        return SIZE.struct.unpack(self._recv_all(conn, SIZE.struct.size))[0]
+
+    def _send_segment(self, conn: Connection, video_id: int, segment_id: int,
+                      quality: int, path: str) -> int:
+        with open(path, 'rb') as f:
+            data = f.read()
+        self._send_all(conn, encode_request(Protocol.UPLOAD_SEGMENT, self.token, video_id, segment_id,
+                                            quality, len(data), zlib.crc32(data)), data)
+        return len(data)
+
+    def pending_uploads(self) -> List[dict]:
+        """Unfinished resumable uploads recorded in the journal"""
+        return self.upload_journal.pending() if self.upload_journal else []
+
+    @staticmethod
+    def _recv_acks(conn: Connection, limit: int, block: bool) -> Optional[int]:
+        """Read up to ``limit`` upload acks; returns their count, or None on a failure ack"""
+        if not block and not conn.reader.buffered:
+            readable, _, _ = select.select([conn.socket], [], [], 0)
+            if not readable:
+                return 0
+        data = conn.reader.recv(limit)
+        if any(status != Protocol.SUCCESS for status in data):
+            return None
+        return len(data)
 
     def get_channel_info(self, channel_id: int) -> Optional[ChannelInfo]:
+        cached = self._cached('channel', channel_id)
+        if cached is not None:
+            return cached
+
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            self._send_all(bytes([Protocol.GET_CHANNEL_INFO]))
-            self._send_all(struct.pack('!I', channel_id))
-
-            name_len_bytes = self._recv_all(4)
-            name_len = struct.unpack('!I', name_len_bytes)[0]
-            name = self._recv_all(name_len).decode('utf-8')
+            request = self._submit_pipelined(Protocol.GET_CHANNEL_INFO, channel_id)
+            if request is not None:
+                return self._store('channel', channel_id,
+                                   self._parse_channel_info(request.result(self.pipeline_timeout)))
 
-            desc_len_bytes = self._recv_all(4)
-            desc_len = struct.unpack('!I', desc_len_bytes)[0]
-            description = self._recv_all(desc_len).decode('utf-8')
-
-            subscribers_owner_video = self._recv_all(12)
-            subscribers, owner, video_amount = struct.unpack('!III', subscribers_owner_video)
-
-            return ChannelInfo(name, description, subscribers, owner, video_amount)
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_CHANNEL_INFO, channel_id))
+                return self._store('channel', channel_id, self._read(conn, CHANNEL_INFO))
         except Exception as e:
             logger.error(f"Error getting channel info: {str(e)}", exc_info=True)
             return None
@@ -352,52 +1229,43 @@ class NetworkClient:
                 if not self.connect():
                     return None
 
-            token_bytes = self.token.encode('utf-8')
-            name_bytes = name.encode('utf-8')
-            desc_bytes = description.encode('utf-8')
-
-            self._send_all(bytes([Protocol.CREATE_CHANNEL]))
-            self._send_all(struct.pack('!I', len(token_bytes)) + token_bytes)
-            self._send_all(struct.pack('!I', len(name_bytes)) + name_bytes)
-            self._send_all(struct.pack('!I', len(desc_bytes)) + desc_bytes)
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.CREATE_CHANNEL, self.token, name, description))
 
-            response = self._recv_all(5)
-            if not response or response[0] != Protocol.SUCCESS:
-                logger.error("Channel creation failed")
-                return None
+                status, channel_id = STATUS_ID.struct.unpack(self._recv_all(conn, STATUS_ID.struct.size))
+                if status != Protocol.SUCCESS:
+                    logger.error("Channel creation failed")
+                    return None
 
-            channel_id = struct.unpack('!I', response[1:5])[0]
-            logger.info(f"Successfully created channel with ID {channel_id}")
-            return channel_id
+                logger.info(f"Successfully created channel with ID {channel_id}")
+                if self.metadata:
+                    self.metadata.after_channel_created()
+                return channel_id
 
         except Exception as e:
             logger.error(f"Error creating channel: {str(e)}", exc_info=True)
             return None
 
     def get_channel_videos(self, channel_id: int) -> Optional[List[int]]:
+        cached = self._cached('channel_videos', channel_id)
+        if cached is not None:
+            return cached
+
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            self._send_all(bytes([Protocol.GET_CHANNEL_VIDEOS]))
-            self._send_all(struct.pack('!III', channel_id, 0, 100))  # Get first 100 videos
-
-            response = self._recv_all(1)
-            if response[0] != Protocol.SUCCESS:
-                logger.error("Failed to get channel videos")
-                return None
+            with self._connection() as conn:
+                # Get first 100 videos
+                self._send_all(conn, encode_request(Protocol.GET_CHANNEL_VIDEOS, channel_id, 0, 100))
 
-            count_bytes = self._recv_all(4)
-            count = struct.unpack('!I', count_bytes)[0]
-
-            video_ids = []
-            for _ in range(count):
-                video_id_bytes = self._recv_all(4)
-                video_id = struct.unpack('!I', video_id_bytes)[0]
-                video_ids.append(video_id)
+                response = self._recv_all(conn, 1)
+                if response[0] != Protocol.SUCCESS:
+                    logger.error("Failed to get channel videos")
+                    return None
 
-            return video_ids
+                return self._store('channel_videos', channel_id, self._read(conn, VIDEO_IDS))
         except Exception as e:
             logger.error(f"Error getting channel videos: {str(e)}", exc_info=True)
             return None
@@ -405,42 +1273,38 @@ class NetworkClient:
     def get_user_channels(self) -> Optional[List[Tuple[int, ChannelInfo]]]:
         if not self.token:
             return None
+        cached = self._cached('user_channels', self.token)
+        if cached is not None:
+            return cached
 
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            self._send_all(bytes([Protocol.GET_USER_CHANNELS]))
-            self._send_all(struct.pack('!I', len(self.token)) + self.token.encode('utf-8'))
-
-            count_bytes = self._recv_all(4)
-            count = struct.unpack('!I', count_bytes)[0]
-
-            channels = []
-            for _ in range(count):
-                channel_id_bytes = self._recv_all(4)
-                channel_id = struct.unpack('!I', channel_id_bytes)[0]
-
-                name_len_bytes = self._recv_all(4)
-                name_len = struct.unpack('!I', name_len_bytes)[0]
-                name = self._recv_all(name_len).decode('utf-8')
-
-                desc_len_bytes = self._recv_all(4)
-                desc_len = struct.unpack('!I', desc_len_bytes)[0]
-                description = self._recv_all(desc_len).decode('utf-8')
-
-                subscribers_owner_video = self._recv_all(12)
-                subscribers, owner, video_amount = struct.unpack('!III', subscribers_owner_video)
-
-                channel_info = ChannelInfo(name, description, subscribers, owner, video_amount)
-                channels.append((channel_id, channel_info))
-
-            return channels
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_USER_CHANNELS, self.token))
+                return self._store('user_channels', self.token, self._read(conn, CHANNEL_LIST))
         except Exception as e:
             logger.error(f"Error getting user channels: {str(e)}", exc_info=True)
             return None
 
+    def get_user_videos(self) -> Optional[List[Tuple[int, VideoInfo]]]:
+        """Videos of the user's channels; the protocol has no single command for them"""
+        channels = self.get_user_channels()
+        if channels is None:
+            return None
+
+        video_ids = []
+        for channel_id, _ in channels:
+            channel_videos = self.get_channel_videos(channel_id)
+            if channel_videos is None:
+                return None
+            video_ids += channel_videos
+        if not video_ids:
+            return []
+        return self.get_video_infos(video_ids)
+
     def subscribe(self, channel_id: int) -> bool:
         if not self.token:
             logger.warning("No token available for subscription")
@@ -451,14 +1315,13 @@ class NetworkClient:
                 if not self.connect():
                     return False
 
-            token_bytes = self.token.encode('utf-8')
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.SUBSCRIBE, self.token, channel_id))
 
-            self._send_all(bytes([Protocol.SUBSCRIBE]))
-            self._send_all(struct.pack('!I', len(token_bytes)) + token_bytes)
-            self._send_all(struct.pack('!I', channel_id))
-
-            response = self._recv_all(1)[0]
-            return response == Protocol.SUCCESS
+                response = self._recv_all(conn, 1)[0]
+                if response == Protocol.SUCCESS and self.metadata:
+                    self.metadata.after_subscription(channel_id)
+                return response == Protocol.SUCCESS
         except Exception as e:
             logger.error(f"Error subscribing to channel: {str(e)}", exc_info=True)
             return False
@@ -473,67 +1336,48 @@ class NetworkClient:
                 if not self.connect():
                     return False
 
-            token_bytes = self.token.encode('utf-8')
-
-            self._send_all(bytes([Protocol.UNSUBSCRIBE]))
-            self._send_all(struct.pack('!I', len(token_bytes)) + token_bytes)
-            self._send_all(struct.pack('!I', channel_id))
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.UNSUBSCRIBE, self.token, channel_id))
 
-            response = self._recv_all(1)[0]
-            return response == Protocol.SUCCESS
+                response = self._recv_all(conn, 1)[0]
+                if response == Protocol.SUCCESS and self.metadata:
+                    self.metadata.after_subscription(channel_id)
+                return response == Protocol.SUCCESS
         except Exception as e:
             logger.error(f"Error unsubscribing from channel: {str(e)}", exc_info=True)
             return False
 
     def get_video_segment_async(self, video_id: int, segment_id: int,
-                              quality: int, callback: Callable[[Optional[bytes]], None]):
-        def worker():
-            try:
-                segment = self.get_video_segment(video_id, segment_id, quality)
-                callback(segment)
-            except Exception as e:
-                logger.error(f"Async segment error: {str(e)}")
-                callback(None)
+                              quality: int, callback: Callable[[Optional[str]], None],
+                              priority: int = PRIORITY_PREFETCH) -> Future:
+        """Fetch a segment into a temporary file off-thread; ``callback`` gets its path"""
+        return self.scheduler.submit(video_id, segment_id, quality, priority, callback)
+
+    def cancel_segment_requests(self, video_id: Optional[int] = None,
+                                keep: Optional[Callable[[SegmentRequest], bool]] = None) -> int:
+        """Cancel pending segment fetches, optionally only for one video or outside ``keep``"""
+        def stale(request: SegmentRequest) -> bool:
+            if video_id is not None and request.video_id != video_id:
+                return False
+            return keep is None or not keep(request)
 
-        thread = threading.Thread(target=worker)
-        thread.start()
+        return self.scheduler.cancel(stale)
 
     def get_user_channels_by_user(self, username: str) -> Optional[List[Tuple[int, ChannelInfo]]]:
         if not self.token:
             return None
+        cached = self._cached('user_channels_by', username)
+        if cached is not None:
+            return cached
 
         try:
             if not self.is_connected():
                 if not self.connect():
                     return None
 
-            self._send_all(bytes([Protocol.GET_USER_CHANNELS_BY_USER]))
-            self._send_all(struct.pack('!I', len(self.token)) + self.token.encode('utf-8'))
-            self._send_all(struct.pack('!I', len(username.encode('utf-8'))) + username.encode('utf-8'))
-
-            count_bytes = self._recv_all(4)
-            count = struct.unpack('!I', count_bytes)[0]
-
-            channels = []
-            for _ in range(count):
-                channel_id_bytes = self._recv_all(4)
-                channel_id = struct.unpack('!I', channel_id_bytes)[0]
-
-                name_len_bytes = self._recv_all(4)
-                name_len = struct.unpack('!I', name_len_bytes)[0]
-                name = self._recv_all(name_len).decode('utf-8')
-
-                desc_len_bytes = self._recv_all(4)
-                desc_len = struct.unpack('!I', desc_len_bytes)[0]
-                description = self._recv_all(desc_len).decode('utf-8')
-
-                subscribers_owner_video = self._recv_all(12)
-                subscribers, owner, video_amount = struct.unpack('!III', subscribers_owner_video)
-
-                channel_info = ChannelInfo(name, description, subscribers, owner, video_amount)
-                channels.append((channel_id, channel_info))
-
-            return channels
+            with self._connection() as conn:
+                self._send_all(conn, encode_request(Protocol.GET_USER_CHANNELS_BY_USER, self.token, username))
+                return self._store('user_channels_by', username, self._read(conn, CHANNEL_LIST))
         except Exception as e:
             logger.error(f"Error getting user channels by username: {str(e)}", exc_info=True)
             return None
\ No newline at end of file
@@ -0,0 +1,148 @@
+import struct
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Callable
+
+from .pool import Connection
+from .protocols import Protocol, encode_request, HELLO_RESPONSE
+from .logger import logger
+
+# Pipelined request header: request id, command
+REQUEST_HEADER = struct.Struct('!IB')
+# Pipelined response header: request id, body length
+RESPONSE_HEADER = struct.Struct('!II')
+
+
+def negotiate(conn: Connection, features: int, timeout: float = 2.0) -> Optional[int]:
+    """Send HELLO asking for ``features``; returns the flags the server granted.
+
+    Servers that do not know HELLO either answer with a failure or not at
+    all; both return None and flag the connection as not reusable since
+    its stream position is unknown. Granting FEATURE_PIPELINING switches
+    ``conn`` to pipelined framing.
+    """
+    try:
+        conn.socket.settimeout(timeout)
+        conn.socket.sendall(encode_request(Protocol.HELLO, features))
+        response = conn.reader.readexactly(HELLO_RESPONSE.struct.size)
+        conn.socket.settimeout(None)
+    except (socket.error, ConnectionError) as e:
+        logger.info(f"HELLO not supported by server: {str(e)}")
+        conn.reusable = False
+        return None
+
+    status, granted = HELLO_RESPONSE.struct.unpack(response)
+    if status != Protocol.SUCCESS:
+        logger.info("Server rejected HELLO")
+        conn.reusable = False
+        return None
+
+    logger.info(f"Server granted features {granted & features:#x} of {features:#x}")
+    return granted & features
+
+
+class PipelinedRequest(Future):
+    """Future of one pipelined request.
+
+    A response that does not arrive within ``result``'s timeout breaks the
+    whole connection: its request id and slot cannot be reused safely and
+    the server is evidently stuck anyway.
+    """
+
+    def __init__(self, pipeline: 'PipelinedConnection'):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def result(self, timeout: Optional[float] = None) -> bytes:
+        try:
+            return super().result(timeout)
+        except FutureTimeoutError:
+            error = ConnectionError(f"No pipelined response within {timeout}s")
+            self.pipeline._fail(error)
+            raise error
+
+
+class PipelinedConnection:
+    """Keeps many requests in flight on one connection.
+
+    Requests carry an id; a reader thread matches each framed response to
+    its future, so responses may arrive in any order. ``timeout`` bounds
+    the wait for a free slot when ``max_in_flight`` requests are pending.
+    """
+
+    def __init__(self, conn: Connection, max_in_flight: int = 64, timeout: float = 30.0,
+                 on_close: Optional[Callable[['PipelinedConnection'], None]] = None):
+        self.conn = conn
+        self.timeout = timeout
+        self._on_close = on_close
+        self._pending: Dict[int, PipelinedRequest] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, name='pipeline-reader', daemon=True)
+        self._reader.start()
+
+    def submit(self, command: int, payload: bytes = b'') -> PipelinedRequest:
+        """Send a request without waiting; the future resolves to the raw response body"""
+        if not self._slots.acquire(timeout=self.timeout):
+            # Nothing was answered for a while, the server has stopped responding
+            raise ConnectionError(f"No pipelined response within {self.timeout}s")
+        future = PipelinedRequest(self)
+        with self._lock:
+            if self.closed:
+                self._slots.release()
+                raise ConnectionError("Pipelined connection is closed")
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+            self._pending[request_id] = future
+
+        try:
+            with self._send_lock:
+                self.conn.socket.sendall(REQUEST_HEADER.pack(request_id, command) + payload)
+        except socket.error as e:
+            logger.error(f"Error sending pipelined request: {str(e)}")
+            self._fail(e)
+        return future
+
+    def _read_loop(self) -> None:
+        reader = self.conn.reader
+        try:
+            while True:
+                # Responses that arrive together are parsed from one read
+                request_id, length = RESPONSE_HEADER.unpack(reader.readexactly(RESPONSE_HEADER.size))
+                body = reader.readexactly(length)
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    logger.warning(f"Response for unknown request id {request_id}")
+                    continue
+                self._slots.release()
+                future.set_result(body)
+        except (socket.error, ConnectionError, struct.error) as e:
+            if not self.closed:
+                logger.error(f"Pipelined connection failed: {str(e)}")
+            self._fail(e)
+
+    def _fail(self, error: Exception) -> None:
+        with self._lock:
+            was_closed = self.closed
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            self._slots.release()
+            if not future.done():
+                future.set_exception(ConnectionError(f"Pipelined connection lost: {error}"))
+        if not was_closed and self._on_close:
+            self._on_close(self)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self) -> None:
+        """Stop accepting requests; the owner closes ``conn``, which ends the reader"""
+        with self._lock:
+            self.closed = True
@@ -2,15 +2,41 @@ from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent, QMediaPlaylist
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 from PyQt5.QtCore import QUrl, QTimer, pyqtSignal, QObject
 from PyQt5.QtWidgets import QMessageBox, QVBoxLayout, QWidget
-import tempfile
-import os
-from logger import logger
+import time
+from collections import deque
+from .logger import logger
+from .buffer import SegmentBuffer
+from .abr import AbrController
+from .prefetch import PrefetchPipeline
+
+
+def _latency_stats(samples):
+    """Summary of a sequence of latencies in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p95': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+        'max': ordered[-1],
+        'last': samples[-1],
+    }
 
 
 class VideoPlayer(QWidget):
     positionChanged = pyqtSignal(int)
     durationChanged = pyqtSignal(int)
     stateChanged = pyqtSignal(QMediaPlayer.State)
+    segmentStarted = pyqtSignal(int)
+    segmentFailed = pyqtSignal(int)
+    playbackFinished = pyqtSignal()
+    # Fetch threads hand finished segments to the GUI thread through this
+    _segmentFetched = pyqtSignal(int, int, object)
+
+    MAX_RETRIES = 2
+    # Buffered segments queued in the playlist ahead of the current one in gapless mode
+    GAPLESS_QUEUE = 2
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -31,16 +57,34 @@ class VideoPlayer(QWidget):
         self.media_player.setVideoOutput(self.video_widget)
 
         self.playlist = QMediaPlaylist()
+        self.playlist.setPlaybackMode(QMediaPlaylist.Sequential)
         self.media_player.setPlaylist(self.playlist)
+        # Keep upcoming segments queued so the player moves on without reloading
+        self.gapless = True
+        self._playlist_segments = []
+        self.playlist.currentIndexChanged.connect(self._on_playlist_index_changed)
+
+        # Time from the end of one segment to the next one being ready, in ms
+        self.boundary_gaps = deque(maxlen=200)
+        self._boundary_at = None
+        # Time from a seek request to the target segment being ready, in ms
+        self.seek_latencies = deque(maxlen=200)
+        self._seek_at = None
 
         self.current_video_id = None
         self.current_segment = 0
         self.segment_length = 0
         self.total_segments = 0
-        self.buffered_segments = {}
-        self.temp_files = []
-        self.next_segment_ready = False
-        self.next_segment_path = None
+        self.buffer = SegmentBuffer()
+        self.abr = None
+        self.prefetch = None
+        self._waiting_for = None
+        self._start_position = 0
+        # Requests failed segments again once their backoff has passed
+        self.retry_timer = QTimer()
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._retry_failed)
+        self._segmentFetched.connect(self._on_segment_fetched)
 
         self.media_player.positionChanged.connect(self.positionChanged.emit)
         self.media_player.durationChanged.connect(self.durationChanged.emit)
@@ -50,137 +94,224 @@ class VideoPlayer(QWidget):
 
     def set_network(self, network):
         self.network = network
+        self.abr = AbrController(network.throughput)
+        self.prefetch = PrefetchPipeline(network, self.buffer, self.abr,
+                                         on_fetched=self._segmentFetched.emit,
+                                         max_failures=self.MAX_RETRIES + 1)
+
+    def set_prefetch_depth(self, depth):
+        """Fixed number of segments to keep in flight; None derives it from bandwidth"""
+        self.prefetch.fixed_depth = depth
+
+    def set_abr_policy(self, policy):
+        if self.abr:
+            self.abr.set_policy(policy)
+
+    def configure_stream(self, segment_length, total_segments, max_quality):
+        """Size the buffer window and quality range for a newly selected video"""
+        self.segment_length = segment_length
+        self.total_segments = total_segments
+        self.buffer.configure(segment_length, total_segments)
+        if self.abr:
+            self.abr.configure(max_quality, segment_length)
+
+    def set_gapless(self, enabled):
+        self.gapless = enabled
 
     def handle_media_status(self, status):
         if status == QMediaPlayer.EndOfMedia:
+            self._boundary_at = time.monotonic()
             self.play_next_segment()
-        elif status == QMediaPlayer.LoadedMedia:
-            if self.next_segment_ready and self.next_segment_path:
-                self.playlist.addMedia(QMediaContent(QUrl.fromLocalFile(self.next_segment_path)))
-                self.next_segment_ready = False
-                self.next_segment_path = None
+        elif status == QMediaPlayer.BufferedMedia:
+            now = time.monotonic()
+            if self._seek_at is not None:
+                latency = (now - self._seek_at) * 1000
+                self._seek_at = None
+                self.seek_latencies.append(latency)
+                logger.info(f"Seek to first frame took {latency:.1f} ms")
+            elif self._boundary_at is not None:
+                gap = (now - self._boundary_at) * 1000
+                self.boundary_gaps.append(gap)
+                logger.debug(f"Segment boundary gap {gap:.1f} ms")
+            self._boundary_at = None
+
+    def boundary_gap_stats(self):
+        """Boundary gaps of recent segment switches in milliseconds"""
+        return _latency_stats(self.boundary_gaps)
+
+    def seek_latency_stats(self):
+        """Seek-to-first-frame latencies of recent seeks in milliseconds"""
+        return _latency_stats(self.seek_latencies)
+
+    def seek(self, segment_id, position=0):
+        """Jump to ``position`` ms into ``segment_id`` of the current video"""
+        if self.current_video_id is None:
+            return
+        if segment_id == self.current_segment and self._waiting_for is None:
+            self.media_player.setPosition(position)
+            return
+        self._seek_at = time.monotonic()
+        self.start_video(self.current_video_id, segment_id, position)
+
+    def start_video(self, video_id, segment_id=0, position=0):
+        """Start streaming ``video_id`` from ``segment_id``, ``position`` ms into it"""
+        if not self.network:
+            return
+        self.media_player.stop()
+        self.playlist.clear()
+        self._playlist_segments = []
+        self._boundary_at = None
+        self.current_video_id = video_id
+        self.current_segment = segment_id
+        self.buffer.set_playhead(segment_id)
+        self.prefetch.start(video_id, self.total_segments, self.segment_length)
+        # Requests for the old position would compete with the new target
+        window = self.prefetch.window(segment_id)
+        self.network.cancel_segment_requests(
+            keep=lambda request: request.video_id == video_id and request.segment_id in window)
+
+        if segment_id not in self.buffer:
+            # A cached copy in any quality beats waiting behind running downloads
+            qualities = sorted(range(self.abr.max_quality + 1), key=lambda q: abs(q - self.abr.quality))
+            cached_path = self.network.get_cached_segment_file(video_id, segment_id, qualities)
+            if cached_path:
+                self.buffer.add(segment_id, cached_path)
+
+        self._start_position = position
+        self._advance_to(segment_id)
 
     def play_next_segment(self):
         next_segment = self.current_segment + 1
         if next_segment < self.total_segments:
-            if next_segment in self.buffered_segments:
-                self.play_segment_from_buffer(next_segment)
-            else:
-                self.request_segment(next_segment)
+            self._advance_to(next_segment)
+        else:
+            self.playbackFinished.emit()
+
+    def _advance_to(self, segment_id):
+        """Play ``segment_id`` if it is buffered, otherwise wait for it"""
+        if self.buffer.get(segment_id):
+            self.play_segment_from_buffer(segment_id)
+        else:
+            logger.info(f"Waiting for segment {segment_id}")
+            # Prefetching may have given up on it; now it gets its own retries
+            self.prefetch.reset_failures(segment_id)
+            self._waiting_for = segment_id
+            self.current_segment = segment_id
+            self.buffer.set_playhead(segment_id)
+            self.prefetch.fill(segment_id)
+
+    def _on_segment_fetched(self, video_id, segment_id, tmp_path):
+        """Runs on the GUI thread for every finished prefetch request"""
+        if not self.prefetch.completed(video_id, segment_id):
+            if tmp_path:
+                self.buffer.discard(tmp_path)
+            return
 
-            if next_segment + 1 < self.total_segments:
-                self.buffer_segment(next_segment + 1)
+        if tmp_path:
+            self.prefetch.reset_failures(segment_id)
+            if self.buffer.add(segment_id, tmp_path) and self.gapless:
+                self._extend_playlist()
+        else:
+            failures = self.prefetch.failed(segment_id)
+            if segment_id == self._waiting_for and failures > self.MAX_RETRIES:
+                logger.error(f"Giving up on segment {segment_id}")
+                self._waiting_for = None
+                self.segmentFailed.emit(segment_id)
+                return
+            self._schedule_retry()
+
+        if segment_id == self._waiting_for and segment_id in self.buffer:
+            self.play_segment_from_buffer(segment_id)
+        else:
+            # Failed segments are skipped here until their backoff has passed
+            self.prefetch.fill(self.current_segment)
+
+    def _schedule_retry(self):
+        delay = self.prefetch.next_retry()
+        if delay is not None and (not self.retry_timer.isActive() or
+                                  delay * 1000 < self.retry_timer.remainingTime()):
+            self.retry_timer.start(int(delay * 1000) + 1)
+
+    def _retry_failed(self):
+        if self.prefetch and self.current_video_id is not None:
+            self.prefetch.fill(self.current_segment)
+            self._schedule_retry()
 
     def play_segment_from_buffer(self, segment_id):
-        file_path = self.buffered_segments.get(segment_id)
-        if file_path and os.path.exists(file_path):
+        file_path = self.buffer.get(segment_id)
+        if file_path:
+            self._waiting_for = None
+            # Set first so the playlist index change below is not taken for an advance
+            self.current_segment = segment_id
+            self._playlist_segments = [segment_id]
             self.playlist.clear()
             self.playlist.addMedia(QMediaContent(QUrl.fromLocalFile(file_path)))
+            self.playlist.setCurrentIndex(0)
             self.media_player.play()
-            self.current_segment = segment_id
+            if self._start_position:
+                self.media_player.setPosition(self._start_position)
+                self._start_position = 0
+            self._segment_started(segment_id)
+            if self.gapless:
+                self._extend_playlist()
             logger.info(f"Playing buffered segment {segment_id}")
 
-    def request_segment(self, segment_id):
-        if not self.network or not self.current_video_id:
-            return
+    def _segment_started(self, segment_id):
+        self.current_segment = segment_id
+        self.buffer.set_playhead(segment_id)
+        self.prefetch.fill(segment_id)
+        self.segmentStarted.emit(segment_id)
 
-        def callback(segment_data):
-            if segment_data:
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                        tmp_file.write(segment_data)
-                        tmp_path = tmp_file.name
-                        self.temp_files.append(tmp_path)
-                        self.buffered_segments[segment_id] = tmp_path
-
-                        if segment_id == self.current_segment + 1:
-                            self.play_segment_from_buffer(segment_id)
-                except Exception as e:
-                    logger.error(f"Error saving segment {segment_id}: {str(e)}")
-
-        self.network.get_video_segment_async(
-            self.current_video_id,
-            segment_id,
-            1,  # Quality level
-            callback
-        )
-
-    def buffer_segment(self, segment_id):
-        if segment_id in self.buffered_segments or not self.network or not self.current_video_id:
+    def _extend_playlist(self):
+        """Queue buffered segments that directly follow the playlist tail"""
+        if not self._playlist_segments:
             return
+        next_segment = self._playlist_segments[-1] + 1
+        while next_segment < self.total_segments and \
+                next_segment - self.current_segment <= self.GAPLESS_QUEUE:
+            file_path = self.buffer.get(next_segment)
+            if not file_path:
+                break
+            self.playlist.addMedia(QMediaContent(QUrl.fromLocalFile(file_path)))
+            self._playlist_segments.append(next_segment)
+            next_segment += 1
 
-        def callback(segment_data):
-            if segment_data:
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                        tmp_file.write(segment_data)
-                        tmp_path = tmp_file.name
-                        self.temp_files.append(tmp_path)
-                        self.buffered_segments[segment_id] = tmp_path
-                except Exception as e:
-                    logger.error(f"Error buffering segment {segment_id}: {str(e)}")
-
-        self.network.get_video_segment_async(
-            self.current_video_id,
-            segment_id,
-            1,  # Quality level
-            callback
-        )
-
-    def play_segment(self, segment_data, segment_id):
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                tmp_file.write(segment_data)
-                tmp_path = tmp_file.name
-                self.temp_files.append(tmp_path)
-
-                self.playlist.clear()
-                self.playlist.addMedia(QMediaContent(QUrl.fromLocalFile(tmp_path)))
-                self.media_player.play()
-                self.current_segment = segment_id
-
-                # Buffer next segment in advance
-                if segment_id + 1 < self.total_segments:
-                    self.buffer_segment(segment_id + 1)
-        except Exception as e:
-            logger.error(f"Error playing segment: {str(e)}")
-            QMessageBox.warning(self, "Playback Error", "Could not play video segment")
-
-    def buffer_next_segment(self, video_id, segment_id, quality, total_segments):
-        if not self.network:
+    def _on_playlist_index_changed(self, index):
+        """The playlist moved on to the next queued segment by itself"""
+        if index < 0 or index >= len(self._playlist_segments):
+            return
+        segment_id = self._playlist_segments[index]
+        if segment_id == self.current_segment:
             return
 
-        def callback(segment_data):
-            if segment_data:
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                        tmp_file.write(segment_data)
-                        tmp_path = tmp_file.name
-                        self.temp_files.append(tmp_path)
-                        self.next_segment_path = tmp_path
-                        self.next_segment_ready = True
-                except Exception as e:
-                    logger.error(f"Error buffering next segment: {str(e)}")
-
-        self.network.get_video_segment_async(video_id, segment_id, quality, callback)
+        self._boundary_at = time.monotonic()
+        self._segment_started(segment_id)
+        # Drop finished entries, their files may already be evicted from the buffer.
+        # The map shrinks first and removal does not re-enter this handler.
+        self.playlist.blockSignals(True)
+        try:
+            while self.playlist.currentIndex() > 0:
+                self._playlist_segments.pop(0)
+                self.playlist.removeMedia(0)
+        finally:
+            self.playlist.blockSignals(False)
+        self._extend_playlist()
+        logger.info(f"Playing queued segment {segment_id}")
 
     def stop_playback(self):
+        if self.network:
+            self.network.cancel_segment_requests()
+        self.prefetch.stop()
+        self.retry_timer.stop()
         self.media_player.stop()
         self.playlist.clear()
-        self.cleanup_temp_files()
+        self._playlist_segments = []
+        self.buffer.clear()
         self.current_video_id = None
-        self.buffered_segments.clear()
+        self._waiting_for = None
+        self._seek_at = None
         logger.info("Playback stopped")
 
-    def cleanup_temp_files(self):
-        for file_path in self.temp_files:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                logger.error(f"Error deleting temp file {file_path}: {str(e)}")
-        self.temp_files = []
-
     def handle_error(self, error):
         logger.error(f"Media player error: {error}")
         QMessageBox.warning(self, "Playback Error", f"An error occurred during playback: {error}")
@@ -0,0 +1,297 @@
+import socket
+import select
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List
+
+from .reader import SocketReader, ReadStats
+from .logger import logger
+
+
+class PoolTimeout(ConnectionError):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class SocketProfile:
+    """TCP options applied to every socket of a pool.
+
+    ``nodelay`` turns Nagle's algorithm off, so a request is sent at once
+    instead of waiting for the (possibly delayed) ACK of the previous
+    write. Buffer sizes of None keep the kernel default; on Linux setting
+    SO_RCVBUF also disables receive buffer autotuning, so only set it for
+    a reason. Keepalive probes notice a dead server on idle pooled
+    connections; ``keepalive_idle`` and ``keepalive_interval`` are seconds.
+    """
+
+    def __init__(self, nodelay: bool = True, rcvbuf: Optional[int] = None,
+                 sndbuf: Optional[int] = None, keepalive: bool = True,
+                 keepalive_idle: int = 60, keepalive_interval: int = 10,
+                 keepalive_count: int = 5):
+        self.nodelay = nodelay
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+        self.keepalive = keepalive
+        self.keepalive_idle = keepalive_idle
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_count = keepalive_count
+
+    def apply(self, sock: socket.socket) -> None:
+        """Set the options on ``sock``; ones the platform lacks are skipped"""
+        options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.nodelay))]
+        if self.rcvbuf:
+            options.append((socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf))
+        if self.sndbuf:
+            options.append((socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf))
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, int(self.keepalive)))
+        if self.keepalive:
+            # Linux names; macOS calls the idle time TCP_KEEPALIVE
+            idle = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+            for name, value in ((idle, self.keepalive_idle),
+                                (getattr(socket, 'TCP_KEEPINTVL', None), self.keepalive_interval),
+                                (getattr(socket, 'TCP_KEEPCNT', None), self.keepalive_count)):
+                if name is not None:
+                    options.append((socket.IPPROTO_TCP, name, value))
+
+        for level, name, value in options:
+            try:
+                sock.setsockopt(level, name, value)
+            except OSError as e:
+                logger.warning(f"Could not set socket option {name}={value}: {str(e)}")
+
+        if self.keepalive and hasattr(socket, 'SIO_KEEPALIVE_VALS'):
+            # Windows sets keepalive timing with an ioctl, in milliseconds
+            try:
+                sock.ioctl(socket.SIO_KEEPALIVE_VALS,
+                           (1, self.keepalive_idle * 1000, self.keepalive_interval * 1000))
+            except OSError as e:
+                logger.warning(f"Could not set keepalive timing: {str(e)}")
+
+    def __repr__(self):
+        return (f"SocketProfile(nodelay={self.nodelay}, rcvbuf={self.rcvbuf}, sndbuf={self.sndbuf}, "
+                f"keepalive={self.keepalive})")
+
+
+class Connection:
+    """A single pooled socket to the video server"""
+
+    def __init__(self, sock: socket.socket, read_stats: Optional[ReadStats] = None):
+        self.socket = sock
+        # All response data is read through this buffer
+        self.reader = SocketReader(sock, stats=read_stats)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Cleared when an exchange is abandoned half-way (e.g. a canceled upload)
+        self.reusable = True
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def is_alive(self) -> bool:
+        """Check that the peer has not closed the socket while it sat idle.
+
+        An idle request/response connection must never be readable nor have
+        bytes left in its read buffer: that means either EOF or stray bytes,
+        and both make the stream unusable.
+        """
+        if self.socket.fileno() < 0 or self.reader.buffered:
+            return False
+        try:
+            readable, _, _ = select.select([self.socket], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def close(self) -> None:
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.socket.close()
+        except OSError as e:
+            logger.error(f"Error closing pooled connection: {str(e)}")
+
+
+class ConnectionPool:
+    """Bounded pool of connections to a single host:port.
+
+    Callers check a connection out with ``acquire`` (or the ``connection``
+    context manager), use it exclusively for one request/response exchange
+    and check it back in. At most ``max_size`` sockets exist at once; extra
+    callers wait up to ``wait_timeout`` seconds.
+    """
+
+    def __init__(self, host: str, port: int, max_size: int = 4,
+                 connect_timeout: float = 10.0, idle_timeout: float = 60.0,
+                 wait_timeout: Optional[float] = 30.0, profile: Optional[SocketProfile] = None):
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.profile = profile or SocketProfile()
+
+        self._idle: List[Connection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Statistics
+        self._created = 0
+        self._evicted = 0
+        self._discarded = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self.read_stats = ReadStats()
+
+        logger.info(f"Initializing ConnectionPool for {host}:{port} (max_size={max_size})")
+
+    def _open(self) -> Connection:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            # Buffer sizes have to be set before connecting to affect the TCP window
+            self.profile.apply(sock)
+            sock.settimeout(self.connect_timeout)
+            sock.connect((self.host, self.port))
+            sock.settimeout(None)
+        except OSError:
+            sock.close()
+            raise
+        logger.debug(f"Opened pooled connection to {self.host}:{self.port}")
+        return Connection(sock, self.read_stats)
+
+    def _evict_idle(self) -> None:
+        """Drop idle connections past ``idle_timeout``. Caller holds the lock."""
+        now = time.monotonic()
+        keep = []
+        for conn in self._idle:
+            if now - conn.last_used > self.idle_timeout:
+                conn.close()
+                self._size -= 1
+                self._evicted += 1
+            else:
+                keep.append(conn)
+        self._idle = keep
+
+    def acquire(self, timeout: Optional[float] = None) -> Connection:
+        if timeout is None:
+            timeout = self.wait_timeout
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+
+                self._evict_idle()
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.is_alive():
+                        self._record_checkout(start, waited)
+                        return conn
+                    logger.debug("Discarding dead pooled connection")
+                    conn.close()
+                    self._size -= 1
+                    self._discarded += 1
+
+                if self._size < self.max_size:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available to {self.host}:{self.port} "
+                        f"after {timeout:.1f}s")
+                waited = True
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._open()
+        except OSError:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created += 1
+            self._record_checkout(start, waited)
+        return conn
+
+    def _record_checkout(self, start: float, waited: bool) -> None:
+        self._checkouts += 1
+        if waited:
+            wait = time.monotonic() - start
+            self._waits += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def release(self, conn: Connection, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if it is no longer usable"""
+        with self._cond:
+            discard = discard or not conn.reusable
+            if discard or self._closed:
+                conn.close()
+                self._size -= 1
+                if discard:
+                    self._discarded += 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Check out a connection for one exchange.
+
+        Any exception leaves the stream in an unknown state, so the
+        connection is closed instead of being returned to the pool.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+                self._size -= 1
+            self._idle = []
+            self._cond.notify_all()
+        logger.info(f"Closed connection pool for {self.host}:{self.port}")
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'created': self._created,
+                'evicted': self._evicted,
+                'discarded': self._discarded,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'total_wait': self._total_wait,
+                'avg_wait': self._total_wait / self._waits if self._waits else 0.0,
+                'max_wait': self._max_wait,
+                **self.read_stats.as_dict(),
+            }
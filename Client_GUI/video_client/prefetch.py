@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from typing import Optional, Callable, Dict, Tuple
+
+from .buffer import SegmentBuffer
+from .abr import AbrController
+from .scheduler import PRIORITY_PLAYBACK, PRIORITY_PREFETCH
+from .logger import logger
+
+
+class PrefetchPipeline:
+    """Keeps the next ``depth`` segments after the playhead in flight.
+
+    Segments are requested concurrently through the network client's
+    scheduler, nearer ones with higher priority. Completions may arrive in
+    any order; they are parked in the ``SegmentBuffer`` and the player takes
+    them from there strictly in segment order.
+
+    Without a fixed ``depth`` it is derived from the segment length and the
+    ratio between the current quality's bitrate and the measured throughput:
+    the slower downloads are relative to playback, the further ahead we go.
+
+    A segment whose fetch failed is requested again only after an
+    exponential backoff, and not at all after ``max_failures`` failures.
+    """
+
+    def __init__(self, network, buffer: SegmentBuffer, abr: AbrController,
+                 on_fetched: Callable[[int, int, Optional[str]], None],
+                 depth: Optional[int] = None, min_depth: int = 2, max_depth: int = 8,
+                 target_ahead: float = 20.0, max_failures: int = 3,
+                 retry_delay: float = 0.5, max_retry_delay: float = 10.0):
+        self.network = network
+        self.buffer = buffer
+        self.abr = abr
+        # Called from fetch threads with (video_id, segment_id, path)
+        self._on_fetched = on_fetched
+        self.fixed_depth = depth
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.target_ahead = target_ahead
+        self.max_failures = max_failures
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.video_id: Optional[int] = None
+        self.total_segments = 0
+        self.segment_length = 1
+        self._in_flight: Dict[int, Tuple[int, int]] = {}  # segment_id -> (quality, priority)
+        # segment_id -> (failures, monotonic time before which it is not requested again)
+        self._failures: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, video_id: int, total_segments: int, segment_length: int) -> None:
+        """Begin streaming ``video_id``, forgetting requests made before"""
+        with self._lock:
+            self.video_id = video_id
+            self.total_segments = total_segments
+            self.segment_length = max(segment_length, 1)
+            self._in_flight.clear()
+            self._failures.clear()
+
+    def stop(self) -> None:
+        with self._lock:
+            self.video_id = None
+            self._in_flight.clear()
+            self._failures.clear()
+
+    def depth(self) -> int:
+        if self.fixed_depth:
+            return self.fixed_depth
+
+        seconds = self.target_ahead
+        throughput = self.abr.meter.estimate()
+        bitrates = self.abr.meter.bitrates(self.abr.max_quality, self.segment_length)
+        if throughput and bitrates:
+            # Download time per second of video at the current quality
+            seconds *= max(1.0, bitrates[self.abr.quality] / throughput)
+        depth = math.ceil(seconds / self.segment_length)
+        return min(max(depth, self.min_depth), self.max_depth)
+
+    def window(self, playhead: int) -> range:
+        """Segments the pipeline wants in flight for ``playhead``"""
+        return range(playhead, min(playhead + self.depth(), self.total_segments - 1) + 1)
+
+    def fill(self, playhead: int) -> None:
+        """Request missing segments from ``playhead`` up to ``depth`` ahead of it"""
+        if self.video_id is None:
+            return
+
+        now = time.monotonic()
+        for segment_id in self.window(playhead):
+            if segment_id in self.buffer or not self.buffer.wanted(segment_id):
+                continue
+            priority = PRIORITY_PLAYBACK if segment_id == playhead else PRIORITY_PREFETCH + segment_id - playhead
+            with self._lock:
+                requested = self._in_flight.get(segment_id)
+                failure = self._failures.get(segment_id)
+            if requested is None and failure is not None and \
+                    (failure[0] >= self.max_failures or now < failure[1]):
+                continue
+            # Re-submitting an in-flight request only to raise its priority
+            if requested is None or priority < requested[1]:
+                self._request(segment_id, priority)
+
+    def _request(self, segment_id: int, priority: int) -> None:
+        with self._lock:
+            video_id = self.video_id
+            requested = self._in_flight.get(segment_id)
+            quality = requested[0] if requested else self.abr.choose(self.buffer.level())
+            self._in_flight[segment_id] = (quality, priority)
+
+        def callback(path):
+            self._on_fetched(video_id, segment_id, path)
+
+        try:
+            self.network.get_video_segment_async(video_id, segment_id, quality, callback,
+                                                 priority=priority)
+        except RuntimeError as e:
+            logger.error(f"Could not request segment {segment_id}: {str(e)}")
+            with self._lock:
+                self._in_flight.pop(segment_id, None)
+
+    def completed(self, video_id: int, segment_id: int) -> bool:
+        """Note that a request finished; False if it was for another video"""
+        with self._lock:
+            if video_id != self.video_id:
+                return False
+            self._in_flight.pop(segment_id, None)
+            return True
+
+    def failed(self, segment_id: int) -> int:
+        """Note a failed fetch of ``segment_id`` and back off; returns how often it failed"""
+        with self._lock:
+            failures = self._failures.get(segment_id, (0, 0.0))[0] + 1
+            delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+            self._failures[segment_id] = (failures, time.monotonic() + delay)
+        if failures >= self.max_failures:
+            logger.warning(f"Segment {segment_id} failed {failures} times, no longer prefetched")
+        return failures
+
+    def reset_failures(self, segment_id: int) -> None:
+        """Forget the failures of ``segment_id``, e.g. once it has been fetched"""
+        with self._lock:
+            self._failures.pop(segment_id, None)
+
+    def next_retry(self) -> Optional[float]:
+        """Seconds until a failed segment may be requested again, None if none is waiting"""
+        now = time.monotonic()
+        with self._lock:
+            waits = [retry_at - now for failures, retry_at in self._failures.values()
+                     if failures < self.max_failures and retry_at > now]
+        return min(waits) if waits else None
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
@@ -14,23 +14,15 @@ class VideoInfo:
 
     def to_bytes(self):
         try:
-            author_bytes = self.author.encode('utf-8')
-            title_bytes = self.title.encode('utf-8')
-            description_bytes = self.description.encode('utf-8')
-
-            data = struct.pack('!IIBB',
-                self.channel_id,
-                self.segment_amount,
-                self.segment_length,
-                self.max_quality)
-            data += struct.pack('!I', len(author_bytes)) + author_bytes
-            data += struct.pack('!I', len(title_bytes)) + title_bytes
-            data += struct.pack('!I', len(description_bytes)) + description_bytes
-            return data
+            return bytes(VIDEO_INFO.pack_object(self))
         except Exception as e:
             logger.error(f"Failed to serialize VideoInfo: {str(e)}")
             raise
 
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'VideoInfo':
+        return VIDEO_INFO.unpack_from(data)[0]
+
     def __repr__(self):
         return self.__str__()
 
@@ -46,11 +38,11 @@ class ChannelInfo:
         self.video_amount = video_amount
 
     def to_bytes(self):
-        name_bytes = self.name.encode('utf-8')
-        desc_bytes = self.description.encode('utf-8')
-        return (struct.pack('!I', len(name_bytes)) + name_bytes +
-                struct.pack('!I', len(desc_bytes)) + desc_bytes +
-                struct.pack('!III', self.subscribers, self.owner, self.video_amount))
+        return bytes(CHANNEL_INFO.pack_object(self))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ChannelInfo':
+        return CHANNEL_INFO.unpack_from(data)[0]
 
 class Protocol:
     """Protocol constants"""
@@ -69,6 +61,22 @@ class Protocol:
     UNSUBSCRIBE = 0x0C
     GET_USER_CHANNELS = 0x0D
     GET_USER_CHANNELS_BY_USER = 0x0E
+    HELLO = 0x0F
+    GET_VIDEO_INFO_BATCH = 0x10
+    UPLOAD_BEGIN = 0x11
+    UPLOAD_QUERY = 0x12
+    UPLOAD_CHUNK = 0x13
+    UPLOAD_FINISH = 0x14
+    SEGMENTED_BEGIN = 0x15
+    UPLOAD_SEGMENT = 0x16
+    SEGMENTED_FINISH = 0x17
+    GET_VIDEO_PAGE = 0x18
+
+    # Feature flags negotiated with HELLO
+    FEATURE_PIPELINING = 0x01
+    # The server acks every UPLOAD_ACK_UNIT of UPLOAD_VIDEO payload as soon as it
+    # has it, however the bytes were segmented, so several MiB may be in flight
+    FEATURE_UPLOAD_WINDOW = 0x02
 
     # Responses
     SUCCESS = 0x00
@@ -77,6 +85,8 @@ class Protocol:
     USERNAME_TAKEN = 0x03
     CHANNEL_NAME_TAKEN = 0x04
     NOT_SUBSCRIBED = 0x05
+    UNKNOWN_SESSION = 0x06
+    CHECKSUM_MISMATCH = 0x07
 
     @staticmethod
     def command_to_str(cmd):
@@ -93,6 +103,429 @@ class Protocol:
             0x09: 'DELETE_CHANNEL',
             0x0A: 'GET_CHANNEL_VIDEOS',
             0x0B: 'SUBSCRIBE',
-            0x0C: 'UNSUBSCRIBE'
+            0x0C: 'UNSUBSCRIBE',
+            0x0D: 'GET_USER_CHANNELS',
+            0x0E: 'GET_USER_CHANNELS_BY_USER',
+            0x0F: 'HELLO',
+            0x10: 'GET_VIDEO_INFO_BATCH',
+            0x11: 'UPLOAD_BEGIN',
+            0x12: 'UPLOAD_QUERY',
+            0x13: 'UPLOAD_CHUNK',
+            0x14: 'UPLOAD_FINISH',
+            0x15: 'SEGMENTED_BEGIN',
+            0x16: 'UPLOAD_SEGMENT',
+            0x17: 'SEGMENTED_FINISH',
+            0x18: 'GET_VIDEO_PAGE'
         }
-        return commands.get(cmd, f'UNKNOWN_{cmd}')
\ No newline at end of file
+        return commands.get(cmd, f'UNKNOWN_{cmd}')
+
+# Message schema
+#
+# Every request and response layout is declared once below as a list of
+# (name, type) fields and compiled into a codec when the module loads.
+# Fixed-size types are struct format codes; consecutive fixed-size fields
+# are merged into a single precompiled struct.Struct, so a whole run of
+# integers is packed or unpacked with one call. Decoders of messages are
+# generated as straight-line functions with nested messages flattened into
+# them, so a listing entry costs a handful of calls instead of one per field.
+
+U8 = 'B'
+U16 = 'H'
+U32 = 'I'
+U64 = 'Q'
+SESSION_ID = '16s'
+
+_LENGTH = struct.Struct('!I')
+
+
+class _Codec:
+    """Common encoding and decoding entry points of schema types"""
+
+    def unpack_from(self, buffer, offset: int = 0):
+        """Decode one value at ``offset`` of ``buffer``; returns it and the offset after it"""
+        raise NotImplementedError
+
+    def parser(self):
+        """Incremental decoder: a generator that yields how many bytes it needs next,
+        is sent exactly those bytes and returns the decoded value"""
+        raise NotImplementedError
+
+    def _prepare(self, value, items: list) -> int:
+        """Append (struct or None, values or bytes) write steps; returns their size"""
+        raise NotImplementedError
+
+    def read(self, recv):
+        """Decode one value from a stream; ``recv(n)`` must return exactly n bytes"""
+        parser = self.parser()
+        try:
+            size = next(parser)
+            while True:
+                size = parser.send(recv(size))
+        except StopIteration as done:
+            return done.value
+
+    def _pack(self, value) -> bytearray:
+        items = []
+        buffer = bytearray(self._prepare(value, items))
+        _write(items, buffer, 0)
+        return buffer
+
+
+def _write(items: list, buffer, offset: int) -> int:
+    for codec, value in items:
+        if codec is None:
+            buffer[offset:offset + len(value)] = value
+            offset += len(value)
+        else:
+            codec.pack_into(buffer, offset, *value)
+            offset += codec.size
+    return offset
+
+
+class _Bytes(_Codec):
+    """u32 length followed by raw bytes, or UTF-8 text if ``text``"""
+
+    def __init__(self, text: bool):
+        self.text = text
+
+    def unpack_from(self, buffer, offset: int = 0):
+        length = _LENGTH.unpack_from(buffer, offset)[0]
+        offset += 4
+        data = buffer[offset:offset + length]
+        return (str(data, 'utf-8') if self.text else bytes(data)), offset + length
+
+    def parser(self):
+        length = _LENGTH.unpack((yield 4))[0]
+        data = (yield length) if length else b''
+        return str(data, 'utf-8') if self.text else bytes(data)
+
+    def _prepare(self, value, items: list) -> int:
+        data = value.encode('utf-8') if self.text else value
+        items.append((_LENGTH, (len(data),)))
+        items.append((None, data))
+        return 4 + len(data)
+
+    def pack(self, value) -> bytearray:
+        return self._pack(value)
+
+
+STRING = _Bytes(text=True)
+BLOB = _Bytes(text=False)
+
+
+class ListOf(_Codec):
+    """u32 count followed by that many items of one type"""
+
+    def __init__(self, item):
+        self.item = item
+
+    def unpack_from(self, buffer, offset: int = 0):
+        count = _LENGTH.unpack_from(buffer, offset)[0]
+        offset += 4
+        if isinstance(self.item, str):
+            items = struct.Struct(f'!{count}{self.item}')
+            return list(items.unpack_from(buffer, offset)), offset + items.size
+        unpack_item = self.item.unpack_from
+        values = []
+        for _ in range(count):
+            value, offset = unpack_item(buffer, offset)
+            values.append(value)
+        return values, offset
+
+    def parser(self):
+        count = _LENGTH.unpack((yield 4))[0]
+        if isinstance(self.item, str):
+            items = struct.Struct(f'!{count}{self.item}')
+            return list(items.unpack((yield items.size))) if count else []
+        values = []
+        for _ in range(count):
+            values.append((yield from self.item.parser()))
+        return values
+
+    def _prepare(self, value, items: list) -> int:
+        items.append((_LENGTH, (len(value),)))
+        if isinstance(self.item, str):
+            packed = struct.Struct(f'!{len(value)}{self.item}')
+            items.append((packed, value))
+            return 4 + packed.size
+        return 4 + sum(self.item._prepare(item, items) for item in value)
+
+    def pack(self, value) -> bytearray:
+        return self._pack(value)
+
+
+class Sized(_Codec):
+    """u32 byte length followed by one message; bytes after the message are skipped"""
+
+    def __init__(self, message: 'Message'):
+        self.message = message
+
+    def unpack_from(self, buffer, offset: int = 0):
+        length = _LENGTH.unpack_from(buffer, offset)[0]
+        offset += 4
+        return self.message.unpack_from(buffer, offset)[0], offset + length
+
+    def parser(self):
+        length = _LENGTH.unpack((yield 4))[0]
+        return self.message.unpack_from((yield length))[0]
+
+    def _prepare(self, value, items: list) -> int:
+        nested = []
+        size = self.message._prepare(value, nested)
+        items.append((_LENGTH, (size,)))
+        items.extend(nested)
+        return 4 + size
+
+
+class Message(_Codec):
+    """Codec of one message layout.
+
+    ``fields`` are (name, type) pairs in wire order; a type is a struct
+    format code or another schema type. Decoded values are passed to
+    ``factory`` in field order, or returned as a tuple without one.
+    Nested messages are packed from a tuple or from an object with
+    attributes named like the fields.
+    """
+
+    def __init__(self, name: str, fields, factory=None):
+        self.name = name
+        self.names = tuple(field for field, _ in fields)
+        self.factory = factory
+        self._kinds = tuple(kind for _, kind in fields)
+        self._steps = []  # (struct, field count) for fixed runs, (codec, None) otherwise
+        run = []
+        for _, kind in fields:
+            if isinstance(kind, str):
+                run.append(kind)
+                continue
+            if run:
+                self._steps.append((struct.Struct('!' + ''.join(run)), len(run)))
+                run = []
+            self._steps.append((kind, None))
+        if run:
+            self._steps.append((struct.Struct('!' + ''.join(run)), len(run)))
+        # Messages of fixed-size fields only are a single struct
+        self.struct = self._steps[0][0] if len(self._steps) == 1 and self._steps[0][1] else None
+        self.unpack_from, self.parser = _compile_decoders(self)
+
+    def _flatten(self, ops: list, variables: list) -> str:
+        """Append decode ops of all fields, nested messages inlined; returns the result variable"""
+        values = []
+        for kind in self._kinds:
+            if isinstance(kind, Message):
+                values.append(kind._flatten(ops, variables))
+                continue
+            variable = f'v{len(variables)}'
+            variables.append(variable)
+            if isinstance(kind, str):
+                ops.append(('fixed', kind, variable))
+            elif isinstance(kind, _Bytes):
+                # The length prefix is a fixed field like any other
+                ops.append(('fixed', U32, f'n{variable}'))
+                ops.append(('data', kind, variable))
+            else:
+                ops.append(('codec', kind, variable))
+            values.append(variable)
+        result = f'v{len(variables)}'
+        variables.append(result)
+        ops.append(('build', self.factory, result, values))
+        return result
+
+    def _prepare(self, value, items: list) -> int:
+        if not isinstance(value, (tuple, list)):
+            value = [getattr(value, field) for field in self.names]
+        if len(value) != len(self.names):
+            raise ValueError(f"{self.name} takes {len(self.names)} values, got {len(value)}")
+        size = 0
+        index = 0
+        for codec, count in self._steps:
+            if count:
+                items.append((codec, value[index:index + count]))
+                size += codec.size
+                index += count
+            else:
+                size += codec._prepare(value[index], items)
+                index += 1
+        return size
+
+    def pack(self, *values) -> bytearray:
+        return self._pack(values)
+
+    def pack_object(self, obj) -> bytearray:
+        return self._pack(obj)
+
+    def pack_into(self, buffer, offset: int, *values) -> int:
+        """Encode into ``buffer`` at ``offset``; returns the offset after the message"""
+        items = []
+        self._prepare(values, items)
+        return _write(items, buffer, offset)
+
+
+def _compile_decoders(message: Message):
+    """Generate ``unpack_from`` and ``parser`` functions of ``message``"""
+    ops = []
+    result = message._flatten(ops, [])
+
+    # Builds only read decoded values and each other, so they all move to
+    # the end; this lets fixed fields of nested messages merge with the
+    # fields around them
+    merged = []
+    for op in ops:
+        if op[0] == 'fixed' and merged and merged[-1][0] == 'fixed':
+            merged[-1][1].append(op[1])
+            merged[-1][2].append(op[2])
+        elif op[0] == 'fixed':
+            merged.append(('fixed', [op[1]], [op[2]]))
+        elif op[0] != 'build':
+            merged.append(op)
+    merged.extend(op for op in ops if op[0] == 'build')
+
+    namespace = {}
+    unpack_lines = ['def unpack_from(buffer, offset=0):']
+    parser_lines = ['def parser():']
+    for index, op in enumerate(merged):
+        name = f'_k{index}'
+        if op[0] == 'fixed':
+            _, formats, variables = op
+            packed = namespace[name] = struct.Struct('!' + ''.join(formats))
+            targets = ', '.join(variables) + ','
+            unpack_lines.append(f'    {targets} = {name}.unpack_from(buffer, offset)')
+            unpack_lines.append(f'    offset += {packed.size}')
+            if index and merged[index - 1][0] == 'data':
+                # Already received along with the preceding data
+                parser_lines.append(f'    {targets} = {name}.unpack_from(chunk, n)')
+            else:
+                parser_lines.append(f'    {targets} = {name}.unpack((yield {packed.size}))')
+        elif op[0] == 'data':
+            _, codec, variable = op
+            convert, empty = ("str({}, 'utf-8')", "''") if codec.text else ('bytes({})', "b''")
+            unpack_lines.append(f'    {variable} = {convert.format(f"buffer[offset:offset + n{variable}]")}')
+            unpack_lines.append(f'    offset += n{variable}')
+            following = merged[index + 1] if index + 1 < len(merged) else None
+            if following and following[0] == 'fixed':
+                # Receive the fixed fields after the data in the same read
+                size = struct.calcsize('!' + ''.join(following[1]))
+                parser_lines.append(f'    n = n{variable}')
+                parser_lines.append(f'    chunk = yield n + {size}')
+                parser_lines.append(f'    {variable} = {convert.format("chunk[:n]")}')
+            else:
+                parser_lines.append(f'    {variable} = {convert.format(f"(yield n{variable})")} '
+                                    f'if n{variable} else {empty}')
+        elif op[0] == 'codec':
+            _, codec, variable = op
+            namespace[name] = codec
+            unpack_lines.append(f'    {variable}, offset = {name}.unpack_from(buffer, offset)')
+            parser_lines.append(f'    {variable} = yield from {name}.parser()')
+        else:
+            _, factory, variable, values = op
+            arguments = ', '.join(values)
+            if factory is None:
+                line = f'    {variable} = ({arguments},)'
+            else:
+                namespace[name] = factory
+                line = f'    {variable} = {name}({arguments})'
+            unpack_lines.append(line)
+            parser_lines.append(line)
+    unpack_lines.append(f'    return {result}, offset')
+    parser_lines.append(f'    return {result}')
+    # A parser must be a generator even if the message has no fields
+    parser_lines.append('    yield')
+
+    source = '\n'.join(unpack_lines + parser_lines)
+    exec(compile(source, f'<{message.name} codec>', 'exec'), namespace)
+    return namespace['unpack_from'], namespace['parser']
+
+
+class Request(Message):
+    """A command byte followed by the command's fields"""
+
+    def __init__(self, command: int, fields):
+        super().__init__(Protocol.command_to_str(command), [('command', U8)] + list(fields))
+        self.command = command
+        # Pipelined requests carry the command in their frame header
+        self.body = Message(self.name, fields)
+
+    def pack(self, *values) -> bytearray:
+        return self._pack((self.command,) + values)
+
+
+VIDEO_INFO = Message('VideoInfo', [
+    ('channel_id', U32),
+    ('segment_amount', U32),
+    ('segment_length', U8),
+    ('max_quality', U8),
+    ('author', STRING),
+    ('title', STRING),
+    ('description', STRING),
+], factory=VideoInfo)
+
+CHANNEL_INFO = Message('ChannelInfo', [
+    ('name', STRING),
+    ('description', STRING),
+    ('subscribers', U32),
+    ('owner', U32),
+    ('video_amount', U32),
+], factory=ChannelInfo)
+
+# (id, info) pairs of listings
+VIDEO_ENTRY = Message('VideoEntry', [('video_id', U32), ('info', VIDEO_INFO)])
+CHANNEL_ENTRY = Message('ChannelEntry', [('channel_id', U32), ('info', CHANNEL_INFO)])
+
+REQUESTS = {request.command: request for request in [
+    Request(Protocol.GET_VIDEO_INFO, [('video_id', U32)]),
+    Request(Protocol.GET_VIDEO_SEGMENT, [('video_id', U32), ('segment_id', U32), ('quality', U8)]),
+    # The token is optional: without it the server sends the public list
+    Request(Protocol.GET_VIDEO_LIST, [('token', STRING)]),
+    Request(Protocol.LOGIN, [('username', STRING), ('password', STRING)]),
+    Request(Protocol.REGISTER, [('username', STRING), ('password', STRING)]),
+    # Followed by the file in 1 MiB chunks, each acknowledged with a status byte
+    Request(Protocol.UPLOAD_VIDEO, [('token', STRING), ('channel_id', U32), ('title', STRING),
+                                    ('description', STRING), ('file_size', U64)]),
+    Request(Protocol.GET_CHANNEL_INFO, [('channel_id', U32)]),
+    Request(Protocol.CREATE_CHANNEL, [('token', STRING), ('name', STRING), ('description', STRING)]),
+    Request(Protocol.GET_CHANNEL_VIDEOS, [('channel_id', U32), ('offset', U32), ('limit', U32)]),
+    Request(Protocol.SUBSCRIBE, [('token', STRING), ('channel_id', U32)]),
+    Request(Protocol.UNSUBSCRIBE, [('token', STRING), ('channel_id', U32)]),
+    Request(Protocol.GET_USER_CHANNELS, [('token', STRING)]),
+    Request(Protocol.GET_USER_CHANNELS_BY_USER, [('token', STRING), ('username', STRING)]),
+    Request(Protocol.HELLO, [('features', U32)]),
+    Request(Protocol.GET_VIDEO_INFO_BATCH, [('video_ids', ListOf(U32))]),
+    Request(Protocol.UPLOAD_BEGIN, [('token', STRING), ('channel_id', U32), ('title', STRING),
+                                    ('description', STRING), ('file_size', U64), ('chunk_size', U32)]),
+    Request(Protocol.UPLOAD_QUERY, [('session', SESSION_ID)]),
+    # Followed by ``length`` bytes of data
+    Request(Protocol.UPLOAD_CHUNK, [('session', SESSION_ID), ('offset', U64), ('length', U32),
+                                    ('crc32', U32)]),
+    Request(Protocol.UPLOAD_FINISH, [('session', SESSION_ID)]),
+    Request(Protocol.SEGMENTED_BEGIN, [('token', STRING), ('channel_id', U32), ('title', STRING),
+                                       ('description', STRING), ('segment_amount', U32),
+                                       ('segment_length', U8), ('max_quality', U8)]),
+    # Followed by ``size`` bytes of data
+    Request(Protocol.UPLOAD_SEGMENT, [('token', STRING), ('video_id', U32), ('segment_id', U32),
+                                      ('quality', U8), ('size', U64), ('crc32', U32)]),
+    Request(Protocol.SEGMENTED_FINISH, [('token', STRING), ('video_id', U32)]),
+    # An empty token asks for the public list
+    Request(Protocol.GET_VIDEO_PAGE, [('token', STRING), ('offset', U32), ('limit', U32)]),
+]}
+
+
+def encode_request(command: int, *values) -> bytearray:
+    """Whole request frame of ``command``, ready to send"""
+    return REQUESTS[command].pack(*values)
+
+
+# Responses
+STATUS = Message('Status', [('status', U8)])
+STATUS_ID = Message('StatusId', [('status', U8), ('id', U32)])
+SIZE = Message('Size', [('size', U32)])
+OFFSET = Message('Offset', [('offset', U64)])
+SESSION = Message('Session', [('session', SESSION_ID)])
+HELLO_RESPONSE = Message('Hello', [('status', U8), ('features', U32)])
+# Status byte and body length of framed responses
+FRAME_HEADER = Message('Frame', [('status', U8), ('length', U32)])
+VIDEO_LIST = ListOf(VIDEO_ENTRY)
+# After a status byte: size of the whole list and the requested slice of it
+VIDEO_PAGE = Message('VideoPage', [('total', U32), ('videos', VIDEO_LIST)])
+CHANNEL_LIST = ListOf(CHANNEL_ENTRY)
+VIDEO_IDS = ListOf(U32)
+VIDEO_INFO_BATCH = ListOf(Message('VideoInfoRecord', [('video_id', U32), ('info', Sized(VIDEO_INFO))]))
@@ -0,0 +1,117 @@
+import socket
+from typing import Optional
+
+# Read-ahead buffer of each connection
+READ_BUFFER_SIZE = 64 * 1024
+
+
+class ReadStats:
+    """recv syscalls made by the readers sharing this object (e.g. a whole pool)"""
+
+    def __init__(self):
+        self.recv_calls = 0
+        self.bytes_received = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'recv_calls': self.recv_calls,
+            'bytes_received': self.bytes_received,
+            'avg_recv': self.bytes_received / self.recv_calls if self.recv_calls else 0.0,
+        }
+
+
+class SocketReader:
+    """Read-ahead buffer in front of a socket.
+
+    Responses are parsed in many small pieces: a length, a few ids, a
+    title. Instead of one ``recv`` per piece, the reader takes whatever
+    the kernel already has (up to ``buffer_size`` bytes) into one reusable
+    buffer and hands the pieces out of it. Reads larger than half the
+    buffer drain what is buffered and then go straight from the socket
+    into the caller's memory, so segment payloads are not copied twice.
+
+    Since a server only sends what was asked for, the buffer is empty
+    again once a response has been read completely.
+    """
+
+    def __init__(self, sock: socket.socket, buffer_size: int = READ_BUFFER_SIZE,
+                 stats: Optional[ReadStats] = None):
+        self.socket = sock
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self.stats = stats or ReadStats()
+
+    @property
+    def buffered(self) -> int:
+        """Bytes received but not read yet"""
+        return self._end - self._start
+
+    def _recv(self, view: memoryview) -> int:
+        n = self.socket.recv_into(view)
+        if n == 0:
+            raise ConnectionError("Server closed connection")
+        self.stats.recv_calls += 1
+        self.stats.bytes_received += n
+        return n
+
+    def _fill(self, size: int) -> None:
+        """Buffer at least ``size`` bytes, which must fit into the buffer"""
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._start + size > len(self._buffer):
+            # Move the unread rest to the front to make room
+            buffered = self.buffered
+            self._view[:buffered] = self._view[self._start:self._end]
+            self._start, self._end = 0, buffered
+        while self._end - self._start < size:
+            self._end += self._recv(self._view[self._end:])
+
+    def _take(self, size: int) -> bytearray:
+        data = self._buffer[self._start:self._start + size]
+        self._start += size
+        return data
+
+    def readexactly(self, size: int) -> bytearray:
+        """Exactly ``size`` bytes; raises ConnectionError if the peer closes first"""
+        if size <= self.buffered:
+            return self._take(size)
+        if size > len(self._buffer) // 2:
+            data = bytearray(size)
+            self.readinto(memoryview(data))
+            return data
+        self._fill(size)
+        return self._take(size)
+
+    def readinto(self, view: memoryview) -> None:
+        """Fill ``view`` completely"""
+        size = len(view)
+        received = min(self.buffered, size)
+        if received:
+            view[:received] = self._view[self._start:self._start + received]
+            self._start += received
+        while received < size:
+            received += self._recv(view[received:])
+
+    def peek(self, size: int) -> bytes:
+        """The next ``size`` bytes without consuming them"""
+        if size > len(self._buffer):
+            raise ValueError(f"Cannot peek {size} bytes with a {len(self._buffer)} byte buffer")
+        self._fill(size)
+        return bytes(self._view[self._start:self._start + size])
+
+    def recv_into(self, view: memoryview) -> int:
+        """Like ``socket.recv_into``: buffered bytes first, else one read from the socket"""
+        if self.buffered:
+            n = min(self.buffered, len(view))
+            view[:n] = self._view[self._start:self._start + n]
+            self._start += n
+            return n
+        return self._recv(view)
+
+    def recv(self, limit: int) -> bytearray:
+        """Like ``socket.recv``: up to ``limit`` bytes, blocking only when nothing is buffered"""
+        if not self.buffered:
+            self._fill(1)
+        return self._take(min(limit, self.buffered))
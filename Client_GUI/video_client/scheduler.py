@@ -0,0 +1,163 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+from typing import Optional, Callable, Dict, Tuple, List, Any
+
+from .logger import logger
+
+# Lower value runs first
+PRIORITY_PLAYBACK = 0
+PRIORITY_PREFETCH = 10
+
+
+class SegmentRequest:
+    """A queued or running segment fetch"""
+
+    def __init__(self, video_id: int, segment_id: int, quality: int, priority: int):
+        self.video_id = video_id
+        self.segment_id = segment_id
+        self.quality = quality
+        self.priority = priority
+        self.future: Future = Future()
+        self.callbacks: List[Callable[[Any], None]] = []
+        self.started = False
+        self.obsolete = False
+
+    @property
+    def key(self) -> Tuple[int, int, int]:
+        return self.video_id, self.segment_id, self.quality
+
+    def __repr__(self):
+        return f"SegmentRequest(video={self.video_id}, segment={self.segment_id}, " \
+               f"quality={self.quality}, priority={self.priority})"
+
+
+class SegmentScheduler:
+    """Bounded, prioritized executor for segment fetches.
+
+    Requests wait in a priority queue and are served by a fixed set of
+    worker threads, so the segment needed for playback overtakes
+    speculative prefetches. Requesting a segment that is already queued or
+    downloading returns the existing future (raising its priority if
+    needed) instead of fetching it twice.
+    """
+
+    def __init__(self, fetch: Callable[[int, int, int], Any], max_workers: int = 4,
+                 discard: Optional[Callable[[Any], None]] = None):
+        self._fetch = fetch
+        # Releases results nobody wants any more (e.g. removes a temp file)
+        self._discard = discard
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='segment-fetch')
+        self._queue: List[Tuple[int, int, SegmentRequest]] = []
+        self._requests: Dict[Tuple[int, int, int], SegmentRequest] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, video_id: int, segment_id: int, quality: int,
+               priority: int = PRIORITY_PREFETCH,
+               callback: Optional[Callable[[Any], None]] = None) -> Future:
+        """Queue a fetch; ``callback`` runs on a worker thread unless the request is cancelled"""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Segment scheduler is shut down")
+
+            key = (video_id, segment_id, quality)
+            request = self._requests.get(key)
+            if request is not None:
+                if callback:
+                    request.callbacks.append(callback)
+                if request.started or priority >= request.priority:
+                    return request.future
+                # Re-queue with the higher priority; the old heap entry is skipped when popped
+                logger.debug(f"Boosting {request} to priority {priority}")
+                request.priority = priority
+            else:
+                request = SegmentRequest(video_id, segment_id, quality, priority)
+                if callback:
+                    request.callbacks.append(callback)
+                self._requests[key] = request
+
+            heapq.heappush(self._queue, (request.priority, next(self._counter), request))
+
+        self._executor.submit(self._run_next)
+        return request.future
+
+    def _pop(self) -> Optional[SegmentRequest]:
+        with self._lock:
+            while self._queue:
+                priority, _, request = heapq.heappop(self._queue)
+                if request.started or request.future.cancelled() or priority != request.priority:
+                    continue
+                request.started = True
+                return request
+            return None
+
+    def _run_next(self) -> None:
+        request = self._pop()
+        if request is None:
+            return
+        if not request.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            segment = self._fetch(request.video_id, request.segment_id, request.quality)
+            error = None
+        except Exception as e:
+            logger.error(f"Async segment error: {str(e)}")
+            segment, error = None, e
+
+        with self._lock:
+            if self._requests.get(request.key) is request:
+                del self._requests[request.key]
+            obsolete = request.obsolete
+            callbacks = list(request.callbacks)
+
+        if obsolete:
+            logger.debug(f"Dropping result of obsolete {request}")
+            if segment is not None and self._discard:
+                self._discard(segment)
+            request.future.set_exception(CancelledError())
+            return
+
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(segment)
+
+        for callback in callbacks:
+            try:
+                callback(segment)
+            except Exception as e:
+                logger.error(f"Segment callback error: {str(e)}", exc_info=True)
+
+    def cancel(self, predicate: Callable[[SegmentRequest], bool]) -> int:
+        """Cancel queued requests matching ``predicate`` and drop results of running ones"""
+        cancelled = 0
+        with self._lock:
+            for key, request in list(self._requests.items()):
+                if not predicate(request):
+                    continue
+                request.obsolete = True
+                if not request.started:
+                    request.future.cancel()
+                del self._requests[key]
+                cancelled += 1
+        if cancelled:
+            logger.debug(f"Cancelled {cancelled} segment requests")
+        return cancelled
+
+    def cancel_all(self) -> int:
+        return self.cancel(lambda request: True)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._requests)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+        self.cancel_all()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,93 @@
+from typing import Optional, Callable, Any, Set
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from .logger import logger
+
+
+class TaskSignals(QObject):
+    """Signals of a Task; emitted on a worker thread and delivered on the GUI thread"""
+
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+
+
+class Task(QRunnable):
+    """A blocking call run on a worker thread.
+
+    With ``progress=True`` the call gets ``report_progress`` as its last
+    argument; it emits the progress signal and returns False once the task
+    has been cancelled, matching the ``progress_callback`` convention of
+    ``NetworkClient.upload_video``.
+    """
+
+    def __init__(self, fn: Callable[..., Any], *args, progress: bool = False, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.with_progress = progress
+        self.cancelled = False
+        self.signals = TaskSignals()
+
+    def report_progress(self, value: int) -> bool:
+        self.signals.progress.emit(value)
+        return not self.cancelled
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def run(self) -> None:
+        args = self.args + (self.report_progress,) if self.with_progress else self.args
+        try:
+            result = self.fn(*args, **self.kwargs)
+        except Exception as e:
+            logger.error(f"Task {getattr(self.fn, '__name__', self.fn)} failed: {str(e)}", exc_info=True)
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QObject):
+    """Runs blocking network calls on a thread pool so Qt slots never wait on sockets"""
+
+    def __init__(self, max_threads: int = 4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # Tasks must stay referenced until their signals have been delivered
+        self._tasks: Set[Task] = set()
+
+    def run(self, fn: Callable[..., Any], *args,
+            on_result: Optional[Callable[[Any], None]] = None,
+            on_error: Optional[Callable[[Exception], None]] = None,
+            on_progress: Optional[Callable[[int], None]] = None,
+            on_finished: Optional[Callable[[], None]] = None,
+            progress: bool = False, **kwargs) -> Task:
+        """Run ``fn(*args, **kwargs)`` off the GUI thread; callbacks are invoked on the GUI thread"""
+        task = Task(fn, *args, progress=progress, **kwargs)
+        if on_result:
+            task.signals.result.connect(on_result)
+        if on_error:
+            task.signals.error.connect(on_error)
+        if on_progress:
+            task.signals.progress.connect(on_progress)
+        if on_finished:
+            task.signals.finished.connect(on_finished)
+        task.signals.finished.connect(lambda: self._tasks.discard(task))
+
+        self._tasks.add(task)
+        self.pool.start(task)
+        return task
+
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Block until all running tasks are done, e.g. before exiting"""
+        return self.pool.waitForDone(msecs)
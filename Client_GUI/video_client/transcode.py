@@ -0,0 +1,148 @@
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from typing import Optional, List, Iterator, Tuple, NamedTuple
+
+from .logger import logger
+
+
+class QualityLevel(NamedTuple):
+    height: int
+    video_bitrate: str
+    audio_bitrate: str
+
+
+# Quality index -> encoding settings; higher index is better, as the player's ABR expects
+DEFAULT_LADDER = [
+    QualityLevel(360, '800k', '96k'),
+    QualityLevel(480, '1400k', '128k'),
+    QualityLevel(720, '2800k', '128k'),
+    QualityLevel(1080, '5000k', '192k'),
+]
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Path of the local ffmpeg binary, None if it is not installed"""
+    return shutil.which('ffmpeg')
+
+
+def probe(source: str) -> Tuple[float, int]:
+    """Duration in seconds and video height of ``source``"""
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe:
+        raise TranscodeError("ffprobe not found")
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json', '-select_streams', 'v:0',
+         '-show_entries', 'format=duration:stream=height', source],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        raise TranscodeError(f"ffprobe failed: {result.stderr.strip()}")
+    info = json.loads(result.stdout)
+    try:
+        return float(info['format']['duration']), int(info['streams'][0]['height'])
+    except (KeyError, IndexError, ValueError) as e:
+        raise TranscodeError(f"No video stream in {source}") from e
+
+
+class SegmentEncoder:
+    """Cuts a video into ``segment_length`` second segments at several qualities.
+
+    Every (segment, quality) pair is an independent ffmpeg process, so
+    each output file starts on a key frame and plays on its own. Up to
+    ``workers`` encoders run at once. Jobs are queued in playback order
+    with the lowest quality of each segment first, and finished segments
+    are handed out as soon as they are ready, so uploading can start long
+    before the last segment has been encoded.
+    """
+
+    def __init__(self, source: str, segment_length: int = 10,
+                 ladder: Optional[List[QualityLevel]] = None,
+                 workers: Optional[int] = None, work_dir: Optional[str] = None):
+        self.ffmpeg = find_ffmpeg()
+        if not self.ffmpeg:
+            raise TranscodeError("ffmpeg not found")
+
+        self.source = source
+        self.segment_length = segment_length
+        duration, height = probe(source)
+        self.duration = duration
+        self.segment_count = max(math.ceil(duration / segment_length), 1)
+
+        # No point in levels above the source resolution, but keep at least one
+        ladder = ladder or DEFAULT_LADDER
+        self.ladder = [level for level in ladder if level.height <= height] or ladder[:1]
+        self.max_quality = len(self.ladder) - 1
+
+        self.workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.work_dir = tempfile.mkdtemp(prefix='segments_', dir=work_dir)
+        self._processes = set()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        logger.info(f"Encoding {source}: {duration:.1f}s into {self.segment_count} segments "
+                    f"x {len(self.ladder)} qualities with {self.workers} workers")
+
+    def _command(self, segment_id: int, quality: int, out_path: str) -> List[str]:
+        level = self.ladder[quality]
+        start = segment_id * self.segment_length
+        return [
+            self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-ss', str(start), '-i', self.source, '-t', str(self.segment_length),
+            '-vf', f'scale=-2:min(ih\\,{level.height})',
+            '-c:v', 'libx264', '-preset', 'veryfast',
+            '-b:v', level.video_bitrate, '-maxrate', level.video_bitrate,
+            '-bufsize', level.video_bitrate,
+            '-c:a', 'aac', '-b:a', level.audio_bitrate,
+            '-movflags', '+faststart', out_path,
+        ]
+
+    def _encode(self, segment_id: int, quality: int) -> Tuple[int, int, str]:
+        out_path = os.path.join(self.work_dir, f'{segment_id}_{quality}.mp4')
+        with self._lock:
+            if self._cancelled:
+                raise TranscodeError("Encoding cancelled")
+            process = subprocess.Popen(self._command(segment_id, quality, out_path),
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            self._processes.add(process)
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        if process.returncode != 0:
+            raise TranscodeError(f"ffmpeg failed on segment {segment_id} quality {quality}: "
+                                 f"{stderr.decode(errors='replace').strip()}")
+        return segment_id, quality, out_path
+
+    def run(self) -> Iterator[Tuple[int, int, str]]:
+        """Encode everything; yields ``(segment_id, quality, path)`` in completion order"""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ffmpeg') as executor:
+            futures: List[Future] = [executor.submit(self._encode, segment_id, quality)
+                                     for segment_id in range(self.segment_count)
+                                     for quality in range(len(self.ladder))]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+                self.cancel()
+
+    def cancel(self) -> None:
+        """Stop queued and running encoders"""
+        with self._lock:
+            self._cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -1,16 +1,26 @@
 from PyQt5.QtWidgets import (QHBoxLayout, QVBoxLayout, QWidget, QPushButton,
-                            QSlider, QLabel, QListWidget, QDialog,
+                            QSlider, QLabel, QListView, QDialog,
                             QDialogButtonBox, QFrame, QLineEdit, QFormLayout,
-                            QScrollArea, QListWidgetItem, QMessageBox,
+                            QScrollArea, QMessageBox,
                             QComboBox, QProgressBar, QToolButton, QFileDialog,
-                            QTextEdit, QProgressDialog, QCheckBox, QTabWidget)
+                            QTextEdit, QProgressDialog, QCheckBox, QTabWidget,
+                            QSpinBox)
 from PyQt5.QtCore import Qt, QSize, QCoreApplication
 from PyQt5.QtGui import QPalette, QColor, QIcon, QFont
 import os
 import logging
 
+from .transcode import find_ffmpeg
+from .models import EntryListModel, VideoListModel, ChannelListModel
+
 logger = logging.getLogger(__name__)
 
+
+def _selected_entry(view: QListView):
+    """(id, info) of the row selected in a view over an EntryListModel, None if nothing is"""
+    indexes = view.selectionModel().selectedIndexes()
+    return indexes[0].data(EntryListModel.EntryRole) if indexes else None
+
 class DarkPalette(QPalette):
     def __init__(self):
         super().__init__()
@@ -82,14 +92,14 @@ class VideoPlayerUI:
             QLabel {
                 color: white;
             }
-            QListWidget {
+            QListView {
                 background-color: #252525;
                 border: 1px solid #444;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 5px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #2a82da;
             }
             QProgressBar {
@@ -189,9 +199,11 @@ class VideoPlayerUI:
         self.video_list_label = QLabel("Доступные видео")
         video_list_layout.addWidget(self.video_list_label)
 
-        self.video_list_widget = QListWidget()
-        self.video_list_widget.setFlow(QListWidget.LeftToRight)
+        # Rows come from VideoListModel, which loads more as the view is scrolled
+        self.video_list_widget = QListView()
+        self.video_list_widget.setFlow(QListView.LeftToRight)
         self.video_list_widget.setWrapping(False)
+        self.video_list_widget.setUniformItemSizes(True)
         self.video_list_widget.setFixedHeight(75)
         video_list_layout.addWidget(self.video_list_widget)
 
@@ -284,11 +296,14 @@ class RegisterDialog(QDialog):
 
 
 class UserAccountDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, video_model=None, channel_model=None):
         super().__init__(parent)
         self.setWindowTitle("Мой аккаунт")
         self.setFixedSize(600, 500)
         self.parent_widget = parent
+        # Models may outlive the dialog and be shared with other views
+        self.video_model = video_model or VideoListModel(parent=self)
+        self.channel_model = channel_model or ChannelListModel(self)
 
         layout = QVBoxLayout(self)
 
@@ -320,22 +335,19 @@ class UserAccountDialog(QDialog):
         buttons_layout = QHBoxLayout(buttons_panel)
 
         self.upload_btn = QPushButton("Загрузить видео")
-        self.edit_btn = QPushButton("Редактировать")
-        self.edit_btn.setEnabled(False)
 
         buttons_layout.addWidget(self.upload_btn)
-        buttons_layout.addWidget(self.edit_btn)
         buttons_layout.addStretch()
 
         layout.addWidget(buttons_panel)
 
-        self.video_list = QListWidget()
-        self.video_list.itemSelectionChanged.connect(self.on_video_selection_changed)
+        self.video_list = QListView()
+        self.video_list.setUniformItemSizes(True)
+        self.video_list.setModel(self.video_model)
         layout.addWidget(self.video_list, stretch=1)
 
         # Connect signals
         self.upload_btn.clicked.connect(self.handle_upload)
-        self.edit_btn.clicked.connect(self.handle_edit)
 
     def setup_channel_tab(self):
         layout = QVBoxLayout(self.channel_tab)
@@ -354,23 +366,22 @@ class UserAccountDialog(QDialog):
 
         layout.addWidget(buttons_panel)
 
-        self.channel_list = QListWidget()
-        self.channel_list.itemSelectionChanged.connect(self.on_channel_selection_changed)
-        self.channel_list.itemDoubleClicked.connect(self.on_channel_double_click)
+        self.channel_list = QListView()
+        self.channel_list.setUniformItemSizes(True)
+        self.channel_list.setModel(self.channel_model)
+        self.channel_list.selectionModel().selectionChanged.connect(self.on_channel_selection_changed)
+        self.channel_list.doubleClicked.connect(self.on_channel_double_click)
         layout.addWidget(self.channel_list, stretch=1)
 
         # Connect signals
         self.create_channel_btn.clicked.connect(self.handle_create_channel)
         self.channel_info_btn.clicked.connect(self.handle_channel_info)
 
-    def on_video_selection_changed(self):
-        self.edit_btn.setEnabled(len(self.video_list.selectedItems()) > 0)
-
     def on_channel_selection_changed(self):
-        self.channel_info_btn.setEnabled(len(self.channel_list.selectedItems()) > 0)
+        self.channel_info_btn.setEnabled(self.channel_list.selectionModel().hasSelection())
 
-    def on_channel_double_click(self, item):
-        channel_id = item.data(Qt.UserRole)
+    def on_channel_double_click(self, index):
+        channel_id, _ = index.data(EntryListModel.EntryRole)
         if hasattr(self.parent_widget, 'load_channel_videos'):
             self.parent_widget.load_channel_videos(channel_id)
         self.accept()
@@ -383,21 +394,6 @@ class UserAccountDialog(QDialog):
                 video_info = upload_dialog.get_video_info()
                 self.parent_widget.handle_video_upload(video_info)
 
-    def handle_edit(self):
-        """Handle video editing by delegating to parent widget"""
-        selected = self.video_list.selectedItems()
-        if not selected:
-            return
-
-        if hasattr(self.parent_widget, 'edit_video_info'):
-            video_id = selected[0].data(Qt.UserRole)
-            video_info = selected[0].data(Qt.UserRole + 1)  # Assuming video_info is stored as additional data
-
-            edit_dialog = EditVideoDialog(self, video_info.title, video_info.description)
-            if edit_dialog.exec_() == QDialog.Accepted:
-                title, description = edit_dialog.get_video_info()
-                self.parent_widget.edit_video_info(video_id, title, description)
-
     def handle_create_channel(self):
         """Handle channel creation by delegating to parent widget"""
         if hasattr(self.parent_widget, 'create_channel'):
@@ -405,54 +401,38 @@ class UserAccountDialog(QDialog):
 
     def handle_channel_info(self):
         """Handle channel info display by delegating to parent widget"""
-        selected = self.channel_list.selectedItems()
+        selected = _selected_entry(self.channel_list)
         if not selected:
             return
 
-        channel_id = selected[0].data(Qt.UserRole)
+        channel_id, _ = selected
         if hasattr(self.parent_widget, 'show_channel_info'):
             self.parent_widget.show_channel_info(channel_id)
 
     def set_videos(self, videos):
         """Set the list of user videos"""
-        self.video_list.clear()
-        for video_id, video_info in videos:
-            item = QListWidgetItem(f"{video_id}: {video_info.title}")
-            item.setData(Qt.UserRole, video_id)
-            item.setData(Qt.UserRole + 1, video_info)  # Store video_info for editing
-            self.video_list.addItem(item)
+        self.video_model.set_videos(videos)
 
     def set_channels(self, channels):
         """Set the list of user channels"""
-        self.channel_list.clear()
-        for channel_id, channel_info in channels:
-            item = QListWidgetItem(f"{channel_id}: {channel_info.name}")
-            item.setData(Qt.UserRole, channel_id)
-            self.channel_list.addItem(item)
+        self.channel_model.update(channels)
 
     def get_selected_video(self):
         """Get the currently selected video"""
-        selected_items = self.video_list.selectedItems()
-        if selected_items:
-            return (
-                selected_items[0].data(Qt.UserRole),
-                selected_items[0].data(Qt.UserRole + 1)  # video_info
-            )
-        return None
+        return _selected_entry(self.video_list)
 
     def get_selected_channel(self):
         """Get the currently selected channel"""
-        selected_items = self.channel_list.selectedItems()
-        if selected_items:
-            return selected_items[0].data(Qt.UserRole)
-        return None
+        selected = _selected_entry(self.channel_list)
+        return selected[0] if selected else None
 
 class ChannelDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, channel_model=None):
         super().__init__(parent)
         self.setWindowTitle("Каналы")
         self.setFixedSize(500, 400)
         self.parent_widget = parent
+        self.channel_model = channel_model or ChannelListModel(self)
 
         layout = QVBoxLayout(self)
 
@@ -473,9 +453,11 @@ class ChannelDialog(QDialog):
 
         layout.addWidget(buttons_panel)
 
-        self.channel_list = QListWidget()
-        self.channel_list.itemSelectionChanged.connect(self.on_selection_changed)
-        self.channel_list.itemDoubleClicked.connect(self.on_channel_double_click)
+        self.channel_list = QListView()
+        self.channel_list.setUniformItemSizes(True)
+        self.channel_list.setModel(self.channel_model)
+        self.channel_list.selectionModel().selectionChanged.connect(self.on_selection_changed)
+        self.channel_list.doubleClicked.connect(self.on_channel_double_click)
         layout.addWidget(self.channel_list, stretch=1)
 
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
@@ -489,13 +471,13 @@ class ChannelDialog(QDialog):
         self.info_btn.clicked.connect(self.show_channel_info)
 
     def on_selection_changed(self):
-        has_selection = len(self.channel_list.selectedItems()) > 0
+        has_selection = self.channel_list.selectionModel().hasSelection()
         self.subscribe_btn.setEnabled(has_selection)
         self.info_btn.setEnabled(has_selection)
 
-    def on_channel_double_click(self, item):
+    def on_channel_double_click(self, index):
         """Handle double click on channel item"""
-        channel_id = item.data(Qt.UserRole)
+        channel_id, _ = index.data(EntryListModel.EntryRole)
         if hasattr(self.parent_widget, 'load_channel_videos'):
             self.parent_widget.load_channel_videos(channel_id)
         self.accept()
@@ -505,35 +487,29 @@ class ChannelDialog(QDialog):
             self.parent_widget.create_channel()
 
     def show_channel_info(self):
-        selected = self.channel_list.selectedItems()
+        selected = _selected_entry(self.channel_list)
         if not selected:
             return
 
-        channel_id = selected[0].data(Qt.UserRole)
+        channel_id, _ = selected
         if hasattr(self.parent_widget, 'show_channel_info'):
             self.parent_widget.show_channel_info(channel_id)
 
     def handle_subscription(self):
-        selected = self.channel_list.selectedItems()
+        selected = _selected_entry(self.channel_list)
         if not selected:
             return
 
-        channel_id = selected[0].data(Qt.UserRole)
+        channel_id, _ = selected
         if hasattr(self.parent_widget, 'subscribe_to_channel'):
             self.parent_widget.subscribe_to_channel(channel_id)
 
     def set_channels(self, channels):
-        self.channel_list.clear()
-        for channel_id, channel_info in channels:
-            item = QListWidgetItem(f"{channel_id}: {channel_info.name}")
-            item.setData(Qt.UserRole, channel_id)
-            self.channel_list.addItem(item)
+        self.channel_model.update(channels)
 
     def get_selected_channel(self):
-        selected_items = self.channel_list.selectedItems()
-        if selected_items:
-            return selected_items[0].data(Qt.UserRole)
-        return None
+        selected = _selected_entry(self.channel_list)
+        return selected[0] if selected else None
 
 class ChannelInfoDialog(QDialog):
     def __init__(self, parent=None):
@@ -607,7 +583,7 @@ class UploadDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Загрузить видео")
-        self.setFixedSize(500, 300)
+        self.setFixedSize(500, 360)
 
         self.setup_ui()
         self.file_path = None
@@ -641,6 +617,22 @@ class UploadDialog(QDialog):
         self.public_check.setChecked(True)
         form.addRow("Видимость:", self.public_check)
 
+        # Нарезка на сегменты локально: видео становится доступным, пока загрузка ещё идёт
+        self.transcode_check = QCheckBox("Нарезать и перекодировать на компьютере")
+        self.segment_spin = QSpinBox()
+        self.segment_spin.setRange(2, 60)
+        self.segment_spin.setValue(10)
+        self.segment_spin.setSuffix(" с")
+        if find_ffmpeg():
+            self.transcode_check.toggled.connect(self.segment_spin.setEnabled)
+            self.segment_spin.setEnabled(False)
+        else:
+            self.transcode_check.setEnabled(False)
+            self.transcode_check.setToolTip("Требуется ffmpeg")
+            self.segment_spin.setEnabled(False)
+        form.addRow("Обработка:", self.transcode_check)
+        form.addRow("Длина сегмента:", self.segment_spin)
+
         # Кнопки OK/Cancel
         buttons = QDialogButtonBox(
             QDialogButtonBox.Ok | QDialogButtonBox.Cancel,
@@ -694,55 +686,24 @@ class UploadDialog(QDialog):
     def get_video_info(self):
         """Возвращает информацию о видео для загрузки"""
         class VideoInfo:
-            def __init__(self, title, description, file_path, is_public):
+            def __init__(self, title, description, file_path, is_public,
+                         transcode_locally, segment_length):
                 self.title = title
                 self.description = description
                 self.file_path = file_path
                 self.is_public = is_public
+                self.transcode_locally = transcode_locally
+                self.segment_length = segment_length
 
         return VideoInfo(
             self.title_edit.text().strip(),
             self.desc_edit.toPlainText().strip(),
             self.file_path,
-            self.public_check.isChecked()
+            self.public_check.isChecked(),
+            self.transcode_check.isChecked(),
+            self.segment_spin.value()
         )
 
-class EditVideoDialog(QDialog):
-    def __init__(self, parent=None, title="", description=""):
-        super().__init__(parent)
-        self.setWindowTitle("Редактировать видео")
-        self.setFixedSize(400, 250)
-
-        layout = QVBoxLayout(self)
-
-        form = QFormLayout()
-
-        self.title_edit = QLineEdit(title)
-        self.title_edit.setPlaceholderText("Название видео")
-
-        self.desc_edit = QTextEdit(description)
-        self.desc_edit.setPlaceholderText("Описание видео")
-        self.desc_edit.setMaximumHeight(80)
-
-        form.addRow("Название:", self.title_edit)
-        form.addRow("Описание:", self.desc_edit)
-
-        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-        buttons.accepted.connect(self.validate)
-        buttons.rejected.connect(self.reject)
-
-        layout.addLayout(form)
-        layout.addWidget(buttons)
-
-    def validate(self):
-        if not self.title_edit.text().strip():
-            QMessageBox.warning(self, "Ошибка", "Введите название видео")
-            return
-        self.accept()
-
-    def get_video_info(self):
-        return self.title_edit.text().strip(), self.desc_edit.toPlainText().strip()
-
 class Network:
     """Mock network class for demonstration"""
     def create_channel(self, name, description):
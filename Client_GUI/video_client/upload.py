@@ -0,0 +1,247 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, List, BinaryIO, Tuple
+
+from .logger import logger
+
+# UPLOAD_VIDEO payload is acknowledged one byte per MiB received
+UPLOAD_ACK_UNIT = 1024 * 1024
+
+
+class AckWindow:
+    """Flow control for upload chunks sent but not yet acknowledged.
+
+    Instead of waiting for each chunk's ack before sending the next one,
+    up to ``size`` chunks may be in flight. The window is tuned from the
+    ack round trip times, delay-based: it grows while acks return close to
+    the smallest round trip seen (the link is not saturated yet) and is cut
+    back to the estimated bandwidth-delay product once acks start queueing.
+
+    Every ack must stand for exactly one ``unit`` of payload. UPLOAD_CHUNK
+    guarantees that by protocol (one ack per chunk request); for plain
+    UPLOAD_VIDEO only servers granting FEATURE_UPLOAD_WINDOW do, others
+    get ``maximum=1``, i.e. stop-and-wait.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 2, maximum: int = 64,
+                 unit: int = UPLOAD_ACK_UNIT):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+
+        self._sent_at = deque()
+        self._last_ack = None
+        self.min_rtt = None
+        self.rate = None  # bytes per second
+        self.acked = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._sent_at)
+
+    def can_send(self) -> bool:
+        return self.in_flight < self.size
+
+    def sent(self) -> None:
+        self._sent_at.append(time.monotonic())
+
+    def ack(self, count: int = 1) -> None:
+        now = time.monotonic()
+        if self._last_ack is not None and now > self._last_ack:
+            sample = count * self.unit / (now - self._last_ack)
+            self.rate = sample if self.rate is None else self.rate * 0.8 + sample * 0.2
+        self._last_ack = now
+
+        for _ in range(count):
+            rtt = now - self._sent_at.popleft()
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+            self.acked += 1
+
+            if rtt <= self.min_rtt * 1.5:
+                self.size = min(self.size + 1, self.maximum)
+            elif rtt > self.min_rtt * 3 and self.rate:
+                bdp = math.ceil(self.rate * self.min_rtt / self.unit)
+                self.size = min(max(bdp + 1, self.minimum), self.size)
+
+    def stats(self) -> dict:
+        return {
+            'window': self.size,
+            'in_flight': self.in_flight,
+            'acked': self.acked,
+            'min_rtt': self.min_rtt,
+            'rate': self.rate,
+        }
+
+
+class FileSender:
+    """Sends byte ranges of an open file.
+
+    With ``sendfile`` the data goes from the page cache straight to the
+    socket (``socket.sendfile``, i.e. ``os.sendfile``) and never passes
+    through Python. Otherwise, and for ranges whose checksum has to be
+    computed first anyway, a range is read into one reusable buffer and
+    sent from a memoryview of it.
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int, use_sendfile: bool = True):
+        self.f = f
+        self.use_sendfile = use_sendfile and hasattr(os, 'sendfile')
+        self._buffer = bytearray(chunk_size)
+        self._view = memoryview(self._buffer)
+
+    def read(self, offset: int, count: int) -> memoryview:
+        """Range contents in the shared buffer; valid until the next read"""
+        view = self._view[:count]
+        self.f.seek(offset)
+        received = 0
+        while received < count:
+            n = self.f.readinto(view[received:])
+            if not n:
+                raise ValueError("File shrank during upload")
+            received += n
+        return view
+
+    def sendfile(self, sock, offset: int, count: int) -> None:
+        sent = sock.sendfile(self.f, offset, count)
+        if sent < count:
+            raise ValueError("File shrank during upload")
+
+
+class UploadJournal:
+    """Client-side record of unfinished resumable uploads.
+
+    Each entry ties a local file (path, size, mtime) and its metadata to the
+    server's upload session id and the parts not acknowledged yet, so an
+    upload interrupted by a dropped connection or a client restart can
+    continue where it stopped. ``offset`` is the end of the acknowledged
+    prefix of the file; ``pending`` lists the ``[start, end)`` ranges past
+    it that still have to be sent, since parallel ranges are acknowledged
+    out of order. Entries for deleted or modified files and those older
+    than ``max_age`` are dropped on load.
+    """
+
+    # Write the journal at most this often while offsets advance
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, path: str = 'cache/uploads.json', max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            records = []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Upload journal unreadable, starting empty: {str(e)}")
+            records = []
+
+        now = time.time()
+        for record in records:
+            try:
+                stat = os.stat(record['file_path'])
+            except OSError:
+                continue
+            if stat.st_size != record['size'] or stat.st_mtime != record['mtime']:
+                continue
+            if now - record['created'] > self.max_age:
+                continue
+            self._entries[record['session']] = record
+        if self._entries:
+            logger.info(f"Upload journal has {len(self._entries)} unfinished uploads")
+
+    def flush(self) -> None:
+        """Write the journal atomically"""
+        with self._lock:
+            records = list(self._entries.values())
+            self._flushed_at = time.monotonic()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error writing upload journal: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def find(self, file_path: str, channel_id: int, title: str) -> Optional[dict]:
+        """Unfinished upload of the same, unchanged file with the same metadata"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        path = os.path.abspath(file_path)
+        with self._lock:
+            for record in self._entries.values():
+                if (record['file_path'] == path and record['size'] == stat.st_size and
+                        record['mtime'] == stat.st_mtime and record['channel_id'] == channel_id and
+                        record['title'] == title):
+                    return dict(record)
+        return None
+
+    def add(self, session: str, file_path: str, channel_id: int, title: str,
+            description: str, chunk_size: int) -> dict:
+        stat = os.stat(file_path)
+        record = {
+            'session': session,
+            'file_path': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'channel_id': channel_id,
+            'title': title,
+            'description': description,
+            'chunk_size': chunk_size,
+            'offset': 0,
+            'pending': [[0, stat.st_size]],
+            'created': time.time(),
+        }
+        with self._lock:
+            self._entries[session] = record
+        self.flush()
+        return dict(record)
+
+    def get(self, session: str) -> Optional[dict]:
+        with self._lock:
+            record = self._entries.get(session)
+            return dict(record) if record is not None else None
+
+    def update_offset(self, session: str, offset: int,
+                      pending: Optional[List[Tuple[int, int]]] = None) -> None:
+        """Record the acknowledged prefix and, if given, the ranges still to send"""
+        with self._lock:
+            record = self._entries.get(session)
+            if record is None:
+                return
+            record['offset'] = offset
+            record['pending'] = [list(r) for r in pending] if pending is not None else [[offset, record['size']]]
+            due = time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def remove(self, session: str) -> None:
+        with self._lock:
+            if self._entries.pop(session, None) is None:
+                return
+        self.flush()
+
+    def pending(self) -> List[dict]:
+        with self._lock:
+            return [dict(record) for record in self._entries.values()]